@@ -0,0 +1,130 @@
+# src/api/cassette.py
+# Grabación y reproducción de tráfico de Odoo ("cassettes") para medir y perfilar los procesadores sin el ERP.
+# En modo grabar, cada llamada execute_kw se guarda con su respuesta (o error) y su duración en archivos JSON Lines
+# comprimidos con gzip. En modo reproducir, las llamadas se responden desde esos archivos, en el mismo orden para
+# llamadas idénticas, con la latencia grabada (velocidad 1) o sin espera (velocidad 0).
+
+import os
+import glob
+import gzip
+import json
+import time
+import atexit
+import logging
+import threading
+import xmlrpc.client
+from collections import defaultdict, deque
+from datetime import datetime
+from api.single_flight import clave_llamada
+from utils.metrics import metricas
+
+class LlamadaNoGrabada(LookupError):
+    """La llamada no está en el cassette; no es un error transitorio, así que la política no la reintenta."""
+
+def error_a_dict(error):
+    if isinstance(error, xmlrpc.client.Fault):
+        return {'tipo': 'Fault', 'codigo': error.faultCode, 'mensaje': error.faultString}
+    if isinstance(error, xmlrpc.client.ProtocolError):
+        return {'tipo': 'ProtocolError', 'codigo': error.errcode, 'mensaje': error.errmsg}
+    if isinstance(error, TimeoutError):
+        return {'tipo': 'TimeoutError', 'mensaje': str(error)}
+    return {'tipo': 'ConnectionError', 'mensaje': f"{type(error).__name__}: {error}"}
+
+def error_desde_dict(datos):
+    """Reconstruye la excepción grabada, conservando si la política la considera transitoria o no."""
+    if datos['tipo'] == 'Fault':
+        return xmlrpc.client.Fault(datos['codigo'], datos['mensaje'])
+    if datos['tipo'] == 'ProtocolError':
+        return xmlrpc.client.ProtocolError('cassette', datos['codigo'], datos['mensaje'], {})
+    if datos['tipo'] == 'TimeoutError':
+        return TimeoutError(datos['mensaje'])
+    return ConnectionError(datos['mensaje'])
+
+class GrabadorCassette:
+    def __init__(self, directorio, uid=None, vaciar_cada=100):
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta = os.path.join(directorio, f"odoo-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.jsonl.gz")
+        self.vaciar_cada = vaciar_cada
+        self._archivo = gzip.open(self.ruta, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._sin_vaciar = 0
+        self._escribir({'inicio': time.time(), 'uid': uid})
+        atexit.register(self.close)
+        logging.info(f"Grabando tráfico de Odoo en {self.ruta}")
+
+    def _escribir(self, registro):
+        with self._lock:
+            if self._archivo is None:
+                return
+            self._archivo.write(json.dumps(registro, default=str) + '\n')
+            self._sin_vaciar += 1
+            if self._sin_vaciar >= self.vaciar_cada:
+                self._archivo.flush()
+                self._sin_vaciar = 0
+
+    def grabar(self, model, method, args, kwargs, duracion, respuesta=None, error=None):
+        registro = {'modelo': model, 'metodo': method, 'args': args, 'kwargs': kwargs or {}, 'duracion': round(duracion, 6)}
+        if error is not None:
+            registro['error'] = error_a_dict(error)
+        else:
+            registro['respuesta'] = respuesta
+        self._escribir(registro)
+
+    def envolver(self, model, method, args, kwargs, llamada):
+        """Ejecuta `llamada()` contra Odoo y graba el resultado o el error."""
+        inicio = time.monotonic()
+        try:
+            respuesta = llamada()
+        except Exception as e:
+            self.grabar(model, method, args, kwargs, time.monotonic() - inicio, error=e)
+            raise
+        self.grabar(model, method, args, kwargs, time.monotonic() - inicio, respuesta=respuesta)
+        return respuesta
+
+    def close(self):
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+class ReproductorCassette:
+    def __init__(self, ruta, velocidad=1.0):
+        """`ruta` es un cassette o un directorio con varios (se cargan en orden de nombre).
+        `velocidad` 1 reproduce la latencia grabada, 2 la mitad, 0 responde sin espera."""
+        self.velocidad = velocidad
+        self.uid = None
+        self._grabadas = defaultdict(deque)
+        self._ultima = {}
+        self._lock = threading.Lock()
+        archivos = sorted(glob.glob(os.path.join(ruta, '*.jsonl.gz'))) if os.path.isdir(ruta) else [ruta]
+        for archivo in archivos:
+            self._cargar(archivo)
+        logging.info(f"Reproduciendo {sum(len(c) for c in self._grabadas.values())} llamadas de Odoo desde {len(archivos)} cassette(s)")
+
+    def _cargar(self, archivo):
+        with gzip.open(archivo, 'rt', encoding='utf-8') as f:
+            for linea in f:
+                registro = json.loads(linea)
+                if 'inicio' in registro:
+                    self.uid = self.uid or registro.get('uid')
+                    continue
+                clave = clave_llamada(registro['modelo'], registro['metodo'], registro['args'], registro['kwargs'])
+                self._grabadas[clave].append(registro)
+
+    def responder(self, model, method, args, kwargs):
+        """Devuelve la siguiente respuesta grabada para la llamada; si se agotaron, repite la última."""
+        clave = clave_llamada(model, method, args, kwargs)
+        with self._lock:
+            grabadas = self._grabadas.get(clave)
+            if grabadas:
+                registro = self._ultima[clave] = grabadas.popleft()
+            else:
+                registro = self._ultima.get(clave)
+        if registro is None:
+            metricas.incrementar('cassette.faltantes', model=model, method=method)
+            raise LlamadaNoGrabada(f"La llamada {method} en {model} no está en el cassette")
+        if self.velocidad > 0:
+            time.sleep(registro['duracion'] / self.velocidad)
+        if 'error' in registro:
+            raise error_desde_dict(registro['error'])
+        return registro['respuesta']
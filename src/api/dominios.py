@@ -0,0 +1,42 @@
+# src/api/dominios.py
+# Utilidades para dominios de Odoo: combinarlos en una sola búsqueda y evaluarlos localmente
+# sobre los registros devueltos, para despachar cada albarán a la regla que le corresponde.
+
+import re
+
+def combinar_dominios_or(dominios):
+    """Combina varios dominios (cada uno un AND implícito) en un solo dominio OR en notación prefija."""
+    dominios = [list(dominio) for dominio in dominios if dominio]
+    combinado = ['|'] * (len(dominios) - 1)
+    for dominio in dominios:
+        combinado.extend(['&'] * (len(dominio) - 1))
+        combinado.extend(dominio)
+    return combinado
+
+def _like(valor, patron, envolver, ignorar_mayusculas):
+    """Evalúa un 'like' de Odoo: % y _ son comodines y, salvo en =like, el patrón se busca en cualquier parte."""
+    regex = ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in str(patron))
+    if envolver:
+        regex = f'.*{regex}.*'
+    return re.fullmatch(regex, str(valor or ''), re.DOTALL | (re.IGNORECASE if ignorar_mayusculas else 0)) is not None
+
+def coincide_condicion(registro, condicion):
+    """Evalúa una condición (campo, operador, valor) sobre un registro leído de Odoo."""
+    campo, operador, esperado = condicion
+    valor = registro.get(campo)
+    if isinstance(valor, (list, tuple)) and len(valor) == 2 and isinstance(valor[0], int):
+        valor = valor[0]  # many2one: (id, nombre)
+    if operador == '=':
+        return str(valor) == str(esperado)
+    if operador == '!=':
+        return str(valor) != str(esperado)
+    if operador in ('in', 'not in'):
+        dentro = str(valor) in {str(v) for v in esperado}
+        return dentro if operador == 'in' else not dentro
+    if operador in ('like', 'ilike', '=like', '=ilike'):
+        return _like(valor, esperado, not operador.startswith('='), operador.endswith('ilike'))
+    raise ValueError(f"Operador de dominio no soportado localmente: {operador}")
+
+def coincide_dominio(registro, dominio):
+    """Evalúa un dominio de condiciones unidas por AND implícito."""
+    return all(coincide_condicion(registro, condicion) for condicion in dominio)
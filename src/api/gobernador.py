@@ -0,0 +1,164 @@
+# src/api/gobernador.py
+# Gobernador de llamadas a Odoo compartido por todos los procesadores de un mismo servidor: cubetas de fichas por
+# modelo/método (ODOO_TASAS) y un tope global de llamadas simultáneas. El estado vive en un archivo JSON pequeño
+# (ODOO_GOBERNADOR_RUTA) protegido con flock, así que los procesos se coordinan sin un servicio aparte.
+# El tope se adapta (AIMD): sube de a poco mientras la latencia de las lecturas está bajo ODOO_LATENCIA_OBJETIVO_SEG
+# y se recorta (x0.7) cuando la latencia sube o Odoo falla por sobrecarga; las tasas se escalan con el tope.
+#
+# ODOO_TASAS: "modelo:metodo=llamadas_por_segundo" separados por coma; se admite '*' como método o como clave global.
+#   stock.quant:read_group=5,stock.picking:*=10,*=30
+
+import os
+import json
+import time
+import fcntl
+import logging
+from contextlib import contextmanager
+from config.settings import Config
+from utils.metrics import metricas
+from api.rpc_policy import METODOS_LECTURA, GobernadorSaturado, es_error_transitorio
+
+FACTOR_RECORTE = 0.7
+PAUSA_MAX = 0.25
+
+def interpretar_tasas(texto):
+    """Convierte ODOO_TASAS en {clave: llamadas por segundo}."""
+    tasas = {}
+    for par in (texto or '').split(','):
+        if not par.strip():
+            continue
+        clave, tasa = par.rsplit('=', 1)
+        tasas[clave.strip()] = float(tasa)
+    return tasas
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class GobernadorOdoo:
+    def __init__(self, ruta=None, tasas=None, concurrencia_max=None, concurrencia_min=None, latencia_objetivo=None, reloj=time.time):
+        self.ruta = ruta or Config.ODOO_GOBERNADOR_RUTA
+        self.tasas = interpretar_tasas(Config.ODOO_TASAS) if tasas is None else tasas
+        self.concurrencia_max = concurrencia_max or Config.ODOO_CONCURRENCIA_MAX
+        self.concurrencia_min = concurrencia_min or Config.ODOO_CONCURRENCIA_MIN
+        self.latencia_objetivo = latencia_objetivo or Config.ODOO_LATENCIA_OBJETIVO_SEG
+        self.reloj = reloj
+        self.pid = str(os.getpid())
+
+    def cubeta_para(self, model, method):
+        """Clave de la cubeta que aplica: modelo:método, luego modelo:*, luego *. None si no hay tasa."""
+        for clave in (f"{model}:{method}", f"{model}:*", '*'):
+            if clave in self.tasas:
+                return clave
+        return None
+
+    @contextmanager
+    def _estado(self):
+        """Estado compartido bajo flock exclusivo; lo que se modifique dentro del bloque se guarda al salir."""
+        with open(self.ruta, 'a+') as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                archivo.seek(0)
+                try:
+                    estado = json.loads(archivo.read() or '{}')
+                except ValueError:
+                    estado = {}
+                estado.setdefault('limite', float(self.concurrencia_max))
+                estado.setdefault('latencia', 0.0)
+                estado.setdefault('recorte', 0.0)
+                estado.setdefault('en_curso', {})
+                estado.setdefault('cubetas', {})
+                yield estado
+                archivo.seek(0)
+                archivo.truncate()
+                archivo.write(json.dumps(estado))
+                archivo.flush()
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def intentar(self, model, method):
+        """Toma un turno si hay ficha en la cubeta y lugar bajo el tope. Devuelve (True, 0) o (False, segundos sugeridos)."""
+        ahora = self.reloj()
+        with self._estado() as estado:
+            en_curso = estado['en_curso']
+            for pid in [pid for pid in en_curso if pid != self.pid and not _proceso_vivo(int(pid))]:
+                del en_curso[pid]  # Turnos de procesos que terminaron sin liberarlos
+            if sum(en_curso.values()) >= max(self.concurrencia_min, int(estado['limite'])):
+                return False, 0.05
+
+            clave = self.cubeta_para(model, method)
+            if clave is not None and self.tasas[clave] > 0:
+                # La tasa se reduce en la misma proporción que el tope de concurrencia
+                tasa = self.tasas[clave] * estado['limite'] / self.concurrencia_max
+                rafaga = max(1.0, self.tasas[clave])
+                fichas, ultima = estado['cubetas'].get(clave, (rafaga, ahora))
+                fichas = min(rafaga, fichas + max(0.0, ahora - ultima) * tasa)
+                if fichas < 1:
+                    estado['cubetas'][clave] = (fichas, ahora)
+                    return False, (1 - fichas) / tasa
+                estado['cubetas'][clave] = (fichas - 1, ahora)
+
+            en_curso[self.pid] = en_curso.get(self.pid, 0) + 1
+            return True, 0
+
+    def liberar(self, method, duracion, sobrecarga=False):
+        """Devuelve el turno y ajusta el tope: recorte si hubo sobrecarga o la latencia de lectura pasa del objetivo."""
+        ahora = self.reloj()
+        with self._estado() as estado:
+            en_curso = estado['en_curso']
+            en_curso[self.pid] = max(0, en_curso.get(self.pid, 0) - 1)
+            if not en_curso[self.pid]:
+                del en_curso[self.pid]
+            if method in METODOS_LECTURA:
+                estado['latencia'] = duracion if not estado['latencia'] else 0.8 * estado['latencia'] + 0.2 * duracion
+            if sobrecarga or estado['latencia'] > self.latencia_objetivo:
+                # Un recorte por segundo como máximo: las llamadas lentas de una misma ráfaga cuentan una vez
+                if ahora - estado['recorte'] >= 1:
+                    estado['limite'] = max(float(self.concurrencia_min), estado['limite'] * FACTOR_RECORTE)
+                    estado['recorte'] = ahora
+                    metricas.incrementar('rpc.gobernador_recortes')
+            else:
+                estado['limite'] = min(float(self.concurrencia_max), estado['limite'] + 1 / estado['limite'])
+            metricas.fijar('rpc.gobernador_limite', round(estado['limite'], 2))
+
+    @contextmanager
+    def turno(self, model, method, plazo):
+        """Espera un turno (como mucho `plazo` segundos), ejecuta el bloque y lo libera midiendo su latencia."""
+        inicio = time.monotonic()
+        while True:
+            try:
+                obtenido, espera = self.intentar(model, method)
+            except OSError as e:
+                # Sin archivo de estado la llamada sigue sin gobernar; no debe contar como fallo de Odoo
+                logging.error(f"Gobernador de Odoo no disponible ({self.ruta}): {e}")
+                obtenido = None
+                break
+            if obtenido:
+                break
+            if time.monotonic() - inicio + espera > plazo:
+                metricas.incrementar('rpc.gobernador_saturado', model=model, method=method)
+                raise GobernadorSaturado(f"Sin turno para {method} en {model} tras {time.monotonic() - inicio:.1f} s")
+            time.sleep(min(espera, PAUSA_MAX))
+        if obtenido is None:
+            yield
+            return
+        esperado = time.monotonic() - inicio
+        if esperado > 0.001:
+            metricas.incrementar('rpc.gobernador_espera_seg', esperado, model=model, method=method)
+        inicio = time.monotonic()
+        sobrecarga = False
+        try:
+            yield
+        except Exception as e:
+            sobrecarga = es_error_transitorio(e)
+            raise
+        finally:
+            try:
+                self.liberar(method, time.monotonic() - inicio, sobrecarga)
+            except OSError as e:
+                logging.error(f"No se pudo liberar el turno del gobernador de Odoo: {e}")
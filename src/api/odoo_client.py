@@ -2,8 +2,14 @@
 # Conexion a Odoo, consultas o acciones relacionadas.
 
 import logging
+import threading
 import xmlrpc.client
 from config.settings import Config
+from api.rpc_policy import PoliticaLlamadas, TransporteConTimeout, METODOS_LECTURA
+from api.single_flight import SingleFlight, clave_llamada
+from api.cassette import GrabadorCassette, ReproductorCassette
+from api.gobernador import GobernadorOdoo
+from utils.contadores import registrar_rpc
 
 class OdooClient:
     def __init__(self):
@@ -12,26 +18,81 @@ class OdooClient:
         self.username = Config.ODOO_USERNAME
         self.password = Config.ODOO_PASSWORD
         self.uid = None
-        self.models = None
+        self.politica = PoliticaLlamadas()
+        # Solo las lecturas se coalescen; las escrituras siempre llegan a Odoo
+        self.single_flight = SingleFlight(Config.ODOO_SINGLE_FLIGHT_SEG)
+        # ServerProxy no es seguro entre hilos: cada hilo usa su propio proxy de objetos
+        self._local = threading.local()
+        # Cassettes de tráfico: 'grabar' guarda cada llamada; 'reproducir' responde desde los archivos sin conectarse
+        self.grabador = None
+        self.reproductor = None
+        if Config.ODOO_CASSETTE_MODO == 'reproducir':
+            self.reproductor = ReproductorCassette(Config.ODOO_CASSETTE_RUTA, Config.ODOO_CASSETTE_VELOCIDAD)
+            self.uid = self.reproductor.uid or 1
+            self.gobernador = None
+            return
+        # Tasas y concurrencia compartidas con los demás procesos del servidor (ODOO_GOBERNADOR_RUTA vacío lo desactiva)
+        self.gobernador = GobernadorOdoo() if Config.ODOO_GOBERNADOR_RUTA else None
         self.connect()
+        if Config.ODOO_CASSETTE_MODO == 'grabar':
+            self.grabador = GrabadorCassette(Config.ODOO_CASSETTE_RUTA, self.uid)
+
+    def _crear_proxy(self, ruta):
+        """Crea un ServerProxy con transporte de tiempo de espera ajustable."""
+        transporte = TransporteConTimeout(https=str(self.url).startswith('https'), timeout=self.politica.timeout_lectura)
+        return xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/{ruta}', transport=transporte), transporte
+
+    @property
+    def models(self):
+        """Proxy de objetos de Odoo del hilo actual, creado bajo demanda."""
+        proxy = getattr(self._local, 'models', None)
+        if proxy is None and self.uid:
+            proxy, self._local.transporte = self._crear_proxy('object')
+            self._local.models = proxy
+        return proxy
 
     def connect(self):
         try:
-            common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
+            common, _ = self._crear_proxy('common')
             self.uid = common.authenticate(self.db, self.username, self.password, {})
             if self.uid:
-                self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
+                self._local.models, self._local.transporte = self._crear_proxy('object')
                 logging.info(f"Conexión a Odoo exitosa, UID: {self.uid}")
             else:
                 logging.error("Falló la autenticación en Odoo")
         except Exception as e:
             logging.error(f"Error al conectar a Odoo: {e}")
 
+    def disponible(self):
+        """Indica si el circuit breaker permite llamar a Odoo (False mientras Odoo se considera caído)."""
+        return self.politica.circuito.estado() != 'abierto'
+
+    def _llamar(self, model, method, args, kwargs, timeout):
+        """Llamada XML-RPC directa con el plazo indicado, en el proxy del hilo actual (o respondida por el cassette)."""
+        registrar_rpc(model, method)
+        if self.reproductor is not None:
+            return self.reproductor.responder(model, method, args, kwargs)
+        if self.gobernador is None:
+            return self._llamar_odoo(model, method, args, kwargs, timeout)
+        with self.gobernador.turno(model, method, timeout):
+            return self._llamar_odoo(model, method, args, kwargs, timeout)
+
+    def _llamar_odoo(self, model, method, args, kwargs, timeout):
+        models = self.models
+        self._local.transporte.timeout = timeout
+        if self.grabador is not None:
+            return self.grabador.envolver(model, method, args, kwargs,
+                                          lambda: models.execute_kw(self.db, self.uid, self.password, model, method, args, kwargs))
+        return models.execute_kw(self.db, self.uid, self.password, model, method, args, kwargs)
+
     def execute_kw(self, model, method, args, kwargs=None):
         if not kwargs:
             kwargs = {}
         try:
-            return self.models.execute_kw(self.db, self.uid, self.password, model, method, args, kwargs)
+            llamada = lambda: self.politica.ejecutar(model, method, lambda timeout: self._llamar(model, method, args, kwargs, timeout))
+            if method in METODOS_LECTURA:
+                return self.single_flight.ejecutar(clave_llamada(model, method, args, kwargs), llamada)
+            return llamada()
         except Exception as e:
             logging.error(f"Error al ejecutar {method} en {model}: {e}")
             return None
@@ -41,5 +102,4 @@ class OdooClient:
     
     def read(self, model, ids, fields):
         """ Lee registros de un modelo en Odoo. """
-        return self.models.execute_kw(self.db, self.uid, self.password,
-                                    model, 'read', [ids], {'fields': fields})
\ No newline at end of file
+        return self.execute_kw(model, 'read', [ids], {'fields': fields})
\ No newline at end of file
@@ -3,7 +3,10 @@
 
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from api.odoo_client import OdooClient
+from config.settings import Config
+from utils.helpers import dividir_en_bloques
 
 class OdooOperations:
     def __init__(self, odoo_client):
@@ -69,6 +72,28 @@ class OdooOperations:
             logging.error(f"Error al obtener los datos de la línea de movimiento: {e}")
             return None
         
+# Para picking_ingestion_processor.py
+    def buscar_pickings(self, dominio, campos):
+        """Busca y lee albaranes en una sola llamada search_read. Devuelve None si la consulta falla."""
+        return self.odoo.execute_kw('stock.picking', 'search_read', [dominio], {'fields': campos})
+
+    def leer_pickings(self, picking_ids, campos):
+        """Lee varios albaranes en una sola llamada."""
+        return self.odoo.execute_kw('stock.picking', 'read', [list(picking_ids)], {'fields': campos}) or []
+
+    def leer_lineas(self, linea_ids, campos=None, chunk_size=None):
+        """Lee líneas de movimiento en bloques y devuelve un diccionario {linea_id: datos}."""
+        campos = campos or ['product_id', 'product_uom_qty', 'location_id', 'location_dest_id']
+        lineas = {}
+        for bloque in dividir_en_bloques(list(linea_ids), chunk_size or Config.ODOO_CHUNK_SIZE):
+            resultado = self.odoo.execute_kw('stock.move', 'read', [bloque], {'fields': campos})
+            if resultado is None:
+                logging.error("No se pudieron leer %d líneas de movimiento", len(bloque))
+                continue
+            for linea in resultado:
+                lineas[linea['id']] = linea
+        return lineas
+
 # Para internal_transfer_processor.py
     def search_albaranes_cdex(self, priority=None, state=None, folio_like=None):
         """Busca albaranes con prioridad, estado y folio."""
@@ -117,6 +142,20 @@ class OdooOperations:
             logging.error(f"Error al obtener recibos: {e}")
             return []
         
+    def buscar_recibos(self, desde, hasta):
+        """IDs de las recepciones terminadas creadas en [desde, hasta) ('YYYY-MM-DD HH:MM:SS'). Devuelve None si la consulta falla."""
+        dominio = [
+            ['picking_type_code', '=', 'incoming'],
+            ['state', '=', 'done'],
+            ['create_date', '>=', desde],
+            ['create_date', '<', hasta]
+        ]
+        try:
+            return self.odoo.execute_kw('stock.picking', 'search', [dominio])
+        except Exception as e:
+            logging.error(f"Error al buscar recibos entre {desde} y {hasta}: {e}")
+            return None
+
     def obtener_linea_data_recibos(self, linea_id):
         """Obtiene los datos de una línea de movimiento desde Odoo."""
         try:
@@ -183,19 +222,98 @@ class OdooOperations:
             logging.error("Error al obtener productos de Odoo: %s", e)
             return []
     
-    def obtener_produc_total(self, product_ids):
-        try:
-            logging.debug("Obteniendo nombres de productos para IDs: %s", product_ids)
-            product_data = self.odoo.execute_kw(
-                'product.product', 'search_read',
-                [[('id', 'in', product_ids)]],
-                {'fields': ['id', 'name', 'default_code']}
-            )
-            logging.debug("Los productos: %s", product_data)
-            product_names = {prod['id']: prod['name'] for prod in product_data}
-            product_skus = {prod['id']: prod['default_code'] for prod in product_data if prod.get('default_code')}
-            return product_names, product_skus 
-        except Exception as e:
-            logging.error("Error al obtener nombres de productos: %s", e)
-            return {}
-        
\ No newline at end of file
+    def ids_productos_desde(self, ultimo_id, limit, hasta_id=None):
+        """Pagina por keyset los IDs de producto mayores a `ultimo_id` (y hasta `hasta_id`, si se indica), en orden ascendente.
+        Devuelve None si la consulta falla."""
+        dominio = [('id', '>', ultimo_id)]
+        if hasta_id is not None:
+            dominio.append(('id', '<=', hasta_id))
+        return self.odoo.execute_kw(
+            'product.product', 'search',
+            [dominio],
+            {'order': 'id', 'limit': limit, 'context': {'active_test': False}}
+        )
+
+    def id_producto_maximo(self):
+        """Devuelve el ProductoID más grande de Odoo (0 si no hay productos), o None si la consulta falla."""
+        ids = self.odoo.execute_kw(
+            'product.product', 'search',
+            [[]],
+            {'order': 'id desc', 'limit': 1, 'context': {'active_test': False}}
+        )
+        if ids is None:
+            return None
+        return ids[0] if ids else 0
+
+    def stock_agrupado_por_producto(self, location_id, product_ids, fechas=None):
+        """Suma en Odoo las cantidades de stock.quant por producto dentro de una ubicación y sus hijas.
+        Si se pasa `fechas`, se llena con el write_date más reciente de los quants de cada producto.
+        Devuelve None si la consulta falla."""
+        campos = ['product_id', 'quantity:sum'] + (['write_date:max'] if fechas is not None else [])
+        grupos = self.odoo.execute_kw(
+            'stock.quant', 'read_group',
+            [[('location_id', 'child_of', location_id), ('product_id', 'in', product_ids)],
+             campos, ['product_id']],
+            {'lazy': False}
+        )
+        if grupos is None:
+            return None
+        if fechas is not None:
+            for grupo in grupos:
+                if grupo.get('product_id') and grupo.get('write_date'):
+                    ProductoID = grupo['product_id'][0]
+                    fechas[ProductoID] = max(fechas.get(ProductoID, ''), grupo['write_date'])
+        return {grupo['product_id'][0]: grupo['quantity'] or 0 for grupo in grupos if grupo.get('product_id')}
+
+    def _leer_bloque_productos(self, product_ids):
+        """Lee nombre y SKU de un bloque de productos. Devuelve None si el bloque falla."""
+        product_data = self.odoo.execute_kw(
+            'product.product', 'search_read',
+            [[('id', 'in', product_ids)]],
+            {'fields': ['id', 'name', 'default_code']}
+        )
+        if product_data is None:
+            logging.warning("Falló la lectura del bloque de %d productos (IDs %s..%s)", len(product_ids), product_ids[0], product_ids[-1])
+        return product_data
+
+    def obtener_produc_total(self, product_ids, chunk_size=None, max_workers=None):
+        """Obtiene nombres y SKUs de productos en bloques paralelos, fusionando cada bloque al llegar.
+        Solo se reintentan los bloques que fallaron. Devuelve (nombres, skus, fallidos), donde `fallidos` lista
+        (primer_id, ultimo_id) de los bloques que no se pudieron leer tras los reintentos."""
+        product_names = {}
+        product_skus = {}
+        chunk_size = chunk_size or Config.ODOO_CHUNK_SIZE
+        max_workers = max_workers or Config.ODOO_MAX_WORKERS
+        pendientes = dividir_en_bloques(sorted(product_ids), chunk_size)
+        logging.debug("Obteniendo nombres de %d productos en %d bloques", len(product_ids), len(pendientes))
+
+        for intento in range(Config.ODOO_CHUNK_REINTENTOS + 1):
+            if not pendientes:
+                break
+            if intento:
+                logging.info("Reintentando %d bloques de productos (intento %d)", len(pendientes), intento)
+            fallidos = []
+            try:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(pendientes))) as executor:
+                    futuros = {executor.submit(self._leer_bloque_productos, bloque): bloque for bloque in pendientes}
+                    for futuro in as_completed(futuros):
+                        try:
+                            product_data = futuro.result()
+                        except Exception as e:
+                            logging.error("Error al obtener bloque de productos: %s", e)
+                            product_data = None
+                        if product_data is None:
+                            fallidos.append(futuros[futuro])
+                            continue
+                        for prod in product_data:
+                            product_names[prod['id']] = prod['name']
+                            if prod.get('default_code'):
+                                product_skus[prod['id']] = prod['default_code']
+            except Exception as e:
+                logging.error("Error al obtener nombres de productos: %s", e)
+                break
+            pendientes = fallidos
+
+        if pendientes:
+            logging.error("No se pudieron obtener %d bloques de productos tras %d reintentos", len(pendientes), Config.ODOO_CHUNK_REINTENTOS)
+        return product_names, product_skus, [(bloque[0], bloque[-1]) for bloque in pendientes]
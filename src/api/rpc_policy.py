@@ -0,0 +1,203 @@
+# src/api/rpc_policy.py
+# Política de llamadas a Odoo: plazos por método, reintentos con backoff exponencial y jitter
+# solo para lecturas (limitados por un presupuesto de reintentos), circuit breaker y lecturas
+# duplicadas opcionales (hedging) para recortar la latencia de cola.
+
+import http.client
+import logging
+import random
+import socket
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config.settings import Config
+from utils.metrics import metricas
+
+# Métodos sin efectos secundarios: se pueden reintentar y duplicar sin riesgo
+METODOS_LECTURA = {
+    'search', 'read', 'search_read', 'search_count', 'read_group',
+    'fields_get', 'name_get', 'name_search', 'default_get',
+}
+
+class CircuitoAbierto(Exception):
+    """Odoo se considera no disponible; la llamada no se intentó."""
+
+class GobernadorSaturado(Exception):
+    """No hubo turno para la llamada dentro de su plazo; no es un error de Odoo, así que no abre el circuito."""
+
+def es_error_transitorio(error):
+    """Errores de red, tiempo de espera o 5xx de Odoo. Un Fault es un error de la aplicación y no se reintenta."""
+    if isinstance(error, xmlrpc.client.Fault):
+        return False
+    if isinstance(error, xmlrpc.client.ProtocolError):
+        return error.errcode >= 500 or error.errcode == 429
+    return isinstance(error, (socket.timeout, TimeoutError, ConnectionError, OSError, http.client.HTTPException))
+
+class TransporteConTimeout(xmlrpc.client.SafeTransport):
+    """Transporte XML-RPC con tiempo de espera ajustable antes de cada llamada."""
+
+    def __init__(self, https=True, timeout=None):
+        super().__init__()
+        self.https = https
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        if self.https:
+            conexion = super().make_connection(host)
+        else:
+            conexion = xmlrpc.client.Transport.make_connection(self, host)
+        conexion.timeout = self.timeout
+        if conexion.sock is not None:
+            conexion.sock.settimeout(self.timeout)
+        return conexion
+
+class PresupuestoReintentos:
+    """Cada llamada aporta `proporcion` fichas y cada reintento gasta una: los reintentos no superan esa fracción del tráfico."""
+
+    def __init__(self, proporcion, maximo):
+        self.proporcion = proporcion
+        self.maximo = maximo
+        self.fichas = maximo
+        self._lock = threading.Lock()
+
+    def depositar(self):
+        with self._lock:
+            self.fichas = min(self.maximo, self.fichas + self.proporcion)
+
+    def retirar(self):
+        with self._lock:
+            if self.fichas >= 1:
+                self.fichas -= 1
+                return True
+            return False
+
+class CircuitBreaker:
+    """Se abre tras `umbral` fallos transitorios seguidos; tras `espera` segundos deja pasar una llamada de prueba."""
+
+    def __init__(self, umbral, espera):
+        self.umbral = umbral
+        self.espera = espera
+        self.fallos = 0
+        self.abierto_desde = None
+        self.prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def estado(self):
+        with self._lock:
+            if self.abierto_desde is None:
+                return 'cerrado'
+            if time.monotonic() - self.abierto_desde >= self.espera:
+                return 'medio_abierto'
+            return 'abierto'
+
+    def permitir(self):
+        """Indica si la llamada puede intentarse."""
+        with self._lock:
+            if self.abierto_desde is None:
+                return True
+            if time.monotonic() - self.abierto_desde >= self.espera and not self.prueba_en_curso:
+                self.prueba_en_curso = True
+                return True
+            return False
+
+    def exito(self):
+        with self._lock:
+            if self.abierto_desde is not None:
+                logging.info("Circuit breaker de Odoo cerrado: Odoo responde de nuevo.")
+            self.fallos = 0
+            self.abierto_desde = None
+            self.prueba_en_curso = False
+
+    def cancelar_prueba(self):
+        """La llamada permitida no llegó a Odoo: se devuelve el turno de prueba sin contar éxito ni fallo."""
+        with self._lock:
+            self.prueba_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            self.prueba_en_curso = False
+            if self.abierto_desde is not None or self.fallos >= self.umbral:
+                if self.abierto_desde is None:
+                    logging.warning("Circuit breaker de Odoo abierto tras %d fallos seguidos.", self.fallos)
+                    metricas.incrementar('rpc.circuito_aperturas')
+                self.abierto_desde = time.monotonic()
+
+class PoliticaLlamadas:
+    def __init__(self):
+        self.timeout_lectura = Config.ODOO_TIMEOUT_LECTURA
+        self.timeout_escritura = Config.ODOO_TIMEOUT_ESCRITURA
+        self.max_reintentos = Config.ODOO_MAX_REINTENTOS
+        self.backoff_base = Config.ODOO_BACKOFF_BASE_SEG
+        self.backoff_max = Config.ODOO_BACKOFF_MAX_SEG
+        self.hedge_seg = Config.ODOO_HEDGE_SEG
+        self.presupuesto = PresupuestoReintentos(Config.ODOO_PRESUPUESTO_REINTENTOS, maximo=10)
+        self.circuito = CircuitBreaker(Config.ODOO_CB_FALLOS, Config.ODOO_CB_ESPERA_SEG)
+        self._pool_hedge = ThreadPoolExecutor(max_workers=4, thread_name_prefix='odoo-hedge') if self.hedge_seg > 0 else None
+
+    def timeout_para(self, method):
+        """Plazo por método: las lecturas tienen un plazo más corto que las escrituras."""
+        return self.timeout_lectura if method in METODOS_LECTURA else self.timeout_escritura
+
+    def _intentar(self, model, method, llamada, timeout):
+        """Un intento, duplicado tras `hedge_seg` segundos si es una lectura lenta."""
+        if self._pool_hedge is None or method not in METODOS_LECTURA:
+            return llamada(timeout)
+        primero = self._pool_hedge.submit(llamada, timeout)
+        listos, _ = wait([primero], timeout=self.hedge_seg)
+        if listos:
+            return primero.result()
+        metricas.incrementar('rpc.hedge', model=model, method=method)
+        segundo = self._pool_hedge.submit(llamada, timeout)
+        listos, _ = wait([primero, segundo], return_when=FIRST_COMPLETED)
+        terminado = listos.pop()
+        if terminado.exception() is not None:
+            # Si el primero en terminar falló, se espera al otro
+            otro = segundo if terminado is primero else primero
+            return otro.result()
+        return terminado.result()
+
+    def ejecutar(self, model, method, llamada):
+        """Ejecuta `llamada(timeout)` aplicando la política. Lanza la última excepción si no hay éxito."""
+        if not self.circuito.permitir():
+            metricas.incrementar('rpc.rechazadas_circuito', model=model, method=method)
+            raise CircuitoAbierto(f"Circuit breaker abierto; se omite {method} en {model}")
+
+        reintentable = method in METODOS_LECTURA
+        timeout = self.timeout_para(method)
+        self.presupuesto.depositar()
+        intento = 0
+        while True:
+            inicio = time.monotonic()
+            try:
+                resultado = self._intentar(model, method, llamada, timeout)
+                duracion = time.monotonic() - inicio
+                metricas.observar('rpc.latencia', duracion, model=model, method=method)
+                metricas.incrementar('rpc.segundos', duracion, model=model, method=method)
+                metricas.incrementar('rpc.llamadas', model=model, method=method, resultado='ok')
+                self.circuito.exito()
+                return resultado
+            except GobernadorSaturado:
+                # Odoo no se llamó: ni éxito ni fallo para el circuito
+                metricas.incrementar('rpc.llamadas', model=model, method=method, resultado='saturado')
+                self.circuito.cancelar_prueba()
+                raise
+            except Exception as e:
+                if not es_error_transitorio(e):
+                    metricas.incrementar('rpc.llamadas', model=model, method=method, resultado='error_aplicacion')
+                    self.circuito.exito()  # Odoo respondió
+                    raise
+                self.circuito.fallo()
+                if not reintentable or intento >= self.max_reintentos or not self.circuito.permitir():
+                    metricas.incrementar('rpc.llamadas', model=model, method=method, resultado='fallo')
+                    raise
+                if not self.presupuesto.retirar():
+                    metricas.incrementar('rpc.presupuesto_agotado', model=model, method=method)
+                    metricas.incrementar('rpc.llamadas', model=model, method=method, resultado='fallo')
+                    raise
+                intento += 1
+                espera = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+                metricas.incrementar('rpc.reintentos', model=model, method=method)
+                logging.warning("Error transitorio en %s de %s (%s); reintento %d en %.2f s", method, model, e, intento, espera)
+                time.sleep(espera)
@@ -0,0 +1,87 @@
+# src/api/single_flight.py
+# Coalescencia de lecturas idénticas (single-flight): las llamadas concurrentes con la misma clave
+# comparten una sola petición en vuelo y su resultado, con una ventana opcional de reutilización.
+
+import copy
+import json
+import threading
+import time
+from utils.metrics import metricas
+
+def clave_llamada(model, method, args, kwargs):
+    """Clave estable de una llamada a Odoo; tuplas y listas del dominio producen la misma clave."""
+    return (model, method,
+            json.dumps(args, sort_keys=True, default=str),
+            json.dumps(kwargs or {}, sort_keys=True, default=str))
+
+class _LlamadaEnVuelo:
+    __slots__ = ('evento', 'resultado', 'error', 'seguidores')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+        self.seguidores = 0
+
+class SingleFlight:
+    def __init__(self, ventana_reutilizacion=0, max_recientes=1000):
+        self.ventana_reutilizacion = ventana_reutilizacion
+        self.max_recientes = max_recientes
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self._recientes = {}
+
+    def _purgar(self, ahora):
+        """Elimina resultados vencidos; se llama con el lock tomado."""
+        if len(self._recientes) >= self.max_recientes:
+            for clave in [clave for clave, (expira, _) in self._recientes.items() if expira <= ahora]:
+                del self._recientes[clave]
+            if len(self._recientes) >= self.max_recientes:
+                self._recientes.clear()
+
+    def ejecutar(self, clave, funcion):
+        """Ejecuta `funcion()` una sola vez por clave entre los llamadores simultáneos.
+        Los seguidores reciben una copia del resultado para que nadie modifique el de otro; si no hay seguidores
+        ni ventana de reutilización, el líder se queda con el original sin copiarlo."""
+        ahora = time.monotonic()
+        with self._lock:
+            reciente = self._recientes.get(clave)
+            if reciente and reciente[0] > ahora:
+                metricas.incrementar('rpc.coalescidas', tipo='reutilizada', model=clave[0], method=clave[1])
+                return copy.deepcopy(reciente[1])
+            llamada = self._en_vuelo.get(clave)
+            lider = llamada is None
+            if lider:
+                llamada = self._en_vuelo[clave] = _LlamadaEnVuelo()
+            else:
+                llamada.seguidores += 1
+
+        if not lider:
+            metricas.incrementar('rpc.coalescidas', tipo='en_vuelo', model=clave[0], method=clave[1])
+            llamada.evento.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return copy.deepcopy(llamada.resultado)
+
+        try:
+            try:
+                resultado = funcion()
+            except Exception as e:
+                llamada.error = e
+                with self._lock:
+                    del self._en_vuelo[clave]
+                raise
+            # Fuera de _en_vuelo ya no se suman seguidores: el conteo es definitivo
+            with self._lock:
+                del self._en_vuelo[clave]
+                compartir = llamada.seguidores > 0 or self.ventana_reutilizacion > 0
+            if compartir:
+                llamada.resultado = copy.deepcopy(resultado)
+            if self.ventana_reutilizacion > 0:
+                with self._lock:
+                    ahora = time.monotonic()
+                    self._purgar(ahora)
+                    self._recientes[clave] = (ahora + self.ventana_reutilizacion, llamada.resultado)
+            return resultado
+        finally:
+            llamada.evento.set()
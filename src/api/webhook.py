@@ -0,0 +1,151 @@
+# src/api/webhook.py
+# Receptor HTTP local de notificaciones de albaranes (por ejemplo, desde una acción automatizada de Odoo).
+# Valida un secreto compartido, descarta notificaciones repetidas y entrega los IDs a un callback.
+#
+# POST /albaranes  cabecera X-Webhook-Secret: <secreto>
+#   {"ids": [123, 124]}  o  {"id": 123, "write_date": "2024-01-01 10:00:00"}
+# GET /frescura  cabecera X-Webhook-Secret: <secreto>
+#   Percentiles del atraso Odoo -> MySQL y elementos pendientes por procesador
+
+import hmac
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.settings import Config
+from utils.metrics import metricas
+from utils.frescura import frescura
+
+RUTA_ALBARANES = '/albaranes'
+RUTA_FRESCURA = '/frescura'
+MAX_CUERPO = 64 * 1024
+
+class VentanaDeduplicacion:
+    """Recuerda las claves vistas durante `segundos` para ignorar notificaciones repetidas."""
+
+    def __init__(self, segundos):
+        self.segundos = segundos
+        self._vistas = {}
+        self._lock = threading.Lock()
+
+    def nueva(self, clave):
+        """Devuelve True la primera vez que se ve `clave` dentro de la ventana."""
+        ahora = time.monotonic()
+        with self._lock:
+            if len(self._vistas) > 10000:
+                self._vistas = {c: t for c, t in self._vistas.items() if ahora - t < self.segundos}
+            visto = self._vistas.get(clave)
+            if visto is not None and ahora - visto < self.segundos:
+                return False
+            self._vistas[clave] = ahora
+            return True
+
+def _id_albaran(valor):
+    """ID de albarán como entero; null, listas, objetos o texto no numérico lanzan ValueError."""
+    if isinstance(valor, bool):
+        raise ValueError(f"ID de albarán inválido: {valor!r}")
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"ID de albarán inválido: {valor!r}") from None
+
+def ids_de_notificacion(cuerpo):
+    """Extrae [(id, write_date)] del cuerpo JSON de una notificación. Lanza ValueError si el formato no es válido."""
+    datos = json.loads(cuerpo)
+    if not isinstance(datos, dict):
+        raise ValueError("Se esperaba un objeto JSON")
+    if 'ids' in datos:
+        ids = datos['ids']
+        if not isinstance(ids, list):
+            raise ValueError("'ids' debe ser una lista")
+        return [(_id_albaran(albaran_id), None) for albaran_id in ids]
+    if 'id' in datos:
+        write_date = datos.get('write_date')
+        if write_date is not None and not isinstance(write_date, str):
+            raise ValueError("'write_date' debe ser texto")
+        return [(_id_albaran(datos['id']), write_date)]
+    raise ValueError("Falta 'id' o 'ids'")
+
+class ReceptorWebhook:
+    def __init__(self, callback, puerto=None, host=None, secreto=None, dedup_seg=None):
+        self.callback = callback
+        self.puerto = Config.WEBHOOK_PUERTO if puerto is None else puerto
+        self.host = host or Config.WEBHOOK_HOST
+        self.secreto = Config.WEBHOOK_SECRETO if secreto is None else secreto
+        self.dedup = VentanaDeduplicacion(Config.WEBHOOK_DEDUP_SEG if dedup_seg is None else dedup_seg)
+        self.servidor = None
+
+    def secreto_valido(self, recibido):
+        return bool(self.secreto) and hmac.compare_digest((recibido or '').encode(), self.secreto.encode())
+
+    def recibir(self, cuerpo):
+        """Procesa el cuerpo de una notificación y entrega al callback los IDs nuevos. Devuelve cuántos se aceptaron."""
+        nuevos = [albaran_id for albaran_id, write_date in ids_de_notificacion(cuerpo) if self.dedup.nueva((albaran_id, write_date))]
+        metricas.incrementar('webhook.ids', len(nuevos), resultado='aceptado')
+        if nuevos:
+            self.callback(nuevos)
+        return len(nuevos)
+
+    def _manejador(self):
+        receptor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def _responder(self, codigo, datos):
+                cuerpo = json.dumps(datos).encode()
+                self.send_response(codigo)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_POST(self):
+                if self.path != RUTA_ALBARANES:
+                    return self._responder(404, {'error': 'ruta desconocida'})
+                if not receptor.secreto_valido(self.headers.get('X-Webhook-Secret')):
+                    metricas.incrementar('webhook.rechazadas', motivo='secreto')
+                    return self._responder(401, {'error': 'secreto inválido'})
+                try:
+                    longitud = int(self.headers.get('Content-Length') or 0)
+                except ValueError:
+                    longitud = 0
+                if longitud <= 0 or longitud > MAX_CUERPO:
+                    return self._responder(400, {'error': 'cuerpo vacío o demasiado grande'})
+                try:
+                    aceptados = receptor.recibir(self.rfile.read(longitud))
+                except ValueError as e:
+                    metricas.incrementar('webhook.rechazadas', motivo='formato')
+                    return self._responder(400, {'error': str(e)})
+                self._responder(202, {'aceptados': aceptados})
+
+            def do_GET(self):
+                if self.path != RUTA_FRESCURA:
+                    return self._responder(404, {'error': 'ruta desconocida'})
+                if not receptor.secreto_valido(self.headers.get('X-Webhook-Secret')):
+                    return self._responder(401, {'error': 'secreto inválido'})
+                self._responder(200, frescura.resumen_todos())
+
+            def log_message(self, formato, *args):
+                logging.debug("Webhook %s - %s", self.address_string(), formato % args)
+
+        return Manejador
+
+    def iniciar(self):
+        """Arranca el servidor en un hilo de fondo. Devuelve False si no se pudo abrir el puerto."""
+        if not self.secreto:
+            logging.error("WEBHOOK_SECRETO no está configurado; el receptor de notificaciones no se inicia.")
+            return False
+        try:
+            self.servidor = ThreadingHTTPServer((self.host, self.puerto), self._manejador())
+        except OSError as e:
+            logging.error(f"No se pudo abrir el receptor de notificaciones en {self.host}:{self.puerto}: {e}")
+            return False
+        threading.Thread(target=self.servidor.serve_forever, name='webhook', daemon=True).start()
+        logging.info(f"Receptor de notificaciones escuchando en {self.host}:{self.puerto}{RUTA_ALBARANES}")
+        return True
+
+    def detener(self):
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+            self.servidor = None
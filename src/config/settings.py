@@ -14,6 +14,97 @@ class Config:
     ODOO_USERNAME = os.getenv('ODOO_USERNAME')
     ODOO_PASSWORD = os.getenv('ODOO_PASSWORD')
 
+    # Política de llamadas a Odoo: plazos, reintentos, circuit breaker y lecturas duplicadas
+    ODOO_TIMEOUT_LECTURA = float(os.getenv('ODOO_TIMEOUT_LECTURA', 30))
+    ODOO_TIMEOUT_ESCRITURA = float(os.getenv('ODOO_TIMEOUT_ESCRITURA', 120))
+    ODOO_MAX_REINTENTOS = int(os.getenv('ODOO_MAX_REINTENTOS', 3))
+    ODOO_BACKOFF_BASE_SEG = float(os.getenv('ODOO_BACKOFF_BASE_SEG', 0.5))
+    ODOO_BACKOFF_MAX_SEG = float(os.getenv('ODOO_BACKOFF_MAX_SEG', 10))
+    ODOO_PRESUPUESTO_REINTENTOS = float(os.getenv('ODOO_PRESUPUESTO_REINTENTOS', 0.2))
+    ODOO_CB_FALLOS = int(os.getenv('ODOO_CB_FALLOS', 5))
+    ODOO_CB_ESPERA_SEG = float(os.getenv('ODOO_CB_ESPERA_SEG', 30))
+    ODOO_HEDGE_SEG = float(os.getenv('ODOO_HEDGE_SEG', 0))  # 0 desactiva las lecturas duplicadas
+    ODOO_SINGLE_FLIGHT_SEG = float(os.getenv('ODOO_SINGLE_FLIGHT_SEG', 0))  # Ventana de reutilización de lecturas idénticas
+
+    # Cassettes de tráfico de Odoo: '' (desactivado), 'grabar' o 'reproducir'
+    ODOO_CASSETTE_MODO = os.getenv('ODOO_CASSETTE_MODO', '').strip().lower()
+    ODOO_CASSETTE_RUTA = os.getenv('ODOO_CASSETTE_RUTA', 'cassettes')
+    ODOO_CASSETTE_VELOCIDAD = float(os.getenv('ODOO_CASSETTE_VELOCIDAD', 1))  # 1 = latencia grabada, 0 = sin espera
+
+    # Gobernador de llamadas a Odoo compartido entre los procesos del servidor (api/gobernador.py); vacío = desactivado
+    ODOO_GOBERNADOR_RUTA = os.getenv('ODOO_GOBERNADOR_RUTA', '').strip()
+    ODOO_TASAS = os.getenv('ODOO_TASAS', '')  # "modelo:metodo=llamadas_por_segundo,..."; vacío = sin límite de tasa
+    ODOO_CONCURRENCIA_MAX = int(os.getenv('ODOO_CONCURRENCIA_MAX', 8))
+    ODOO_CONCURRENCIA_MIN = int(os.getenv('ODOO_CONCURRENCIA_MIN', 1))
+    ODOO_LATENCIA_OBJETIVO_SEG = float(os.getenv('ODOO_LATENCIA_OBJETIVO_SEG', 10))
+
+    # Lectura de productos en bloques paralelos
+    ODOO_CHUNK_SIZE = int(os.getenv('ODOO_CHUNK_SIZE', 500))
+    ODOO_MAX_WORKERS = int(os.getenv('ODOO_MAX_WORKERS', 4))
+    ODOO_CHUNK_REINTENTOS = int(os.getenv('ODOO_CHUNK_REINTENTOS', 2))
+
+    # Sincronización de stock en flujo (stock_qro_processor.py)
+    # Almacenes sincronizados: "NOMBRE:location_id" separados por coma (el nombre se guarda en ProductoStockUbicacion.Ubicacion)
+    UBICACIONES = {
+        nombre.strip(): int(location_id)
+        for nombre, location_id in (par.split(':') for par in os.getenv('UBICACIONES_STOCK', 'QRA:8,CDMX:38').split(',') if par.strip())
+    }
+    STOCK_PAGINA_PRODUCTOS = int(os.getenv('STOCK_PAGINA_PRODUCTOS', 2000))
+    STOCK_COLA_ESCRITURA = int(os.getenv('STOCK_COLA_ESCRITURA', 1000))
+    STOCK_PROCESOS_RESYNC = int(os.getenv('STOCK_PROCESOS_RESYNC', 1))
+    STOCK_FRAGMENTOS_POR_PROCESO = int(os.getenv('STOCK_FRAGMENTOS_POR_PROCESO', 4))
+    # Última foto aplicada, para comparar sin releer Productos ('' la desactiva); cada N ciclos se lee MySQL completo
+    STOCK_FOTO_RUTA = os.getenv('STOCK_FOTO_RUTA', '').strip()
+    STOCK_FOTO_VERIFICAR_CICLOS = int(os.getenv('STOCK_FOTO_VERIFICAR_CICLOS', 60))
+
+    # Frescura Odoo -> MySQL: atraso (segundos) a partir del cual se avisa; 0 desactiva el aviso
+    FRESCURA_UMBRAL_SEG = float(os.getenv('FRESCURA_UMBRAL_SEG', 900))
+
+    # Catálogo de productos en memoria: segundos antes de recargarlo completo desde Productos
+    CATALOGO_REFRESCO_SEG = float(os.getenv('CATALOGO_REFRESCO_SEG', 300))
+
+    # Escritura diferida de LogsProductos
+    AUDIT_LOTE = int(os.getenv('AUDIT_LOTE', 500))
+    AUDIT_INTERVALO_SEG = float(os.getenv('AUDIT_INTERVALO_SEG', 2))
+
+    # Presupuesto de cada ciclo de sondeo; lo que no alcanza pasa al siguiente ciclo
+    CICLO_MAX_ELEMENTOS = int(os.getenv('CICLO_MAX_ELEMENTOS', 200))
+    CICLO_MAX_SEG = float(os.getenv('CICLO_MAX_SEG', 45))
+    CICLO_LOTE = int(os.getenv('CICLO_LOTE', 25))
+
+    # Reingesta histórica (backfill_processor.py)
+    BACKFILL_TRABAJADORES = int(os.getenv('BACKFILL_TRABAJADORES', 4))
+    BACKFILL_VENTANA_HORAS = float(os.getenv('BACKFILL_VENTANA_HORAS', 24))
+
+    # Huellas de contenido: omite escribir albaranes, recibos y líneas sin cambios (requiere la tabla HuellasContenido)
+    HUELLAS_ACTIVAS = os.getenv('HUELLAS_ACTIVAS', '0').strip().lower() in ('1', 'true', 'si')
+
+    # Coordinación entre nodos (GET_LOCK y arriendos en la tabla Arrendamientos)
+    COORD_ACTIVA = os.getenv('COORD_ACTIVA', '0').strip().lower() in ('1', 'true', 'si')
+    COORD_NODO = os.getenv('COORD_NODO', '')  # Vacío: hostname:pid
+    COORD_ARRIENDO_SEG = int(os.getenv('COORD_ARRIENDO_SEG', 300))
+    COORD_LOTE = int(os.getenv('COORD_LOTE', 200))  # Claves que toma un nodo por ciclo
+
+    # Unidad de trabajo en MySQL: confirmar cada N escrituras o cada T segundos
+    DB_COMMIT_CADA_N = int(os.getenv('DB_COMMIT_CADA_N', 500))
+    DB_COMMIT_CADA_SEG = float(os.getenv('DB_COMMIT_CADA_SEG', 5))
+
+    # Ingesta de albaranes: sondeo periódico y receptor de notificaciones (WEBHOOK_PUERTO=0 lo desactiva)
+    PICKING_SONDEO_SEG = float(os.getenv('PICKING_SONDEO_SEG', 60))
+    PICKING_SONDEO_WEBHOOK_SEG = float(os.getenv('PICKING_SONDEO_WEBHOOK_SEG', 600))  # Sondeo de respaldo con el receptor activo
+    WEBHOOK_PUERTO = int(os.getenv('WEBHOOK_PUERTO', 0))
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+    WEBHOOK_SECRETO = os.getenv('WEBHOOK_SECRETO', '')
+    WEBHOOK_DEDUP_SEG = float(os.getenv('WEBHOOK_DEDUP_SEG', 300))
+
+    # Cola de trabajo durable entre lectura de Odoo y escritura en MySQL (COLA_TRABAJADORES=0 la desactiva)
+    COLA_TRABAJADORES = int(os.getenv('COLA_TRABAJADORES', 0))
+    COLA_RUTA = os.getenv('COLA_RUTA', 'cola_trabajo.sqlite3')
+    COLA_MAX_INTENTOS = int(os.getenv('COLA_MAX_INTENTOS', 5))
+    COLA_BACKOFF_BASE_SEG = float(os.getenv('COLA_BACKOFF_BASE_SEG', 10))
+    COLA_BACKOFF_MAX_SEG = float(os.getenv('COLA_BACKOFF_MAX_SEG', 900))
+    COLA_ARRIENDO_SEG = float(os.getenv('COLA_ARRIENDO_SEG', 300))
+
     # Configuraciones de MySQL
     MYSQL_HOST = os.getenv('MYSQL_HOST')
     MYSQL_PORT = os.getenv('MYSQL_PORT')
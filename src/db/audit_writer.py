@@ -0,0 +1,77 @@
+# src/db/audit_writer.py
+# Escritura diferida (write-behind) de LogsProductos: acumula registros en memoria y los inserta
+# en lotes multi-fila desde un hilo en segundo plano, con su propia conexión a MySQL.
+
+import atexit
+import logging
+import threading
+import time
+from config.settings import Config
+from db.operations import DatabaseOperations
+
+class AuditWriter:
+    def __init__(self, tamano_lote=None, intervalo=None, db_operations=None):
+        self.tamano_lote = tamano_lote or Config.AUDIT_LOTE
+        self.intervalo = intervalo or Config.AUDIT_INTERVALO_SEG
+        self.db_operations = db_operations or DatabaseOperations()
+        self._buffer = []
+        self._lock_buffer = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self._despertar = threading.Event()
+        self._detenido = False
+        self._hilo = threading.Thread(target=self._ciclo, name="AuditWriter", daemon=True)
+        self._hilo.start()
+        atexit.register(self.close)
+
+    def registrar(self, ProductoID, ProductoSKUOdoo, accion, campo, valor_anterior, valor_nuevo, ubicacion=None):
+        """Agrega un registro al buffer; misma firma que DatabaseOperations.registro_logs."""
+        with self._lock_buffer:
+            self._buffer.append((ProductoID, ProductoSKUOdoo, accion, campo, valor_anterior, valor_nuevo, ubicacion))
+            lleno = len(self._buffer) >= self.tamano_lote
+        if lleno:
+            self._despertar.set()
+
+    def flush(self):
+        """Escribe de inmediato todo lo pendiente. Devuelve el número de registros escritos."""
+        with self._lock_escritura:
+            with self._lock_buffer:
+                registros, self._buffer = self._buffer, []
+            if not registros:
+                return 0
+            escritos = 0
+            try:
+                for inicio in range(0, len(registros), self.tamano_lote):
+                    lote = registros[inicio:inicio + self.tamano_lote]
+                    self.db_operations.registro_logs_multiples(lote)
+                    escritos += len(lote)
+                logging.debug("LogsProductos: %d registros escritos en lote", escritos)
+            except Exception as e:
+                # Se conservan los registros no escritos para el siguiente intento
+                with self._lock_buffer:
+                    self._buffer = registros[escritos:] + self._buffer
+                logging.error("Error al escribir LogsProductos en lote (%d pendientes): %s", len(registros) - escritos, e)
+            return escritos
+
+    def _ciclo(self):
+        """Hilo en segundo plano: escribe al llenarse el lote o al vencer el intervalo."""
+        while not self._detenido:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self.flush()
+
+    def pendientes(self):
+        """Número de registros en el buffer sin escribir."""
+        with self._lock_buffer:
+            return len(self._buffer)
+
+    def close(self):
+        """Detiene el hilo y escribe lo pendiente antes de cerrar la conexión."""
+        if self._detenido:
+            return
+        self._detenido = True
+        self._despertar.set()
+        self._hilo.join(timeout=self.intervalo + 5)
+        self.flush()
+        if self.pendientes():
+            logging.error("Se perdieron %d registros de LogsProductos al cerrar", self.pendientes())
+        self.db_operations.close()
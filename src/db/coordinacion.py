@@ -0,0 +1,120 @@
+# src/db/coordinacion.py
+# Coordinación entre nodos sobre MySQL para correr varias instancias de los procesadores sin escrituras dobles:
+# - GET_LOCK para trabajos que deben correr en un solo nodo (se libera solo si el nodo cae, al cerrarse su sesión).
+# - Arriendos por fila en la tabla Arrendamientos: cada nodo toma con FOR UPDATE SKIP LOCKED un lote de claves
+#   pendientes por un plazo; si el nodo cae, el arriendo vence y otro nodo retoma esas claves.
+#   Un arriendo terminado se deja vencer (no se borra): así otro nodo que leyó la clave como pendiente justo antes
+#   de que se confirmara no la vuelve a tomar, y un elemento que falló se reintenta al vencer su plazo.
+# Usa una conexión propia para que los arriendos se confirmen aparte de la transacción de trabajo.
+
+import os
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from config.settings import Config
+from db.connection import DatabaseConnection
+from utils.metrics import metricas
+
+PREFIJO_BLOQUEO = 'ApiOdooCM03:'
+
+_hilos = threading.local()
+
+def nodo_actual():
+    return Config.COORD_NODO or f"{socket.gethostname()}:{os.getpid()}"
+
+def coordinador_del_hilo():
+    """Un Coordinador (y su conexión) por hilo, creado bajo demanda."""
+    coordinador = getattr(_hilos, 'coordinador', None)
+    if coordinador is None:
+        coordinador = _hilos.coordinador = Coordinador()
+    return coordinador
+
+class Coordinador:
+    def __init__(self, nodo=None, db=None):
+        self.nodo = nodo or nodo_actual()
+        # Se puede recibir una conexión ya abierta (p. ej. una falsa en las pruebas)
+        if db is None:
+            db = DatabaseConnection()
+            db.connect()
+        self.db = db
+
+    def _consultar(self, query, params=None, filas=None):
+        cursor = self.db.connection.cursor()
+        try:
+            if filas is not None:
+                cursor.executemany(query, filas)
+                return []
+            cursor.execute(query, params)
+            return cursor.fetchall() if cursor.with_rows else []
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def bloqueo(self, nombre, espera=0):
+        """Bloqueo con nombre de MySQL (GET_LOCK). Produce True si este nodo lo obtuvo; False si lo tiene otro."""
+        nombre = PREFIJO_BLOQUEO + nombre
+        obtenido = False
+        try:
+            obtenido = self._consultar("SELECT GET_LOCK(%s, %s)", (nombre, espera))[0][0] == 1
+        except Exception as e:
+            logging.error(f"No se pudo solicitar el bloqueo {nombre}: {e}")
+        try:
+            yield obtenido
+        finally:
+            if obtenido:
+                try:
+                    self._consultar("SELECT RELEASE_LOCK(%s)", (nombre,))
+                except Exception as e:
+                    logging.error(f"No se pudo liberar el bloqueo {nombre}: {e}")
+
+    def arrendar(self, recurso, claves, limite=None, duracion=None):
+        """Toma hasta `limite` de las `claves` que no tenga arrendadas otro nodo, por `duracion` segundos.
+        Devuelve las claves tomadas (como texto). Varios nodos concurrentes reciben conjuntos disjuntos."""
+        claves = [str(clave) for clave in claves]
+        if not claves:
+            return []
+        limite = limite or len(claves)
+        duracion = duracion or Config.COORD_ARRIENDO_SEG
+        marcadores = ', '.join(['%s'] * len(claves))
+        conexion = self.db.connection
+        try:
+            self._consultar("DELETE FROM Arrendamientos WHERE Recurso = %s AND Vence < NOW(3) - INTERVAL 1 DAY LIMIT 1000", (recurso,))
+            # Las claves nuevas se registran como arriendos ya vencidos (libres)
+            self._consultar("INSERT IGNORE INTO Arrendamientos (Recurso, Clave, Vence) VALUES (%s, %s, '1970-01-02')",
+                            filas=[(recurso, clave) for clave in claves])
+            filas = self._consultar(
+                f"SELECT Clave FROM Arrendamientos WHERE Recurso = %s AND Clave IN ({marcadores}) AND Vence < NOW(3) "
+                f"ORDER BY Clave LIMIT %s FOR UPDATE SKIP LOCKED", (recurso, *claves, limite))
+            tomadas = [fila[0] for fila in filas]
+            if tomadas:
+                self._consultar(
+                    f"UPDATE Arrendamientos SET Nodo = %s, Vence = NOW(3) + INTERVAL %s SECOND "
+                    f"WHERE Recurso = %s AND Clave IN ({', '.join(['%s'] * len(tomadas))})",
+                    (self.nodo, duracion, recurso, *tomadas))
+            conexion.commit()
+        except Exception as e:
+            if conexion is not None:
+                conexion.rollback()
+            logging.error(f"No se pudieron arrendar claves de {recurso}: {e}")
+            return []
+        metricas.incrementar('coordinacion.arrendadas', len(tomadas), recurso=recurso)
+        if len(tomadas) < len(claves):
+            metricas.incrementar('coordinacion.omitidas', len(claves) - len(tomadas), recurso=recurso)
+        return tomadas
+
+    def liberar(self, recurso, claves):
+        """Suelta de inmediato los arriendos de este nodo, por ejemplo si el lote se abortó y debe reintentarse ya."""
+        claves = [str(clave) for clave in claves]
+        if not claves:
+            return
+        try:
+            self._consultar(
+                f"DELETE FROM Arrendamientos WHERE Recurso = %s AND Nodo = %s AND Clave IN ({', '.join(['%s'] * len(claves))})",
+                (recurso, self.nodo, *claves))
+            self.db.connection.commit()
+        except Exception as e:
+            logging.error(f"No se pudieron liberar arriendos de {recurso}: {e}")
+
+    def close(self):
+        self.db.disconnect()
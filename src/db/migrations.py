@@ -0,0 +1,141 @@
+# src/db/migrations.py
+# Aplica de forma idempotente los índices declarados en db/models.py y revisa con EXPLAIN el plan de las consultas
+# frecuentes, para detectar diferencias de esquema entre entornos antes de que lleguen a producción.
+# Uso: python src/db/migrations.py [--aplicar] [--estricto]
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import logging
+from db.connection import DatabaseConnection
+from db.models import TABLAS, COLUMNAS_STOCK_LEGADO
+from db import operations
+
+# Consultas frecuentes con parámetros de ejemplo para EXPLAIN
+CONSULTAS_CRITICAS = [
+    ('verificar_albaran_procesado', operations.SQL_ALBARAN_PROCESADO, (0,)),
+    ('verificar_recibo_procesado', operations.SQL_RECIBO_EXISTE, (0,)),
+    ('sku_en_bd', operations.SQL_SKU_EN_BD, ('',)),
+    ('select_producto', operations.SQL_PRODUCTO_POR_SKU, ('',)),
+    ('select_albaranes', operations.SQL_ALBARANES_SUPERVISADOS, (0, operations.PAGINA_ALBARANES)),
+    ('select_validaciones', operations.SQL_VALIDACIONES_ALBARAN, (0,)),
+    ('update_albarandetalle', operations.SQL_TARIMAS_DETALLE, ('', 0, 0)),
+]
+
+def indice_cubre(columnas, indices):
+    """Indica si algún índice existente empieza por `columnas` (en el mismo orden)."""
+    columnas = tuple(columnas)
+    return any(tuple(indice[:len(columnas)]) == columnas for indice in indices)
+
+def escaneos_completos(plan):
+    """Filas de un EXPLAIN que recorren la tabla completa."""
+    return [fila for fila in plan if str(fila.get('type', '')).upper() == 'ALL']
+
+class Migraciones:
+    def __init__(self, conexion=None):
+        self.db = conexion or DatabaseConnection()
+        if self.db.connection is None:
+            self.db.connect()
+
+    def _consultar(self, query, params=None):
+        cursor = self.db.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall() if cursor.with_rows else []
+        finally:
+            cursor.close()
+
+    def columnas_existentes(self, tabla):
+        filas = self._consultar(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (tabla,))
+        return {fila['COLUMN_NAME'] for fila in filas}
+
+    def indices_existentes(self, tabla):
+        """Devuelve {nombre del índice: columnas en orden}, incluida la clave primaria."""
+        filas = self._consultar(
+            "SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX", (tabla,))
+        indices = {}
+        for fila in filas:
+            indices.setdefault(fila['INDEX_NAME'], []).append(fila['COLUMN_NAME'])
+        return indices
+
+    def revisar_esquema(self, aplicar=False):
+        """Compara las tablas declaradas con la base de datos; con `aplicar`, crea los índices faltantes.
+        Devuelve la lista de problemas que quedan sin resolver."""
+        problemas = []
+        for tabla in TABLAS:
+            columnas = self.columnas_existentes(tabla.nombre)
+            if not columnas and tabla.ddl and aplicar:
+                self.crear_tabla(tabla)
+                columnas = self.columnas_existentes(tabla.nombre)
+            if not columnas:
+                problemas.append(f"La tabla {tabla.nombre} no existe")
+                continue
+            faltantes = [columna for columna in tabla.columnas if columna not in columnas]
+            if faltantes:
+                problemas.append(f"Faltan columnas en {tabla.nombre}: {faltantes}")
+
+            existentes = self.indices_existentes(tabla.nombre).values()
+            for nombre, columnas_indice in tabla.indices.items():
+                if indice_cubre(columnas_indice, existentes):
+                    continue
+                if not aplicar:
+                    problemas.append(f"Falta el índice {nombre} en {tabla.nombre}{columnas_indice}")
+                    continue
+                try:
+                    self._consultar(f"CREATE INDEX {nombre} ON {tabla.nombre} ({', '.join(columnas_indice)})")
+                    logging.info(f"Índice {nombre} creado en {tabla.nombre}{columnas_indice}")
+                except Exception as e:
+                    problemas.append(f"No se pudo crear el índice {nombre} en {tabla.nombre}: {e}")
+        return problemas
+
+    def crear_tabla(self, tabla):
+        """Crea una tabla propia del proyecto y, si es la de stock por ubicación, la llena desde las columnas heredadas."""
+        self._consultar(tabla.ddl)
+        logging.info(f"Tabla {tabla.nombre} creada")
+        if tabla.nombre == 'ProductoStockUbicacion':
+            for ubicacion, columna in COLUMNAS_STOCK_LEGADO.items():
+                self._consultar(
+                    f"INSERT IGNORE INTO ProductoStockUbicacion (ProductoID, Ubicacion, Stock) "
+                    f"SELECT ProductoID, %s, COALESCE({columna}, 0) FROM Productos", (ubicacion,))
+            self.db.commit()
+            logging.info("ProductoStockUbicacion llenada desde las columnas heredadas de Productos")
+
+    def revisar_planes(self):
+        """Ejecuta EXPLAIN sobre cada consulta crítica y devuelve las que recorren una tabla completa."""
+        problemas = []
+        for nombre, query, params in CONSULTAS_CRITICAS:
+            try:
+                plan = self._consultar("EXPLAIN " + query, params)
+            except Exception as e:
+                problemas.append(f"No se pudo revisar el plan de {nombre}: {e}")
+                continue
+            for fila in escaneos_completos(plan):
+                problemas.append(f"{nombre} recorre completa la tabla {fila.get('table')} (~{fila.get('rows')} filas)")
+        return problemas
+
+    def ejecutar(self, aplicar=False, estricto=False):
+        """Revisa esquema y planes. En modo estricto devuelve False si hay algún problema; si no, solo los advierte."""
+        problemas = self.revisar_esquema(aplicar) + self.revisar_planes()
+        for problema in problemas:
+            if estricto:
+                logging.error(problema)
+            else:
+                logging.warning(problema)
+        if not problemas:
+            logging.info("Esquema e índices al día; ninguna consulta crítica recorre tablas completas.")
+        return not (estricto and problemas)
+
+    def close(self):
+        self.db.disconnect()
+
+if __name__ == "__main__":
+    from utils.logger import configurar_logger
+    logger = configurar_logger(level=logging.INFO, log_to_file=False)
+    migraciones = Migraciones()
+    try:
+        correcto = migraciones.ejecutar(aplicar='--aplicar' in sys.argv, estricto='--estricto' in sys.argv)
+    finally:
+        migraciones.close()
+    sys.exit(0 if correcto else 1)
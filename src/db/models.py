@@ -1,3 +1,176 @@
 # src/db/models.py
 # Clases o modelos que representan las tablas de la base de datos.
+# Cada tabla declara las columnas que el código lee o escribe y los índices que necesitan sus consultas frecuentes;
+# db/migrations.py compara esta declaración con la base de datos de cada entorno.
+# ProductCatalog guarda en memoria los productos para resolver SKU -> ProductoID sin consultar MySQL fila por fila.
 
+import time
+import threading
+from array import array
+from collections import namedtuple
+
+Producto = namedtuple('Producto', ['ProductoID', 'ProductoSKUActual', 'ProductoNombre'])
+
+# Columnas heredadas de Productos que se mantienen sincronizadas con ProductoStockUbicacion
+COLUMNAS_STOCK_LEGADO = {
+    'QRA': 'StockQra',
+    'CDMX': 'StockCDMX',
+}
+
+class Tabla:
+    def __init__(self, nombre, columnas, indices=None, ddl=None):
+        self.nombre = nombre
+        self.columnas = columnas
+        self.indices = indices or {}    # nombre del índice -> columnas en orden
+        self.ddl = ddl                  # CREATE TABLE para las tablas que crea este proyecto
+
+    def __repr__(self):
+        return f"Tabla({self.nombre})"
+
+TABLAS = [
+    Tabla('Productos',
+          ['ProductoID', 'ProductoNombre', 'ProductoSKUActual', 'ProductoStock', 'StockQra', 'StockCDMX'],
+          {'idx_productos_sku': ('ProductoSKUActual',)}),           # select_producto, sku_en_bd
+    Tabla('Albaran',
+          ['AlbaranID', 'Procesado', 'AlbaranStatus', 'ProcesoConcatenacionRealizado'],
+          {'idx_albaran_status_concat': ('AlbaranStatus', 'ProcesoConcatenacionRealizado')}),  # select_albaranes
+    Tabla('AlbaranDetalle',
+          ['AlbaranID', 'ProductoID', 'TarimasConcatenadas'],
+          {'idx_albarandetalle_albaran_producto': ('AlbaranID', 'ProductoID')}),  # update_albarandetalle
+    Tabla('ValidacionT',
+          ['AlbaranID', 'TarimaID', 'ValidacionSKU'],
+          {'idx_validaciont_albaran': ('AlbaranID',)}),             # select_validaciones
+    Tabla('TarimasA',
+          ['TarimaID', 'TarimaNumero'],
+          {'idx_tarimasa_tarima': ('TarimaID',)}),                  # JOIN de select_validaciones
+    Tabla('ProductoStockUbicacion',
+          ['ProductoID', 'Ubicacion', 'Stock', 'Actualizado'],
+          {'PRIMARY': ('ProductoID', 'Ubicacion')},                 # iterar_produc_existentes, upsert de stock
+          ddl="""
+            CREATE TABLE IF NOT EXISTS ProductoStockUbicacion (
+                ProductoID INT NOT NULL,
+                Ubicacion VARCHAR(32) NOT NULL,
+                Stock DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                Actualizado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (ProductoID, Ubicacion)
+            )"""),
+    Tabla('Arrendamientos',
+          ['Recurso', 'Clave', 'Nodo', 'Vence'],
+          {'PRIMARY': ('Recurso', 'Clave')},                        # db/coordinacion.py
+          ddl="""
+            CREATE TABLE IF NOT EXISTS Arrendamientos (
+                Recurso VARCHAR(64) NOT NULL,
+                Clave VARCHAR(64) NOT NULL,
+                Nodo VARCHAR(128) NULL,
+                Vence DATETIME(3) NOT NULL,
+                PRIMARY KEY (Recurso, Clave)
+            )"""),
+    Tabla('HuellasContenido',
+          ['Entidad', 'Clave', 'Huella', 'Actualizado'],
+          {'PRIMARY': ('Entidad', 'Clave')},                        # utils/huellas.py
+          ddl="""
+            CREATE TABLE IF NOT EXISTS HuellasContenido (
+                Entidad VARCHAR(16) NOT NULL,
+                Clave BIGINT NOT NULL,
+                Huella BINARY(16) NOT NULL,
+                Actualizado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (Entidad, Clave)
+            )"""),
+    Tabla('Recibos', ['ReciboID']),
+    Tabla('LogsProductos', ['ProductoID', 'ProductoSKU', 'Accion', 'Campo', 'ValorAnterior', 'ValorNuevo', 'Ubicacion']),
+]
+
+class ProductCatalog:
+    """Catálogo compacto de Productos: columnas paralelas (array de ids, listas de SKU y nombre) con índices
+    SKU -> posición e id -> posición, en lugar de un dict por fila. Una sola instancia por proceso (CATALOGO).
+    Las columnas y los índices se leen y se cambian siempre bajo el lock: una recarga los reemplaza juntos."""
+    __slots__ = ('ids', 'skus', 'nombres', '_por_sku', '_por_id', '_lock', 'cargado_en')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.skus = []
+        self.nombres = []
+        self._por_sku = {}
+        self._por_id = {}
+        self._lock = threading.RLock()
+        self.cargado_en = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._por_id)
+
+    def vigente(self, max_edad):
+        return self.cargado_en is not None and time.monotonic() - self.cargado_en < max_edad
+
+    def asegurar(self, cargador, max_edad):
+        """Carga el catálogo con `cargador()` (iterable de (ProductoID, SKU, Nombre)) si nunca se cargó o ya venció.
+        Un solo hilo carga; los demás esperan y usan el resultado."""
+        if self.vigente(max_edad):
+            return
+        with self._lock:
+            if not self.vigente(max_edad):
+                self.cargar(cargador())
+
+    def cargar(self, filas):
+        """Reemplaza todo el contenido con las filas (ProductoID, SKU, Nombre)."""
+        ids, skus, nombres, por_sku, por_id = array('q'), [], [], {}, {}
+        for ProductoID, sku, nombre in filas:
+            por_id[ProductoID] = len(ids)
+            if sku:
+                por_sku.setdefault(sku, len(ids))
+            ids.append(ProductoID)
+            skus.append(sku)
+            nombres.append(nombre)
+        with self._lock:
+            self.ids, self.skus, self.nombres, self._por_sku, self._por_id = ids, skus, nombres, por_sku, por_id
+            self.cargado_en = time.monotonic()
+
+    def anotar(self, ProductoID, sku, nombre=None):
+        """Agrega o corrige un producto leído de MySQL (refresco puntual de un id)."""
+        with self._lock:
+            self.olvidar(ProductoID)
+            # Las posiciones olvidadas quedan como huecos; si superan a las vigentes se compactan las columnas
+            if len(self.ids) - len(self._por_id) > max(1024, len(self._por_id)):
+                self._compactar()
+            self._por_id[ProductoID] = len(self.ids)
+            if sku:
+                self._por_sku[sku] = len(self.ids)
+            self.ids.append(ProductoID)
+            self.skus.append(sku)
+            self.nombres.append(nombre)
+
+    def _compactar(self):
+        """Reconstruye las columnas solo con las posiciones vigentes; se llama con el lock tomado."""
+        nuevas = {}
+        ids, skus, nombres = array('q'), [], []
+        for posicion in sorted(self._por_id.values()):
+            nuevas[posicion] = len(ids)
+            ids.append(self.ids[posicion])
+            skus.append(self.skus[posicion])
+            nombres.append(self.nombres[posicion])
+        self._por_id = {ProductoID: nuevas[posicion] for ProductoID, posicion in self._por_id.items()}
+        self._por_sku = {sku: nuevas[posicion] for sku, posicion in self._por_sku.items() if posicion in nuevas}
+        self.ids, self.skus, self.nombres = ids, skus, nombres
+
+    def olvidar(self, ProductoID=None, sku=None):
+        """Invalida un producto que acaba de cambiar; la próxima búsqueda lo vuelve a leer de MySQL."""
+        with self._lock:
+            posicion = self._por_id.pop(ProductoID, None)
+            if posicion is not None and self._por_sku.get(self.skus[posicion]) == posicion:
+                del self._por_sku[self.skus[posicion]]
+            if sku is not None:
+                self._por_sku.pop(sku, None)
+
+    def id_por_sku(self, sku):
+        with self._lock:
+            posicion = self._por_sku.get(sku)
+            return None if posicion is None else self.ids[posicion]
+
+    def producto(self, ProductoID):
+        with self._lock:
+            posicion = self._por_id.get(ProductoID)
+            if posicion is None:
+                return None
+            return Producto(self.ids[posicion], self.skus[posicion], self.nombres[posicion])
+
+CATALOGO = ProductCatalog()
@@ -1,18 +1,107 @@
 # src/db/operations.py
 # Operaciones (consultas, actualizaciones, etc) sobre la base de datos
 
+import time
 import logging
+from collections import namedtuple, defaultdict
+from itertools import groupby
+from operator import itemgetter
+from contextlib import contextmanager
 from datetime import datetime
 from db.connection import DatabaseConnection
+from db.plan_cambios import es_lectura
+from db.unidad_trabajo import UnidadDeTrabajo
+from db.models import COLUMNAS_STOCK_LEGADO, CATALOGO
+from config.settings import Config
+from utils.contadores import registrar_sql, registrar_commit
+from utils.frescura import frescura, marca_odoo
+from utils.helpers import dividir_en_bloques
 from mysql.connector import Error
 
+# Registro compacto de un producto para las lecturas en flujo; Stock es {ubicacion: cantidad}
+FilaProducto = namedtuple('FilaProducto', ['ProductoID', 'ProductoSKUActual', 'ProductoNombre', 'Stock'])
+
+# Consultas frecuentes: db/migrations.py revisa su plan de ejecución con EXPLAIN
+SQL_ALBARAN_PROCESADO = "SELECT Procesado FROM Albaran WHERE AlbaranID = %s"
+SQL_RECIBO_EXISTE = "SELECT COUNT(*) FROM Recibos WHERE ReciboID = %s"
+SQL_SKU_EN_BD = "SELECT 1 FROM Productos WHERE ProductoSKUActual = %s LIMIT 1"
+SQL_PRODUCTO_POR_SKU = "SELECT ProductoID FROM Productos WHERE ProductoSKUActual = %s LIMIT 1"
+SQL_ALBARANES_SUPERVISADOS = "SELECT AlbaranID FROM Albaran WHERE AlbaranStatus = 'Supervisado' AND ProcesoConcatenacionRealizado = 0 AND AlbaranID > %s ORDER BY AlbaranID LIMIT %s"
+PAGINA_ALBARANES = 1000
+SQL_VALIDACIONES_ALBARAN = "SELECT ta.TarimaNumero, vt.ValidacionSKU, COUNT(*) AS CantidadValidaciones FROM ValidacionT vt JOIN TarimasA ta ON vt.TarimaID = ta.TarimaID WHERE vt.AlbaranID = %s GROUP BY ta.TarimaNumero, vt.ValidacionSKU"
+SQL_TARIMAS_DETALLE = "UPDATE AlbaranDetalle SET TarimasConcatenadas = %s WHERE AlbaranID = %s AND ProductoID = %s"
+SQL_UPSERT_HUELLA = "INSERT INTO HuellasContenido (Entidad, Clave, Huella) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE Huella = VALUES(Huella)"
+SQL_UPSERT_STOCK = "INSERT INTO ProductoStockUbicacion (ProductoID, Ubicacion, Stock) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE Stock = VALUES(Stock)"
+
 class DatabaseOperations:
-    def __init__(self):
-        self.db_connection = DatabaseConnection()
-        self.db_connection.connect()
+    def __init__(self, db_connection=None):
+        # Se puede recibir una conexión ya abierta (p. ej. una falsa en las pruebas)
+        if db_connection is None:
+            db_connection = DatabaseConnection()
+            db_connection.connect()
+        self.db_connection = db_connection
+        self.plan = None
+        self.unidad = None
+        self.errores = 0        # escrituras o consultas fallidas desde que se abrió la conexión
+        self.frescura_pendiente = []    # (procesador, marca de Odoo) de elementos escritos y aún sin confirmar
+        self._preparadas = {}   # consulta -> cursor con su sentencia preparada en el servidor
+
+    def activar_simulacion(self, plan):
+        """Modo simulación: las lecturas se ejecutan y las escrituras solo se registran en `plan`."""
+        self.plan = plan
+
+    def unidad_de_trabajo(self, cada_n=None, cada_seg=None, confirmar_si_falla=False):
+        """Agrupa las operaciones del bloque `with` en una transacción que se confirma cada N escrituras o T segundos."""
+        return UnidadDeTrabajo(self, cada_n, cada_seg, confirmar_si_falla)
+
+    @contextmanager
+    def elemento(self, descripcion=''):
+        """Escrituras atómicas de un elemento: con una unidad de trabajo activa usa un savepoint; si no, una transacción propia."""
+        if self.unidad is not None:
+            with self.unidad.elemento(descripcion):
+                yield
+        else:
+            with self.unidad_de_trabajo() as unidad, unidad.elemento(descripcion):
+                yield
+
+    def _commit(self):
+        """Confirma la escritura, o la deja pendiente si hay una unidad de trabajo activa. Al simular no hay nada que confirmar."""
+        if self.plan is not None:
+            return
+        if self.unidad is not None:
+            self.unidad.anotar_escritura()
+        else:
+            self.db_connection.connection.commit()
+            registrar_commit()
+
+    def anotar_frescura(self, procesador, fecha):
+        """Anota un elemento escrito con su fecha de Odoo (o el registro leído); el atraso se mide al confirmarse."""
+        if self.plan is not None:
+            return
+        marca = marca_odoo(fecha)
+        if marca is None:
+            return
+        self.frescura_pendiente.append((procesador, marca))
+        if self.unidad is None:
+            # Sin unidad de trabajo cada escritura ya se confirmó
+            self.confirmar_frescura()
+
+    def confirmar_frescura(self):
+        """Lo llama la confirmación de la transacción: observa el atraso de lo anotado."""
+        anotados, self.frescura_pendiente = self.frescura_pendiente, []
+        por_procesador = defaultdict(list)
+        for procesador, marca in anotados:
+            por_procesador[procesador].append(marca)
+        for procesador, marcas in por_procesador.items():
+            frescura.observar(procesador, marcas)
 
     def execute(self, query, params=None, proc=False):
         """Ejecuta consultas SQL o procedimientos almacenados en la base de datos."""
+        if self.plan is not None and (proc or not es_lectura(query)):
+            self.plan.registrar(query, params, proc)
+            return None
+        inicio = time.monotonic()
+        registrar_sql()
         cursor = self.db_connection.connection.cursor(dictionary=True)
         try:
             #logging.info(f"Ejecutando consulta: {query} con parámetros: {params}")
@@ -24,28 +113,147 @@ class DatabaseOperations:
             else:
                 # Ejecuta una consulta SQL
                 cursor.execute(query, params)
+                if not cursor.with_rows:
+                    return cursor.rowcount  # Escritura: la confirma el llamador
                 result = cursor.fetchall()  # Si es una consulta, devuelve los resultados
                 #logging.info(f"Consulta SQL ejecutada correctamente, resultados obtenidos: {result}")
                 return result
-            self.db_connection.connection.commit()  # Confirma la transacción
+            self._commit()  # Confirma la transacción
         except Error as e:
             logging.error(f"Error ejecutando la operación: {e}")
+            self.errores += 1
+            if self.unidad is not None:
+                self.unidad.marcar_error(e)
             return None
         finally:
             cursor.close()
-            
+            if self.plan is not None:
+                self.plan.registrar_lectura(time.monotonic() - inicio)
+
+    def executemany(self, query, filas):
+        """Ejecuta una escritura para varias filas (INSERT multi-fila en el conector). No confirma; lo hace el llamador."""
+        if not filas:
+            return 0
+        if self.plan is not None:
+            self.plan.registrar(query, filas[0], filas=len(filas))
+            return 0
+        registrar_sql()
+        cursor = self.db_connection.connection.cursor()
+        try:
+            cursor.executemany(query, filas)
+            return cursor.rowcount
+        except Error as e:
+            logging.error(f"Error ejecutando la operación en bloque: {e}")
+            self.errores += 1
+            if self.unidad is not None:
+                self.unidad.marcar_error(e)
+            return None
+        finally:
+            cursor.close()
+
+    def consulta_preparada(self, query, params):
+        """Ejecuta una consulta parametrizada frecuente reutilizando su sentencia preparada en el servidor.
+        Devuelve una lista de tuplas, o None si falla. El cursor se reutiliza mientras se le pase el mismo objeto `query`."""
+        inicio = time.monotonic()
+        registrar_sql()
+        cursor = self._preparadas.get(query)
+        try:
+            if cursor is None:
+                cursor = self.db_connection.connection.cursor(prepared=True)
+                self._preparadas[query] = cursor
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except Error as e:
+            logging.error(f"Error ejecutando la consulta preparada: {e}")
+            self.errores += 1
+            # Un cursor que falló se descarta; la siguiente llamada prepara la sentencia de nuevo
+            descartado = self._preparadas.pop(query, None)
+            if descartado is not None:
+                try:
+                    descartado.close()
+                except Error:
+                    pass
+            return None
+        finally:
+            if self.plan is not None:
+                self.plan.registrar_lectura(time.monotonic() - inicio)
+
+    def stream(self, query, params=None, tamano_lote=1000, registro=None):
+        """Recorre el resultado de una consulta con un cursor sin búfer en una conexión propia, por lotes de `tamano_lote`.
+        Produce tuplas, o instancias de `registro` (un namedtuple) si se indica; la memoria no crece con el resultado."""
+        inicio = time.monotonic()
+        registrar_sql()
+        conexion = DatabaseConnection()
+        conexion.connect()
+        cursor = conexion.connection.cursor(buffered=False)
+        try:
+            cursor.execute(query, params)
+            while True:
+                filas = cursor.fetchmany(tamano_lote)
+                if not filas:
+                    break
+                if registro is None:
+                    yield from filas
+                else:
+                    yield from map(registro._make, filas)
+        finally:
+            try:
+                cursor.close()
+            except Error:
+                pass  # Si se dejó de leer antes del final, las filas restantes se descartan con la conexión
+            conexion.disconnect()
+            if self.plan is not None:
+                self.plan.registrar_lectura(time.monotonic() - inicio)
+
 # Para albaranes_processor.py
     def verificar_albaran_procesado(self, albaran_id):
         """Verifica si el albarán ya ha sido procesado."""
         try:
-            result = self.execute("SELECT Procesado FROM Albaran WHERE AlbaranID = %s", (albaran_id,))
+            result = self.consulta_preparada(SQL_ALBARAN_PROCESADO, (albaran_id,))
             if result:
-                return result[0]['Procesado'] == 1  # Si el albarán está marcado como procesado
+                return result[0][0] == 1  # Si el albarán está marcado como procesado
             return False
         except Exception as e:
             logging.error(f"Error verificando albarán procesado: {e}")
             return False
 
+    def albaranes_procesados(self, albaran_ids):
+        """Devuelve el conjunto de AlbaranID ya procesados entre los indicados, en una sola consulta."""
+        if not albaran_ids:
+            return set()
+        try:
+            marcadores = ', '.join(['%s'] * len(albaran_ids))
+            result = self.execute(f"SELECT AlbaranID FROM Albaran WHERE Procesado = 1 AND AlbaranID IN ({marcadores})", tuple(albaran_ids))
+            return {row['AlbaranID'] for row in result or []}
+        except Exception as e:
+            logging.error(f"Error verificando albaranes procesados: {e}")
+            return set()
+
+    def huellas_guardadas(self, claves_por_entidad):
+        """Huellas {(entidad, clave): huella} guardadas para {entidad: [claves]}, en una consulta por cada 1000 claves.
+        Devuelve None si HUELLAS_ACTIVAS está desactivado; un error devuelve {} y todo se vuelve a escribir."""
+        if not Config.HUELLAS_ACTIVAS:
+            return None
+        pares = [(entidad, int(clave)) for entidad, claves in claves_por_entidad.items() for clave in claves]
+        guardadas = {}
+        for bloque in dividir_en_bloques(pares, 1000):
+            por_entidad = {}
+            for entidad, clave in bloque:
+                por_entidad.setdefault(entidad, []).append(clave)
+            condiciones = ' OR '.join(f"(Entidad = %s AND Clave IN ({', '.join(['%s'] * len(claves))}))" for claves in por_entidad.values())
+            params = [valor for entidad, claves in por_entidad.items() for valor in (entidad, *claves)]
+            result = self.execute(f"SELECT Entidad, Clave, Huella FROM HuellasContenido WHERE {condiciones}", tuple(params))
+            for row in result or []:
+                guardadas[(row['Entidad'], row['Clave'])] = bytes(row['Huella'])
+        return guardadas
+
+    def guardar_huellas(self, nuevas):
+        """Guarda [(entidad, clave, huella)] en la misma transacción que las escrituras que representan."""
+        if not nuevas:
+            return
+        self.executemany(SQL_UPSERT_HUELLA, nuevas)
+        self._commit()
+
     def insertar_o_actualizar_albaran(self, albaran_id, fecha_creacion, cliente, albaran_folio):
         """Llama al procedimiento almacenado para insertar o actualizar un albarán."""
         try:
@@ -77,13 +285,19 @@ class DatabaseOperations:
         """Marca el albarán como procesado en la base de datos."""
         try:
             self.execute("UPDATE Albaran SET Procesado = 1 WHERE AlbaranID = %s", (albaran_id,))
-            self.db_connection.connection.commit()
+            self._commit()
             logging.info(f"Albarán {albaran_id} marcado como procesado.")
         except Exception as e:
             logging.error(f"Error al marcar el albarán {albaran_id} como procesado: {e}")
 
     def close(self):
         """Cierra la conexión con la base de datos."""
+        for cursor in self._preparadas.values():
+            try:
+                cursor.close()
+            except Error:
+                pass
+        self._preparadas.clear()
         if self.db_connection.connection and self.db_connection.connection.is_connected():
             self.db_connection.connection.close()  # Cierra la conexión
             logging.info("Conexión cerrada exitosamente.")
@@ -94,14 +308,26 @@ class DatabaseOperations:
     def verificar_recibo_procesado(self, recibo_id):
         """Verifica si el recibo ya ha sido procesado."""
         try:
-            procesado = self.execute("SELECT COUNT(*) FROM Recibos WHERE ReciboID = %s", (recibo_id,))
-            if procesado[0]['COUNT(*)'] > 0:
+            procesado = self.consulta_preparada(SQL_RECIBO_EXISTE, (recibo_id,))
+            if procesado[0][0] > 0:
                 logging.info(f"El reciboID: {recibo_id} ya existe en la base de datos. Saltando procesamiento")  # Si el albarán está marcado como procesado
                 return True
             return False
         except Exception as e:
             logging.error(f"Error verificando albarán procesado: {e}")
 
+    def recibos_procesados(self, recibo_ids):
+        """Devuelve el conjunto de ReciboID ya registrados entre los indicados, en una sola consulta."""
+        if not recibo_ids:
+            return set()
+        try:
+            marcadores = ', '.join(['%s'] * len(recibo_ids))
+            result = self.execute(f"SELECT ReciboID FROM Recibos WHERE ReciboID IN ({marcadores})", tuple(recibo_ids))
+            return {row['ReciboID'] for row in result or []}
+        except Exception as e:
+            logging.error(f"Error verificando recibos procesados: {e}")
+            return set()
+
     def insertar_o_actualizar_recibo(self, recibo_id, fecha_creacion, partner_name, recibo_data):
         """Inserta o Actualiza el recibo en la base de datos"""
         try:
@@ -123,58 +349,103 @@ class DatabaseOperations:
 
 # Para stock_cedis_processor.py
     def sku_en_bd(self, sku_actual):
-        """Verifica si el producto con el SKU proporcionado ya existe en la base de datos."""
+        """Verifica si el producto con el SKU proporcionado ya existe en la base de datos (vía el catálogo en memoria)."""
+        return bool(self.select_producto(sku_actual))
+
+    def catalogo(self):
+        """Catálogo de productos compartido por el proceso; se carga la primera vez y se recarga cada CATALOGO_REFRESCO_SEG."""
+        cargador = lambda: self.stream("SELECT ProductoID, ProductoSKUActual, ProductoNombre FROM Productos ORDER BY ProductoID", tamano_lote=5000)
         try:
-            result = self.execute("SELECT ProductoID FROM Productos WHERE ProductoSKUActual = %s", (sku_actual,))
-            return len(result) > 0  # Verificar si hay resultados
+            CATALOGO.asegurar(cargador, Config.CATALOGO_REFRESCO_SEG)
+            if CATALOGO.cargado_en is not None:
+                return CATALOGO
         except Exception as e:
-            logging.error(f"Error al verificar existencia de producto: {e}")
-            return False
+            logging.error("Error al cargar el catálogo de productos: %s", e)
+        return None
   
-    def actualizar_producto(self, producto_id, producto_nombre, stock_total, stock_qra, stock_cdmx, sku_actual):
-        """Actualiza la información del producto en la base de datos."""
+    def actualizar_producto(self, producto_id, producto_nombre, stock_total, sku_actual):
+        """Actualiza la información del producto en la base de datos; el stock por ubicación va en actualizar_stock_ubicaciones."""
         try:
             query_update = """
                 UPDATE Productos
-                SET ProductoID = %s, ProductoNombre = %s, ProductoStock = %s, StockQra = %s, StockCDMX = %s
+                SET ProductoID = %s, ProductoNombre = %s, ProductoStock = %s
                 WHERE ProductoSKUActual = %s
             """
-            self.execute(query_update, (producto_id, producto_nombre, stock_total, stock_qra, stock_cdmx, sku_actual))
-            self.db_connection.connection.commit()
-            logging.info(f"Producto actualizado en la BD: SKU={sku_actual}, StockTotal={stock_total}, StockQra={stock_qra}, StockCDMX={stock_cdmx}")
+            self.execute(query_update, (producto_id, producto_nombre, stock_total, sku_actual))
+            self._commit()
+            self._olvidar_producto(producto_id, sku_actual)
+            logging.info(f"Producto actualizado en la BD: SKU={sku_actual}, StockTotal={stock_total}")
         except Exception as e:
             logging.error(f"Error al actualizar producto en la base de datos: {e}")
         
-    def insertar_producto(self, producto_id, producto_nombre, sku_actual, stock_total, stock_qra, stock_cdmx):
-        """Inserta un nuevo producto en la base de datos."""
+    def insertar_producto(self, producto_id, producto_nombre, sku_actual, stock_total):
+        """Inserta un nuevo producto en la base de datos; el stock por ubicación va en actualizar_stock_ubicaciones."""
         try:
             query_insert = """
-                INSERT INTO Productos (ProductoID, ProductoNombre, ProductoSKUActual, ProductoStock, StockQra, StockCDMX)
-                VALUES (%s, %s, %s, %s, %s, %s)
+                INSERT INTO Productos (ProductoID, ProductoNombre, ProductoSKUActual, ProductoStock)
+                VALUES (%s, %s, %s, %s)
             """
-            self.execute(query_insert, (producto_id, producto_nombre, sku_actual, stock_total, stock_qra, stock_cdmx))
-            self.db_connection.connection.commit()
-            logging.info(f"Producto insertado en la BD: ProductoID={producto_id}, SKU={sku_actual}, StockTotal={stock_total}, StockQro={stock_qra}, StockCDMX={stock_cdmx}")
+            self.execute(query_insert, (producto_id, producto_nombre, sku_actual, stock_total))
+            self._commit()
+            self._olvidar_producto(producto_id, sku_actual)
+            logging.info(f"Producto insertado en la BD: ProductoID={producto_id}, SKU={sku_actual}, StockTotal={stock_total}")
         except Exception as e:
             logging.error(f"Error al insertar producto en la base de datos: {e}")
 
 # Para stock_qro_processor.py
     def obtener_produc_existentes(self):
+        """Devuelve {ProductoID: FilaProducto} leyendo Productos en flujo."""
         try:
             logging.debug("Ejecutando consulta  de productos existentes en MySQL")
-            query = "SELECT ProductoID, ProductoSKUActual, ProductoNombre, StockQra, StockCDMX FROM Productos"
-            rows = self.execute(query)
-            logging.debug("Productos obtenidos: %s", rows)
-            return {row['ProductoID']: row for row in rows} if rows else {}
+            return {fila.ProductoID: fila for fila in self.iterar_produc_existentes()}
         except Exception as e:
             logging.error("Error al obtener productos existentes: %s", e)
             return {}
-        
+
+    def iterar_produc_existentes(self, tamano_lote=1000, desde_id=0, hasta_id=None):
+        """Recorre Productos en orden de ProductoID como FilaProducto con su stock por ubicación, sin cargar la tabla en memoria.
+        Con `desde_id`/`hasta_id` se limita al rango (desde_id, hasta_id].
+        Usa una conexión propia para que las escrituras puedan seguir en la conexión principal."""
+        query = ("SELECT p.ProductoID, p.ProductoSKUActual, p.ProductoNombre, s.Ubicacion, s.Stock FROM Productos p "
+                 "LEFT JOIN ProductoStockUbicacion s ON s.ProductoID = p.ProductoID WHERE p.ProductoID > %s")
+        params = [desde_id]
+        if hasta_id is not None:
+            query += " AND p.ProductoID <= %s"
+            params.append(hasta_id)
+        filas = self.stream(query + " ORDER BY p.ProductoID", params, tamano_lote)
+        for ProductoID, grupo in groupby(filas, key=itemgetter(0)):
+            grupo = list(grupo)
+            yield FilaProducto(ProductoID, grupo[0][1], grupo[0][2], {fila[3]: fila[4] for fila in grupo if fila[3] is not None})
+
+    def tabla_existe(self, tabla):
+        """Indica si la tabla existe en la base de datos actual; None si no se pudo consultar."""
+        result = self.execute("SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s LIMIT 1", (tabla,))
+        return None if result is None else bool(result)
+
+    def hay_productos(self):
+        """Indica si Productos tiene al menos una fila."""
+        result = self.execute("SELECT 1 FROM Productos LIMIT 1")
+        return bool(result)
+
+    def marca_stock(self):
+        """Resumen barato de Productos y ProductoStockUbicacion para detectar cambios hechos fuera de la sincronización:
+        (filas de stock, última modificación de stock, filas de productos, ProductoID máximo). None si falla."""
+        result = self.execute(
+            "SELECT (SELECT COUNT(*) FROM ProductoStockUbicacion) AS filas_stock, "
+            "(SELECT COALESCE(UNIX_TIMESTAMP(MAX(Actualizado)), 0) FROM ProductoStockUbicacion) AS actualizado, "
+            "(SELECT COUNT(*) FROM Productos) AS filas_productos, "
+            "(SELECT COALESCE(MAX(ProductoID), 0) FROM Productos) AS id_maximo")
+        if not result:
+            return None
+        fila = result[0]
+        return tuple(int(fila[columna]) for columna in ('filas_stock', 'actualizado', 'filas_productos', 'id_maximo'))
+
     def insertar_produc_ubicaciones(self, ProductoID, ProductoNombreOdoo, ProductoSKUOdoo):
         """Inserta un nuevo producto"""
         try:
             self.execute("INSERT INTO Productos (ProductoID, ProductoNombre, ProductoSKUActual) VALUES (%s, %s, %s)", (ProductoID, ProductoNombreOdoo, ProductoSKUOdoo))
-            self.db_connection.connection.commit()
+            self._commit()
+            self._olvidar_producto(ProductoID, ProductoSKUOdoo)
         except Exception as e:
             logging.error("Error al insertar producto: %s", e)
             return {}
@@ -183,7 +454,7 @@ class DatabaseOperations:
         """Actualiza el ProductoNombre"""
         try:
             self.execute("UPDATE Productos SET ProductoNombre = %s WHERE ProductoID = %s", (ProductoNombreOdoo, ProductoID))
-            self.db_connection.connection.commit()
+            self._commit()
         except Exception as e:
             logging.error("Error al obtener productos existentes: %s", e)
             return {}
@@ -192,52 +463,100 @@ class DatabaseOperations:
         """Actualiza el ProductoSKUActual"""
         try:
             self.execute("UPDATE Productos SET ProductoSKUActual = %s WHERE ProductoID = %s", (ProductoSKUOdoo, ProductoID))
-            self.db_connection.connection.commit()
+            self._commit()
+            self._olvidar_producto(ProductoID, ProductoSKUOdoo)
         except Exception as e:
             logging.error("Error al obtener productos existentes: %s", e)
             return {}
 
+    def _olvidar_producto(self, ProductoID, sku):
+        """Invalida en el catálogo un producto que se acaba de escribir (no aplica en simulación, donde no se escribe)."""
+        if self.plan is None:
+            CATALOGO.olvidar(ProductoID, sku)
+
     def actualizar_produc_stock(self, location_name, stock_new, ProductoID):
+        self.actualizar_stock_ubicaciones([(ProductoID, location_name, stock_new)])
+
+    def actualizar_stock_ubicaciones(self, filas):
+        """Upsert en bloque de [(ProductoID, ubicacion, stock)] en ProductoStockUbicacion.
+        Las ubicaciones con columna heredada en Productos (StockQra, StockCDMX) se copian también ahí."""
+        if not filas:
+            return
         try:
-            self.execute(f"UPDATE Productos SET Stock{location_name} = %s WHERE ProductoID = %s", (stock_new, ProductoID))
-            self.db_connection.connection.commit()
+            self.executemany(SQL_UPSERT_STOCK, filas)
+            for ubicacion, columna in COLUMNAS_STOCK_LEGADO.items():
+                legado = [(stock, ProductoID) for ProductoID, ubicacion_fila, stock in filas if ubicacion_fila == ubicacion]
+                if legado:
+                    self.executemany(f"UPDATE Productos SET {columna} = %s WHERE ProductoID = %s", legado)
+            self._commit()
         except Exception as e:
-            logging.error("Error al obtener productos existentes: %s", e)
-            return {}
+            logging.error("Error al actualizar el stock por ubicación: %s", e)
         
     def registro_logs (self, ProductoID, ProductoSKUOdoo, accion, campo, valor_anterior, valor_nuevo, ubicacion=None):
         """Registra en LogsProductos los cambios realizados en stock_qro_processor"""
         sql_query = self.execute("INSERT INTO LogsProductos (ProductoID, ProductoSKU, Accion, Campo, ValorAnterior, ValorNuevo, Ubicacion) VALUES (%s, %s, %s, %s, %s, %s, %s)", (ProductoID, ProductoSKUOdoo, accion, campo, valor_anterior, valor_nuevo, ubicacion))
         logging.debug(f"Ejecutando SQL: {sql_query}")
-        self.db_connection.connection.commit()
+        self._commit()
+
+    def registro_logs_multiples(self, registros):
+        """Inserta varios registros de LogsProductos en una sola sentencia multi-fila y confirma."""
+        if not registros:
+            return
+        query = "INSERT INTO LogsProductos (ProductoID, ProductoSKU, Accion, Campo, ValorAnterior, ValorNuevo, Ubicacion) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+        if self.plan is not None:
+            self.plan.registrar(query, registros[0], filas=len(registros))
+            return
+        registrar_sql()
+        cursor = self.db_connection.connection.cursor()
+        try:
+            cursor.executemany(query, registros)
+            self._commit()
+        finally:
+            cursor.close()
         
 # Para tarimas_processor.py  
     def select_albaranes(self):
+        """Todos los albaranes supervisados sin concatenar, paginados por AlbaranID: el planificador ordena el atraso completo."""
         try:
-            return self.execute("SELECT AlbaranID FROM Albaran WHERE AlbaranStatus = 'Supervisado' AND ProcesoConcatenacionRealizado = 0 LIMIT 1000")
+            albaranes = []
+            while True:
+                pagina = self.execute(SQL_ALBARANES_SUPERVISADOS, (albaranes[-1]['AlbaranID'] if albaranes else 0, PAGINA_ALBARANES))
+                if not pagina:
+                    break
+                albaranes.extend(pagina)
+                if len(pagina) < PAGINA_ALBARANES:
+                    break
+            return albaranes
         except Exception as e:
             logging.error("Error al obtener albaranes existentes: %s", e)
             return {}
         
     def select_validaciones(self, albaran_id):
         try:
-            return self.execute("SELECT ta.TarimaNumero, vt.ValidacionSKU, COUNT(*) AS CantidadValidaciones FROM ValidacionT vt JOIN TarimasA ta ON vt.TarimaID = ta.TarimaID WHERE vt.AlbaranID = %s GROUP BY ta.TarimaNumero, vt.ValidacionSKU", (albaran_id,))
+            return self.execute(SQL_VALIDACIONES_ALBARAN, (albaran_id,))
         except Exception as e:
             logging.error("Error al obtener validaciones agrupadas: %s", e)
             return {}
         
     def select_producto(self, sku_actual):
+        """ProductoID del SKU desde el catálogo en memoria; si no está, se consulta MySQL y se anota en el catálogo."""
+        catalogo = self.catalogo()
+        producto_id = catalogo.id_por_sku(sku_actual) if catalogo is not None else None
+        if producto_id is not None:
+            return {'ProductoID': producto_id}
         try:
-            result = self.execute("SELECT ProductoID FROM Productos WHERE ProductoSKUActual = %s LIMIT 1", (sku_actual, ))
-            return result[0] if result else None
+            result = self.consulta_preparada(SQL_PRODUCTO_POR_SKU, (sku_actual, ))
+            if result and catalogo is not None:
+                catalogo.anotar(result[0][0], sku_actual)
+            return {'ProductoID': result[0][0]} if result else None
         except Exception as e:
             logging.error("Error al obtener producto: %s", e)
             return {}
         
     def update_albarandetalle(self, concatenado, albaran_id, producto_id):
         try:
-            self.execute("UPDATE AlbaranDetalle SET TarimasConcatenadas = %s WHERE AlbaranID = %s AND ProductoID = %s", (concatenado, albaran_id, producto_id, ))
-            self.db_connection.connection.commit()
+            self.execute(SQL_TARIMAS_DETALLE, (concatenado, albaran_id, producto_id, ))
+            self._commit()
             logging.info(f"Actualizado AlbaranDetalle para ProductoID: {producto_id} con Tarimas: {concatenado}")
         except Exception as e:
             logging.error("Error al actualizar albaran detalle: %s", e)
@@ -246,7 +565,7 @@ class DatabaseOperations:
     def update_albaranstatus(self, albaran_id):
         try:
             self.execute("UPDATE Albaran SET ProcesoConcatenacionRealizado = 1 WHERE AlbaranID = %s", (albaran_id, ))
-            self.db_connection.connection.commit()
+            self._commit()
             logging.info(f"AlbaranID {albaran_id} marcado como procesado.")
         except Exception as e:
             logging.error("Error al actualizar albaran como procesado: %s", e)
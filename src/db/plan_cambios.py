@@ -0,0 +1,89 @@
+# src/db/plan_cambios.py
+# Plan de cambios para el modo de simulación (dry-run): registra las escrituras que un procesador
+# haría en MySQL sin ejecutarlas, junto con los tiempos de la fase de lectura.
+
+import logging
+import re
+import time
+from collections import defaultdict
+
+# Tabla que escribe cada procedimiento almacenado
+PROCEDIMIENTOS_TABLAS = {
+    'InsertOrUpdateAlbaranTest': 'Albaran',
+    'InsertOrUpdateAlbaranDetalle': 'AlbaranDetalle',
+    'InsertOrUpdateRecibo': 'Recibos',
+    'InsertOrUpdateReciboDetalle': 'ReciboDetalle',
+}
+
+_SENTENCIA_ESCRITURA = re.compile(r'^\s*(INSERT\s+INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?', re.IGNORECASE)
+
+def es_lectura(query):
+    """Indica si la sentencia SQL solo lee datos."""
+    return re.match(r'^\s*(SELECT|SHOW|EXPLAIN|DESCRIBE|WITH)\b', query, re.IGNORECASE) is not None
+
+def tabla_y_operacion(query, proc=False):
+    """Devuelve (tabla, operacion) de una escritura: para procedimientos, la operación es CALL."""
+    if proc:
+        return PROCEDIMIENTOS_TABLAS.get(query, query), 'CALL'
+    coincidencia = _SENTENCIA_ESCRITURA.match(query)
+    if not coincidencia:
+        return 'desconocida', query.split(None, 1)[0].upper() if query.strip() else '?'
+    return coincidencia.group(2), coincidencia.group(1).split()[0].upper()
+
+class PlanCambios:
+    def __init__(self, max_muestras=5):
+        self.max_muestras = max_muestras
+        self.filas = defaultdict(int)           # (tabla, operacion) -> filas afectadas previstas
+        self.sentencias = defaultdict(int)      # (tabla, operacion) -> sentencias previstas
+        self.muestras = defaultdict(list)       # tabla -> primeros parámetros
+        self.lecturas_sql = 0
+        self.segundos_lectura_sql = 0.0
+        self.fases = defaultdict(float)
+        self.inicio = time.monotonic()
+
+    def registrar(self, query, params=None, proc=False, filas=1):
+        """Registra una escritura prevista (una sentencia que afecta `filas` filas)."""
+        tabla, operacion = tabla_y_operacion(query, proc)
+        self.filas[(tabla, operacion)] += filas
+        self.sentencias[(tabla, operacion)] += 1
+        if len(self.muestras[tabla]) < self.max_muestras:
+            self.muestras[tabla].append({'operacion': operacion, 'params': params})
+
+    def registrar_lectura(self, segundos):
+        """Acumula el tiempo de una lectura SQL real."""
+        self.lecturas_sql += 1
+        self.segundos_lectura_sql += segundos
+
+    def agregar_fase(self, fase, segundos):
+        self.fases[fase] += segundos
+
+    def reporte(self):
+        """Resumen compacto: filas y sentencias por tabla, muestras y tiempos de lectura."""
+        por_tabla = defaultdict(dict)
+        for (tabla, operacion), filas in sorted(self.filas.items()):
+            por_tabla[tabla][operacion] = filas
+        return {
+            'filas_por_tabla': dict(por_tabla),
+            'sentencias_estimadas': sum(self.sentencias.values()),
+            'muestras': dict(self.muestras),
+            'lecturas_sql': self.lecturas_sql,
+            'segundos_lectura_sql': round(self.segundos_lectura_sql, 3),
+            'fases_segundos': {fase: round(segundos, 3) for fase, segundos in self.fases.items()},
+            'segundos_totales': round(time.monotonic() - self.inicio, 3),
+        }
+
+    def registrar_en_log(self):
+        """Escribe el reporte en el log y lo devuelve."""
+        reporte = self.reporte()
+        logging.info("=== Plan de cambios (simulación, no se escribió nada) ===")
+        for tabla, operaciones in reporte['filas_por_tabla'].items():
+            logging.info("  %s: %s", tabla, ", ".join(f"{operacion}={filas}" for operacion, filas in operaciones.items()))
+        logging.info("  Sentencias estimadas: %d", reporte['sentencias_estimadas'])
+        logging.info("  Lecturas SQL: %d (%.3f s)", reporte['lecturas_sql'], reporte['segundos_lectura_sql'])
+        for fase, segundos in reporte['fases_segundos'].items():
+            logging.info("  Fase %s: %.3f s", fase, segundos)
+        logging.info("  Tiempo total: %.3f s", reporte['segundos_totales'])
+        for tabla, muestras in reporte['muestras'].items():
+            for muestra in muestras:
+                logging.info("  Muestra %s: %s", tabla, muestra)
+        return reporte
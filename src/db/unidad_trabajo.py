@@ -0,0 +1,128 @@
+# src/db/unidad_trabajo.py
+# Unidad de trabajo sobre una instancia de DatabaseOperations: agrupa muchas operaciones en una sola transacción,
+# confirma cada N escrituras o cada T segundos y deshace con un savepoint solo los elementos que fallan.
+
+import time
+import logging
+from contextlib import contextmanager
+from config.settings import Config
+from utils.metrics import metricas
+from utils.contadores import registrar_sql, registrar_commit
+
+class ErrorElemento(Exception):
+    """Una sentencia del elemento falló y sus escrituras se deshicieron."""
+
+class UnidadDeTrabajo:
+    def __init__(self, operaciones, cada_n=None, cada_seg=None, confirmar_si_falla=False):
+        self.operaciones = operaciones
+        self.cada_n = cada_n or Config.DB_COMMIT_CADA_N
+        self.cada_seg = cada_seg if cada_seg is not None else Config.DB_COMMIT_CADA_SEG
+        # Si es True, una excepción confirma lo ya escrito en lugar de deshacerlo (escrituras independientes e idempotentes)
+        self.confirmar_si_falla = confirmar_si_falla
+        self.pendientes = 0         # escrituras sin confirmar
+        self.en_elemento = False
+        self.error = None           # primer error de SQL dentro del elemento en curso
+        self.confirmaciones = 0
+        self.elementos_deshechos = 0
+        self.ultima_confirmacion = time.monotonic()
+
+    def __enter__(self):
+        if self.operaciones.unidad is not None:
+            raise RuntimeError("Ya hay una unidad de trabajo activa en esta conexión")
+        self.operaciones.unidad = self
+        self.ultima_confirmacion = time.monotonic()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.operaciones.unidad = None
+        if tipo is None or self.confirmar_si_falla:
+            self.confirmar()
+        else:
+            logging.error(f"Unidad de trabajo deshecha por error: {valor}")
+            self.deshacer()
+        logging.debug(f"Unidad de trabajo terminada: {self.confirmaciones} confirmaciones, {self.elementos_deshechos} elementos deshechos.")
+        return False
+
+    def _conexion(self):
+        return self.operaciones.db_connection.connection
+
+    def _sentencia(self, sql):
+        """Ejecuta una sentencia de control de la transacción; en simulación no hace nada."""
+        if self.operaciones.plan is not None:
+            return
+        registrar_sql()
+        cursor = self._conexion().cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+
+    def anotar_escritura(self):
+        """Lo llama DatabaseOperations en lugar de confirmar cada escritura."""
+        self.pendientes += 1
+        if not self.en_elemento:
+            self.confirmar_si_corresponde()
+
+    def marcar_error(self, error):
+        if self.en_elemento and self.error is None:
+            self.error = error
+
+    def confirmar_si_corresponde(self):
+        """Confirma al llegar a `cada_n` escrituras pendientes o al pasar `cada_seg` segundos desde la última confirmación."""
+        if self.pendientes >= self.cada_n or (self.pendientes and time.monotonic() - self.ultima_confirmacion >= self.cada_seg):
+            self.confirmar()
+
+    def confirmar(self):
+        if self.pendientes and self.operaciones.plan is None:
+            self._conexion().commit()
+            registrar_commit()
+            self.confirmaciones += 1
+            metricas.incrementar('bd.commits')
+        self.operaciones.confirmar_frescura()
+        self.pendientes = 0
+        self.ultima_confirmacion = time.monotonic()
+
+    def deshacer(self):
+        if self.operaciones.plan is None:
+            self._conexion().rollback()
+        self.operaciones.frescura_pendiente.clear()
+        self.pendientes = 0
+
+    @contextmanager
+    def elemento(self, descripcion=''):
+        """Elemento atómico dentro de la unidad (un albarán, un recibo...). Si lanza una excepción o alguna de sus
+        sentencias falla, se deshacen solo sus escrituras con ROLLBACK TO SAVEPOINT y se lanza la excepción."""
+        if self.en_elemento:
+            # Un elemento anidado forma parte del elemento exterior
+            yield self
+            return
+        pendientes_antes = self.pendientes
+        anotados_antes = len(self.operaciones.frescura_pendiente)
+        self._sentencia("SAVEPOINT elemento")
+        self.en_elemento = True
+        self.error = None
+        try:
+            yield self
+            if self.error is not None:
+                raise ErrorElemento(f"Falló una sentencia de {descripcion}: {self.error}")
+        except Exception:
+            self._deshacer_elemento(descripcion, pendientes_antes, anotados_antes)
+            raise
+        else:
+            self._sentencia("RELEASE SAVEPOINT elemento")
+        finally:
+            self.en_elemento = False
+            self.error = None
+        self.confirmar_si_corresponde()
+
+    def _deshacer_elemento(self, descripcion, pendientes_antes, anotados_antes):
+        try:
+            self._sentencia("ROLLBACK TO SAVEPOINT elemento")
+        except Exception as e:
+            # Un procedimiento que confirma por su cuenta elimina el savepoint
+            logging.error(f"No se pudo deshacer {descripcion} hasta su savepoint: {e}")
+        self.pendientes = pendientes_antes
+        del self.operaciones.frescura_pendiente[anotados_antes:]
+        self.elementos_deshechos += 1
+        metricas.incrementar('bd.elementos_deshechos')
+        logging.warning(f"Escrituras de {descripcion} deshechas.")
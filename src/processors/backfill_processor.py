@@ -0,0 +1,172 @@
+# src/processors/backfill_processor.py
+# Reingesta histórica de recibos y albaranes en un rango de fechas (por ejemplo, lo que se perdió durante una caída).
+# El rango se divide en ventanas que se procesan en paralelo; cada ventana lee de Odoo por lotes, escribe en una
+# unidad de trabajo con su propia conexión a MySQL y omite lo ya registrado, así que puede correr junto a los
+# procesadores en vivo y repetirse sin duplicar.
+# Uso: python src/processors/backfill_processor.py --desde 2024-05-01 --hasta 2024-06-01 [--tipo recibos|albaranes|todos]
+#      [--ventana-horas 24] [--trabajadores 4] [--revisar]
+# Con --revisar (y HUELLAS_ACTIVAS) también se recorren los ya registrados y se reescribe solo lo que cambió en Odoo.
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import time
+import argparse
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from config.settings import Config
+from utils.logger import configurar_logger
+from utils.helpers import dividir_en_bloques
+from utils.metrics import metricas
+from api.dominios import combinar_dominios_or
+from db.operations import DatabaseOperations
+from processors.picking_ingestion_processor import PickingIngestionProcessor, CAMPOS_PICKING
+from processors.recibos_processor import RecibosCM03Processor
+
+FORMATO_ODOO = '%Y-%m-%d %H:%M:%S'
+# En el histórico los albaranes pueden estar ya terminados, no solo asignados
+ESTADOS_HISTORICOS = ['assigned', 'done']
+
+def ventanas(desde, hasta, horas):
+    """Divide [desde, hasta) en ventanas consecutivas de `horas` horas."""
+    paso = timedelta(hours=horas)
+    resultado = []
+    inicio = desde
+    while inicio < hasta:
+        resultado.append((inicio, min(inicio + paso, hasta)))
+        inicio += paso
+    return resultado
+
+def dominio_historico(reglas, inicio, fin):
+    """OR de los dominios de las reglas, sin exigir el estado 'assigned', acotado a la fecha de creación [inicio, fin)."""
+    dominios = []
+    for regla in reglas:
+        dominio = [condicion for condicion in regla['dominio'] if condicion[0] != 'state']
+        dominios.append(dominio + [('state', 'in', ESTADOS_HISTORICOS)])
+    return [('create_date', '>=', inicio.strftime(FORMATO_ODOO)), ('create_date', '<', fin.strftime(FORMATO_ODOO))] + combinar_dominios_or(dominios)
+
+class BackfillProcessor:
+    def __init__(self, tipos, trabajadores=None, revisar=False):
+        self.recibos = RecibosCM03Processor() if 'recibos' in tipos else None
+        self.albaranes = PickingIngestionProcessor() if 'albaranes' in tipos else None
+        self.trabajadores = trabajadores or Config.BACKFILL_TRABAJADORES
+        self.revisar = revisar
+
+    def backfill_recibos(self, inicio, fin, db_operations):
+        procesador = self.recibos
+        recibo_ids = procesador.odoo_operations.buscar_recibos(inicio.strftime(FORMATO_ODOO), fin.strftime(FORMATO_ODOO))
+        if recibo_ids is None:
+            raise RuntimeError("No se pudieron buscar recibos en Odoo")
+        escritos = 0
+        for lote in dividir_en_bloques(recibo_ids, Config.ODOO_CHUNK_SIZE):
+            with db_operations.unidad_de_trabajo():
+                escritos += procesador.escribir_lote_recibos(lote, db_operations, self.revisar)
+        return len(recibo_ids), escritos
+
+    def backfill_albaranes(self, inicio, fin, db_operations):
+        procesador = self.albaranes
+        albaranes = procesador.odoo_operations.buscar_pickings(dominio_historico(procesador.reglas, inicio, fin), CAMPOS_PICKING)
+        if albaranes is None:
+            raise RuntimeError("No se pudieron buscar albaranes en Odoo")
+        escritos = 0
+        incompletos = []
+        for lote in dividir_en_bloques(albaranes, Config.ODOO_CHUNK_SIZE):
+            procesados = db_operations.albaranes_procesados([albaran['id'] for albaran in lote])
+            pendientes = [albaran for albaran in lote if (self.revisar or albaran['id'] not in procesados) and not procesador.excluido(albaran, None)]
+            # Mismo recurso de arriendo que el procesador en vivo: con COORD_ACTIVA no escriben ambos el mismo albarán
+            with procesador.arriendos(procesador.tipo_trabajo, [albaran['id'] for albaran in pendientes]) as tomados:
+                tomados = set(tomados)
+                pendientes = [albaran for albaran in pendientes if albaran['id'] in tomados]
+                lineas_data = procesador.odoo_operations.leer_lineas([linea_id for albaran in pendientes for linea_id in albaran['move_ids']])
+                huellas = procesador.huellas_lote(pendientes, db_operations)
+                with db_operations.unidad_de_trabajo():
+                    for albaran_data in pendientes:
+                        # Si falló la lectura de alguna de sus líneas, el albarán no se escribe ni se marca procesado
+                        if procesador.lineas_faltantes(albaran_data, lineas_data):
+                            incompletos.append(albaran_data['id'])
+                            continue
+                        try:
+                            with db_operations.elemento(f"albarán {albaran_data['id']}"):
+                                escrito = procesador.escribir_albaran(albaran_data, lineas_data, procesador.regla_para(albaran_data), db_operations,
+                                                                      huellas, procesado=albaran_data['id'] in procesados)
+                            if escrito:
+                                escritos += 1
+                        except Exception as e:
+                            logging.error(f"Error al reingestar albarán {albaran_data['id']}: {e}")
+        if incompletos:
+            # Lo demás ya quedó escrito; al repetir la ventana se omite y solo se reintentan estos
+            raise RuntimeError(f"{len(incompletos)} albaranes con líneas sin leer de Odoo ({incompletos[:10]}); repita la ventana")
+        return len(albaranes), escritos
+
+    def procesar_ventana(self, inicio, fin):
+        """Una ventana con su propia conexión a MySQL. Devuelve {tipo: (leídos, escritos)}."""
+        db_operations = DatabaseOperations()
+        try:
+            resultado = {}
+            if self.recibos is not None:
+                resultado['recibos'] = self.backfill_recibos(inicio, fin, db_operations)
+            if self.albaranes is not None:
+                resultado['albaranes'] = self.backfill_albaranes(inicio, fin, db_operations)
+            return resultado
+        finally:
+            db_operations.close()
+
+    def ejecutar(self, desde, hasta, horas=None):
+        """Procesa el rango en paralelo y reporta avance y rendimiento. Devuelve (totales, ventanas fallidas)."""
+        lista = ventanas(desde, hasta, horas or Config.BACKFILL_VENTANA_HORAS)
+        logging.info(f"Backfill de {desde:%Y-%m-%d %H:%M} a {hasta:%Y-%m-%d %H:%M}: {len(lista)} ventanas, {self.trabajadores} en paralelo.")
+        totales = Counter()
+        fallidas = []
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.trabajadores) as executor:
+            futuros = {executor.submit(self.procesar_ventana, a, b): (a, b) for a, b in lista}
+            for terminadas, futuro in enumerate(as_completed(futuros), 1):
+                a, b = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    fallidas.append((a, b))
+                    logging.error(f"Ventana {a:%Y-%m-%d %H:%M} - {b:%Y-%m-%d %H:%M} fallida: {e}")
+                    continue
+                for tipo, (leidos, escritos) in resultado.items():
+                    totales[f'{tipo}_leidos'] += leidos
+                    totales[f'{tipo}_escritos'] += escritos
+                    metricas.incrementar('backfill.escritos', escritos, tipo=tipo)
+                transcurrido = time.monotonic() - inicio
+                leidos = sum(valor for clave, valor in totales.items() if clave.endswith('_leidos'))
+                logging.info(f"Ventana {a:%Y-%m-%d %H:%M} - {b:%Y-%m-%d %H:%M} lista ({terminadas}/{len(lista)}): {resultado}. "
+                             f"Acumulado: {dict(totales)}, {leidos / transcurrido:.1f} registros/s")
+        logging.info(f"Backfill terminado en {time.monotonic() - inicio:.1f} s: {dict(totales)}")
+        if fallidas:
+            logging.warning("Ventanas por repetir: " + ', '.join(f"{a:%Y-%m-%d %H:%M}/{b:%Y-%m-%d %H:%M}" for a, b in fallidas))
+        return totales, fallidas
+
+    def close_connections(self):
+        for procesador in (self.recibos, self.albaranes):
+            if procesador is not None:
+                procesador.close_connections()
+
+def fecha(texto):
+    return datetime.strptime(texto, '%Y-%m-%d')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reingesta histórica de recibos y albaranes por rango de fechas.")
+    parser.add_argument('--desde', type=fecha, required=True, help="Fecha inicial (YYYY-MM-DD), incluida")
+    parser.add_argument('--hasta', type=fecha, required=True, help="Fecha final (YYYY-MM-DD), excluida")
+    parser.add_argument('--tipo', choices=['recibos', 'albaranes', 'todos'], default='todos')
+    parser.add_argument('--ventana-horas', type=float, default=None)
+    parser.add_argument('--trabajadores', type=int, default=None)
+    parser.add_argument('--revisar', action='store_true', help="Revisar también lo ya registrado y reescribir solo lo que cambió")
+    argumentos = parser.parse_args()
+
+    logger = configurar_logger(level=logging.INFO, log_to_file=False)
+    tipos = ['recibos', 'albaranes'] if argumentos.tipo == 'todos' else [argumentos.tipo]
+    processor = BackfillProcessor(tipos, argumentos.trabajadores, argumentos.revisar)
+    try:
+        _, fallidas = processor.ejecutar(argumentos.desde, argumentos.hasta, argumentos.ventana_horas)
+    finally:
+        processor.close_connections()
+    sys.exit(1 if fallidas else 0)
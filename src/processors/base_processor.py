@@ -2,7 +2,17 @@
 
 from api.odoo_client import OdooClient
 from db.connection import DatabaseConnection
+from db.operations import DatabaseOperations
+from db.plan_cambios import PlanCambios
+from utils.metrics import metricas
+from utils.contadores import contar_llamadas
+from config.settings import Config
+from db.coordinacion import coordinador_del_hilo
+from contextlib import contextmanager
+import os
+import time
 import logging
+import threading
 
 class BaseProcessor:
     def __init__(self):
@@ -19,5 +29,89 @@ class BaseProcessor:
         logging.info("Cerrando conexiones en BaseProcessor")
         self.db.disconnect()
     
+    def odoo_disponible(self):
+        """Indica si se puede consultar Odoo; mientras el circuit breaker esté abierto se pausa el sondeo."""
+        metricas.reportar_si_corresponde()
+        if self.odoo.disponible():
+            return True
+        logging.warning("Odoo no disponible (circuit breaker abierto); se omite este ciclo.")
+        return False
+
+    def operaciones_bd(self):
+        """Instancias de DatabaseOperations que escriben durante un ciclo."""
+        return [self.db_operations]
+
+    @contextmanager
+    def arriendos(self, recurso, claves, limite=None):
+        """Con COORD_ACTIVA, produce solo las claves que este nodo arrendó; si no (o al simular), todas.
+        Al terminar bien, los arriendos se dejan vencer; si el bloque lanza una excepción, se liberan de inmediato."""
+        claves = list(claves)
+        if not Config.COORD_ACTIVA or self.db_operations.plan is not None:
+            yield claves
+            return
+        coordinador = coordinador_del_hilo()
+        tomadas = set(coordinador.arrendar(recurso, claves, limite or Config.COORD_LOTE))
+        try:
+            yield [clave for clave in claves if str(clave) in tomadas]
+        except BaseException:
+            coordinador.liberar(recurso, tomadas)
+            raise
+
+    def ciclo(self):
+        raise NotImplementedError("Debe implementar el metodo ciclo en la subclase")
+
+    def simular(self):
+        """Ejecuta un ciclo completo (lecturas y comparación) sin escribir en MySQL y reporta el plan de cambios."""
+        plan = PlanCambios()
+        for operaciones in self.operaciones_bd():
+            operaciones.activar_simulacion(plan)
+        segundos_odoo = metricas.total('rpc.segundos')
+        try:
+            with contar_llamadas(self.__class__.__name__) as contador:
+                self.ciclo()
+            logging.info(f"Llamadas del ciclo simulado: {contador.resumen()}")
+        finally:
+            plan.agregar_fase('odoo', metricas.total('rpc.segundos') - segundos_odoo)
+            for operaciones in self.operaciones_bd():
+                operaciones.activar_simulacion(None)
+        return plan.registrar_en_log()
+
+    def simular_si_se_solicita(self, argv):
+        """Si la línea de comandos incluye --dry-run, ejecuta la simulación y devuelve True."""
+        if '--dry-run' not in argv:
+            return False
+        self.simular()
+        self.close_connections()
+        return True
+
+    def iniciar_trabajadores(self, cola, tipo, funcion, cantidad):
+        """Arranca `cantidad` hilos que consumen de `cola` los trabajos de `tipo`, cada uno con su propia conexión a MySQL.
+        `funcion(trabajo, db_operations)` debe lanzar una excepción para que el trabajo se reintente."""
+        for numero in range(cantidad):
+            nombre = f"{self.__class__.__name__}-{os.getpid()}-{numero}"
+            threading.Thread(target=self._trabajador, args=(cola, tipo, funcion, nombre), name=nombre, daemon=True).start()
+        logging.info(f"{cantidad} trabajadores consumiendo la cola {tipo}.")
+
+    def _trabajador(self, cola, tipo, funcion, nombre):
+        db_operations = DatabaseOperations()
+        while True:
+            try:
+                if not self.odoo.disponible():
+                    time.sleep(5)
+                    continue
+                trabajos = cola.arrendar(tipo, nombre)
+                if not trabajos:
+                    time.sleep(1)
+                    continue
+                for trabajo in trabajos:
+                    try:
+                        funcion(trabajo, db_operations)
+                        cola.confirmar(trabajo)
+                    except Exception as e:
+                        cola.fallar(trabajo, e)
+            except Exception as e:
+                logging.error(f"Error en el trabajador {nombre}: {e}")
+                time.sleep(5)
+
     def run(self):
         raise NotImplementedError("Debe implementar el metodo run en la subclase")
\ No newline at end of file
@@ -0,0 +1,343 @@
+# src/processors/picking_ingestion_processor.py
+# Motor único de ingesta de albaranes (órdenes de entrega y transferencias internas) desde Odoo hacia Albaran/AlbaranDetalle.
+# Las reglas en REGLAS_PICKING declaran qué albaranes se ingieren; cada ciclo hace una sola búsqueda en Odoo
+# combinando todas las reglas con OR y despacha cada albarán a la regla que le corresponde.
+# Con WEBHOOK_PUERTO configurado, además recibe notificaciones de Odoo y procesa esos albaranes al momento;
+# el sondeo queda como respaldo con un intervalo más largo.
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import time
+import queue
+import logging
+from config.settings import Config
+from utils.logger import configurar_logger
+from processors.base_processor import BaseProcessor
+from api.odoo_operations import OdooOperations
+from api.dominios import combinar_dominios_or, coincide_dominio
+from api.webhook import ReceptorWebhook
+from utils.cola_trabajo import ColaTrabajo
+from utils.planificador import PlanificadorCiclo
+from utils.frescura import frescura
+from utils.huellas import RegistroHuellas, ALBARAN, ALBARAN_LINEA
+from db.operations import DatabaseOperations
+
+# Reglas de ingesta: dominio en Odoo, prefijos de folio excluidos y tablas destino
+REGLAS_PICKING = [
+    {
+        'nombre': 'ordenes_entrega',
+        'dominio': [('state', '=', 'assigned'), ('name', 'like', 'WH/OUT/%')],
+        'excluir_prefijos': ['CDMX/'],
+        'tablas': ['Albaran', 'AlbaranDetalle'],
+    },
+    {
+        'nombre': 'transferencias_tcdmx',
+        'dominio': [('priority', '=', 1), ('name', 'like', 'WH/TCDMX%')],
+        'excluir_prefijos': ['CDMX/'],
+        'tablas': ['Albaran', 'AlbaranDetalle'],
+    },
+    {
+        'nombre': 'transferencias_int',
+        'dominio': [('priority', '=', 1), ('state', '=', 'assigned'), ('name', 'like', 'WH/INT%')],
+        'excluir_prefijos': ['CDMX/'],
+        'tablas': ['Albaran', 'AlbaranDetalle'],
+    },
+]
+
+CAMPOS_PICKING = ['id', 'partner_id', 'create_date', 'write_date', 'name', 'move_ids', 'priority', 'state']
+
+class PickingIngestionProcessor(BaseProcessor):
+    def __init__(self, reglas=None, albaranes_especificos=None):
+        super().__init__()
+        self.reglas = reglas or REGLAS_PICKING
+        self.albaranes_especificos = albaranes_especificos or ['']
+        self.dominio = combinar_dominios_or([regla['dominio'] for regla in self.reglas])
+        self.notificaciones = queue.Queue()
+        self.receptor = None
+
+        # Con trabajadores configurados, la lectura encola albaranes y la escritura los consume de una cola durable
+        self.cola = ColaTrabajo() if Config.COLA_TRABAJADORES > 0 else None
+        self.tipo_trabajo = f"albaran:{self.__class__.__name__}"
+        self.planificador = PlanificadorCiclo(self.__class__.__name__)
+
+        # Inicializando las operaciones Odoo y BD
+        self.odoo_operations = OdooOperations(self.odoo)
+        self.db_operations = DatabaseOperations()
+        logging.info(f"{self.__class__.__name__} inicializado con reglas: {[regla['nombre'] for regla in self.reglas]}")
+
+    def regla_para(self, albaran_data):
+        """Devuelve la primera regla cuyo dominio coincide con el albarán, o None."""
+        for regla in self.reglas:
+            if coincide_dominio(albaran_data, regla['dominio']):
+                return regla
+        return None
+
+    def excluido(self, albaran_data, regla):
+        """Indica si el folio del albarán empieza con un prefijo excluido por la regla (o por cualquier regla si no hay)."""
+        reglas = [regla] if regla else self.reglas
+        return any(albaran_data['name'].startswith(prefijo) for r in reglas for prefijo in r.get('excluir_prefijos', []))
+
+    def buscar_albaranes(self):
+        """Una sola búsqueda en Odoo con el OR de todas las reglas; devuelve los datos completos de cada albarán."""
+        albaranes = self.odoo_operations.buscar_pickings(self.dominio, CAMPOS_PICKING)
+        if albaranes is None:
+            raise RuntimeError("No se pudo consultar albaranes en Odoo")
+        return albaranes
+
+    def huellas_lote(self, albaranes, db_operations=None):
+        """Huellas guardadas de los albaranes y sus líneas, en bloque (None si HUELLAS_ACTIVAS está desactivado)."""
+        db_operations = db_operations or self.db_operations
+        return db_operations.huellas_guardadas({
+            ALBARAN: [albaran_data['id'] for albaran_data in albaranes],
+            ALBARAN_LINEA: [linea_id for albaran_data in albaranes for linea_id in albaran_data['move_ids']],
+        })
+
+    def lineas_faltantes(self, albaran_data, lineas_data):
+        """Líneas del albarán que no llegaron de Odoo (p. ej. porque falló la lectura de su bloque)."""
+        return [linea_id for linea_id in albaran_data['move_ids'] if linea_id not in lineas_data]
+
+    def escribir_albaran(self, albaran_data, lineas_data, regla=None, db_operations=None, huellas=None, procesado=False):
+        """Inserta o actualiza la cabecera y las líneas del albarán y lo marca como procesado.
+        Con las `huellas` del lote se omiten la cabecera y las líneas que no cambiaron; si el albarán ya estaba
+        `procesado` y nada cambió, no se escribe nada. Devuelve True si escribió algo."""
+        db_operations = db_operations or self.db_operations
+        albaran_id = albaran_data['id']
+        albaran_folio = albaran_data['name']
+        # Solucion [ERROR] Error al procesar albaran 28531: 'bool' object is not subscriptable
+        cliente = albaran_data['partner_id'][1] if albaran_data['partner_id'] else 'Cliente no definido'
+        fecha_creacion = albaran_data['create_date']
+        logging.info(f"Detalles del albaran: Folio={albaran_folio}, Cliente={cliente}, Regla={regla['nombre'] if regla else 'especifico'}")
+
+        registro = RegistroHuellas(huellas)
+        if registro.cambio(ALBARAN, albaran_id, [fecha_creacion, cliente, albaran_folio]):
+            db_operations.insertar_o_actualizar_albaran(albaran_id, fecha_creacion, cliente, albaran_folio)
+        for linea_id in albaran_data['move_ids']:
+            linea_data = lineas_data.get(linea_id)
+            if not linea_data:
+                logging.warning(f"Datos de linea no encontrado para la linea {linea_id}")
+                continue
+            valores = [albaran_id, linea_data['product_id'][0], linea_data['product_uom_qty'], linea_data['location_dest_id'][1]]
+            if registro.cambio(ALBARAN_LINEA, linea_id, valores):
+                db_operations.insertar_detalle_albaran(linea_id, *valores)
+        escrito = huellas is None or bool(registro.nuevas)
+        if escrito or not procesado:
+            db_operations.marcar_albaran_como_procesado(albaran_id)
+        db_operations.guardar_huellas(registro.nuevas)
+        return escrito
+
+    def usar_cola(self):
+        """La cola se usa si está configurada y no se está simulando."""
+        return self.cola is not None and self.db_operations.plan is None
+
+    def filtrar_pendientes(self, albaranes, exigir_regla=False):
+        """Devuelve [(albaran_data, regla)] de los albaranes no excluidos ni procesados, con una sola consulta a MySQL.
+        Con `exigir_regla` se omiten los albaranes que no coinciden con ninguna regla de este procesador."""
+        procesados = self.db_operations.albaranes_procesados([albaran['id'] for albaran in albaranes])
+        pendientes = []
+        for albaran_data in albaranes:
+            regla = self.regla_para(albaran_data)
+            if exigir_regla and regla is None:
+                logging.debug(f"Albarán {albaran_data['name']} no coincide con las reglas de este procesador.")
+                continue
+            if self.excluido(albaran_data, regla):
+                logging.info(f"Omitiendo albaran con folio {albaran_data['name']}")
+                continue
+            if albaran_data['id'] in procesados:
+                logging.debug(f"Albarán {albaran_data['id']} ya ha sido procesado.")
+                continue
+            pendientes.append((albaran_data, regla))
+        return pendientes
+
+    def procesar_albaranes(self, albaranes, exigir_regla=False):
+        """Procesa un lote de albaranes ya leídos: una consulta de procesados y una lectura de líneas en bloque."""
+        return self.escribir_pendientes(self.filtrar_pendientes(albaranes, exigir_regla))
+
+    def escribir_pendientes(self, pendientes):
+        """Encola o escribe [(albaran_data, regla)] ya filtrados. Devuelve cuántos se despacharon."""
+        if not pendientes:
+            return 0
+        if self.usar_cola():
+            for albaran_data, _ in pendientes:
+                self.cola.encolar(self.tipo_trabajo, albaran_data['id'], {'albaran': albaran_data})
+            return len(pendientes)
+
+        # Con varios nodos, cada uno escribe solo los albaranes que logró arrendar
+        with self.arriendos(self.tipo_trabajo, [albaran_data['id'] for albaran_data, _ in pendientes]) as tomados:
+            tomados = set(tomados)
+            pendientes = [(albaran_data, regla) for albaran_data, regla in pendientes if albaran_data['id'] in tomados]
+            if not pendientes:
+                return 0
+            lineas_data = self.odoo_operations.leer_lineas([linea_id for albaran_data, _ in pendientes for linea_id in albaran_data['move_ids']])
+            huellas = self.huellas_lote([albaran_data for albaran_data, _ in pendientes])
+            # Una transacción para el lote; cada albarán se escribe completo o se deshace con su savepoint
+            with self.db_operations.unidad_de_trabajo():
+                for albaran_data, regla in pendientes:
+                    start_time = time.time()
+                    try:
+                        with self.db_operations.elemento(f"albarán {albaran_data['id']}"):
+                            # Un albarán incompleto no se escribe ni se marca procesado: se reintenta en otro ciclo
+                            faltantes = self.lineas_faltantes(albaran_data, lineas_data)
+                            if faltantes:
+                                raise RuntimeError(f"No se pudieron leer las líneas {faltantes} de Odoo")
+                            self.escribir_albaran(albaran_data, lineas_data, regla, huellas=huellas)
+                            self.db_operations.anotar_frescura(self.__class__.__name__, albaran_data)
+                        logging.info(f"Albarán {albaran_data['id']} con folio {albaran_data['name']} procesado exitosamente en {time.time() - start_time:.2f} segundos.")
+                    except Exception as e:
+                        logging.error(f"Error al procesar albaran {albaran_data['id']}: {e}")
+        return len(pendientes)
+
+    def procesar_albaranes_por_id(self, albaran_ids, exigir_regla=False):
+        """Lee de Odoo los albaranes indicados en una sola llamada y los procesa."""
+        logging.info(f"Procesando albaranIDs: {albaran_ids}")
+        albaranes = self.odoo_operations.leer_pickings(albaran_ids, CAMPOS_PICKING)
+        if not albaranes:
+            logging.error(f"Error: No se obtuvieron datos validos para los albaranes {albaran_ids}")
+            return 0
+        return self.procesar_albaranes(albaranes, exigir_regla)
+
+    def procesar_albaran(self, albaran_id):
+        """Procesa un albarán específico, actualizando la base de datos y marcándolo como procesado."""
+        try:
+            self.procesar_albaranes_por_id([albaran_id])
+        except Exception as e:
+            logging.error(f"Error al procesar albaran {albaran_id}: {e}")
+
+    def procesar_trabajo(self, trabajo, db_operations):
+        """Etapa de escritura de la cola: lee lo que falte de Odoo y escribe un albarán. Lanza una excepción para reintentarlo."""
+        carga = trabajo.carga or {}
+        albaran_data = carga.get('albaran')
+        if albaran_data is None:
+            albaranes = self.odoo_operations.leer_pickings([int(trabajo.clave)], CAMPOS_PICKING)
+            if not albaranes:
+                raise RuntimeError(f"No se pudo leer el albarán {trabajo.clave} de Odoo")
+            albaran_data = albaranes[0]
+        regla = self.regla_para(albaran_data)
+        if (carga.get('exigir_regla') and regla is None) or self.excluido(albaran_data, regla):
+            return
+        if db_operations.verificar_albaran_procesado(albaran_data['id']):
+            return
+        with self.arriendos(self.tipo_trabajo, [albaran_data['id']]) as tomados:
+            if not tomados:
+                logging.info(f"Albarán {albaran_data['id']} arrendado por otro nodo; se omite.")
+                return
+            lineas_data = self.odoo_operations.leer_lineas(albaran_data['move_ids'])
+            faltantes = self.lineas_faltantes(albaran_data, lineas_data)
+            if faltantes:
+                raise RuntimeError(f"No se pudieron leer las líneas {faltantes} del albarán {albaran_data['id']}")
+            huellas = self.huellas_lote([albaran_data], db_operations)
+            with db_operations.elemento(f"albarán {albaran_data['id']}"):
+                self.escribir_albaran(albaran_data, lineas_data, regla, db_operations, huellas)
+                db_operations.anotar_frescura(self.__class__.__name__, albaran_data)
+
+    def procesar_albaranes_especificos(self):
+        """Procesa los albaranes específicos predefinidos."""
+        for albaran_folio in self.albaranes_especificos:
+            if not albaran_folio:
+                continue
+            logging.info(f"Buscando albarán con folio: {albaran_folio}")
+            albaran_ids = self.odoo_operations.buscar_albaran_por_folio(albaran_folio)
+            if albaran_ids:
+                self.procesar_albaran(albaran_ids[0])
+            else:
+                logging.warning(f"Albarán con folio {albaran_folio} no encontrado.")
+
+    def ciclo(self):
+        """Un barrido: una búsqueda combinada en Odoo y el despacho de sus resultados."""
+        albaranes = self.buscar_albaranes()
+        if not albaranes:
+            logging.info("No hay albaranes pendientes por procesar.")
+            frescura.pendientes(self.__class__.__name__, 0)
+            return 0
+        pendientes = self.filtrar_pendientes(albaranes)
+        if self.usar_cola():
+            # Encolar es barato; el orden y el ritmo los marcan los trabajadores
+            encolados = self.escribir_pendientes(pendientes)
+            frescura.pendientes(self.__class__.__name__, self.cola.pendientes(self.tipo_trabajo))
+            return encolados
+        # Primero la prioridad de Odoo, luego lo arrastrado de ciclos anteriores y luego lo más reciente
+        procesados, arrastrados = self.planificador.ejecutar(
+            pendientes, self.escribir_pendientes,
+            clave=lambda pendiente: pendiente[0]['id'],
+            urgencia=lambda pendiente: int(pendiente[0].get('priority') or 0),
+            recencia=lambda pendiente: pendiente[0]['id'])
+        frescura.pendientes(self.__class__.__name__, arrastrados)
+        return procesados
+
+    def notificar(self, albaran_ids):
+        """Callback del receptor de notificaciones: encola los IDs para el hilo principal."""
+        for albaran_id in albaran_ids:
+            self.notificaciones.put(albaran_id)
+
+    def iniciar_receptor(self):
+        """Arranca el receptor de notificaciones si WEBHOOK_PUERTO está configurado."""
+        if not Config.WEBHOOK_PUERTO:
+            return False
+        receptor = ReceptorWebhook(self.notificar)
+        if receptor.iniciar():
+            self.receptor = receptor
+        return self.receptor is not None
+
+    def atender_notificaciones(self, segundos):
+        """Espera hasta `segundos` procesando los albaranes notificados en cuanto llegan, agrupados por lote."""
+        limite = time.monotonic() + segundos
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return
+            try:
+                albaran_ids = [self.notificaciones.get(timeout=restante)]
+            except queue.Empty:
+                return
+            while True:
+                try:
+                    albaran_ids.append(self.notificaciones.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if self.usar_cola():
+                    # Los trabajadores leen cada albarán de Odoo; aquí solo se encola
+                    for albaran_id in set(albaran_ids):
+                        self.cola.encolar(self.tipo_trabajo, albaran_id, {'exigir_regla': True})
+                elif self.odoo_disponible():
+                    self.procesar_albaranes_por_id(sorted(set(albaran_ids), reverse=True), exigir_regla=True)
+                else:
+                    logging.warning(f"Odoo no disponible; los albaranes notificados {albaran_ids} quedan para el próximo sondeo.")
+            except Exception as e:
+                logging.error(f"Error al procesar albaranes notificados {albaran_ids}: {e}")
+
+    def run(self):
+        """Ciclo principal para procesar todos los albaranes pendientes."""
+        self.procesar_albaranes_especificos()
+        if self.cola is not None:
+            self.iniciar_trabajadores(self.cola, self.tipo_trabajo, self.procesar_trabajo, Config.COLA_TRABAJADORES)
+        intervalo = Config.PICKING_SONDEO_WEBHOOK_SEG if self.iniciar_receptor() else Config.PICKING_SONDEO_SEG
+        logging.info("Iniciando ciclo principal para procesar albaranes.")
+
+        while True:
+            try:
+                if self.odoo_disponible():
+                    self.ciclo()
+            except Exception as e:
+                logging.error(f"Error en ciclo principal: {e}")
+
+            logging.info(f"Esperando {intervalo:.0f} segundos antes de la próxima búsqueda.")
+            self.atender_notificaciones(intervalo)
+
+    def close_connections(self):
+        if self.receptor is not None:
+            self.receptor.detener()
+        super().close_connections()
+
+if __name__ == "__main__":
+    logger = configurar_logger(level=logging.INFO, log_to_file=False)
+    processor = PickingIngestionProcessor()
+    if processor.simular_si_se_solicita(sys.argv):
+        sys.exit(0)
+    try:
+        processor.run()
+    except KeyboardInterrupt:
+        logging.info("Proceso interrumpido por el usuario.")
+    finally:
+        processor.close_connections()
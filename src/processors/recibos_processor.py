@@ -11,11 +11,18 @@ import time
 import logging
 import re
 from datetime import datetime
+from config.settings import Config
 from utils.logger import configurar_logger
+from utils.cola_trabajo import ColaTrabajo
+from utils.frescura import frescura
+from utils.huellas import RegistroHuellas, RECIBO, RECIBO_LINEA
 from processors.base_processor import BaseProcessor
 from api.odoo_operations import OdooOperations
 from db.operations import DatabaseOperations
 
+CAMPOS_RECIBO = ['id', 'partner_id', 'create_date', 'write_date', 'name', 'move_ids', 'priority', 'state', 'origin']
+CAMPOS_LINEA_RECIBO = ['product_id', 'product_uom_qty']
+
 class RecibosCM03Processor(BaseProcessor):
     def __init__(self):
         super().__init__()
@@ -26,6 +33,10 @@ class RecibosCM03Processor(BaseProcessor):
         self.odoo_operations = OdooOperations(self.odoo)
         self.db_operations = DatabaseOperations()
 
+        # Con trabajadores configurados, la lectura encola recibos y la escritura los consume de una cola durable
+        self.cola = ColaTrabajo() if Config.COLA_TRABAJADORES > 0 else None
+        self.tipo_trabajo = f"recibo:{self.__class__.__name__}"
+
     def obtener_recibos(self):
         """Obtener recepciones de Odoo con picking_type_code 'incoming', estado 'done' y fecha de creación actual"""
         fecha_actual = datetime.now().strftime('%Y-%m-%d')
@@ -46,41 +57,104 @@ class RecibosCM03Processor(BaseProcessor):
         recibos = self.obtener_recibos()
         if recibos is None:
             return # Si no se encontraron recibos, terminamos el proceso
-        for recibo_id in recibos:
-            self.procesar_recibo(recibo_id)
+        self.despachar_recibos(recibos)
+
+    def despachar_recibos(self, recibos):
+        """Encola los recibos para los trabajadores o, sin cola (o en simulación), los procesa en línea."""
+        if self.cola is not None and self.db_operations.plan is None:
+            # Los recibos ya registrados no se vuelven a encolar: la cola solo deduplica trabajos activos
+            procesados = self.db_operations.recibos_procesados(recibos)
+            for recibo_id in recibos:
+                if recibo_id not in procesados:
+                    self.cola.encolar(self.tipo_trabajo, recibo_id)
+            frescura.pendientes(self.__class__.__name__, self.cola.pendientes(self.tipo_trabajo))
+            return
+        with self.db_operations.unidad_de_trabajo():
+            for recibo_id in recibos:
+                self.procesar_recibo(recibo_id)
+        frescura.pendientes(self.__class__.__name__, 0)
+
+    def ciclo(self):
+        """Un barrido de los recibos del día."""
+        self.procesar_recibo_principal()
 
     def procesar_recibo(self, recibo_id):
         """Procesa un recibo individual"""
         try:
-            # Obtiene datos del recibo
-            recibo_data = self.odoo.execute_kw(
-                'stock.picking', 'read', [recibo_id], 
-                {'fields': ['id', 'partner_id', 'create_date', 'name', 'move_ids', 'priority', 'state', 'origin']}
-            )[0]
-
-            # Verifica si el albaran ya ha sido procesado
-            if self.db_operations.verificar_recibo_procesado(recibo_id):
-                return
-
-            # Verifica su el recibo existe o no en la base de datos
-            #procesado = self.db_operations.verificar_recibo_procesado(recibo_id)
-            #logging.info(f"Resultado de la consulta para ReciboID {recibo_id}: {procesado}")            
-
-            recibo_folio = recibo_data['name']
-            partner_name = recibo_data['partner_id'][1]
-            logging.info(f"Procesando recibo ID: {recibo_id}, Folio: {recibo_folio}, Proveedor: {partner_name}")
-            if not self.validar_origen(recibo_data.get('origin')):
-                logging.warning(f"Recibo {recibo_data['name']} omitido. Origen no válido.")
-                return
-
-            # Inserta el recibo
-            fecha_creacion = recibo_data['create_date']
-            lineas = recibo_data['move_ids']
-            self.db_operations.insertar_o_actualizar_recibo(recibo_id, fecha_creacion, partner_name, recibo_data)
+            self.escribir_recibo(recibo_id, self.db_operations)
+        except Exception as e:
+            logging.error(f"Error procesando recibo {recibo_id}: {str(e)}")
+
+    def escribir_recibo(self, recibo_id, db_operations):
+        """Lee el recibo de Odoo y lo escribe con sus líneas. Lanza una excepción si algo falla, para poder reintentarlo."""
+        # Obtiene datos del recibo
+        recibo_data = self.odoo.execute_kw(
+            'stock.picking', 'read', [recibo_id], 
+            {'fields': CAMPOS_RECIBO}
+        )[0]
+
+        # Verifica si el albaran ya ha sido procesado
+        if db_operations.verificar_recibo_procesado(recibo_id):
+            return
+
+        # Verifica su el recibo existe o no en la base de datos
+        #procesado = self.db_operations.verificar_recibo_procesado(recibo_id)
+        #logging.info(f"Resultado de la consulta para ReciboID {recibo_id}: {procesado}")            
+
+        if not self.validar_origen(recibo_data.get('origin') or ''):
+            logging.warning(f"Recibo {recibo_data['name']} omitido. Origen no válido.")
+            return
+
+        # Las líneas se leen de Odoo (en bloque) antes de abrir la transacción del recibo
+        lineas_data = self.odoo_operations.leer_lineas(recibo_data['move_ids'], CAMPOS_LINEA_RECIBO)
+        self.escribir_recibo_datos(recibo_data, lineas_data, db_operations, self.huellas_lote([recibo_data], db_operations))
+        # La reingesta histórica escribe con escribir_lote_recibos y no cuenta para la frescura
+        db_operations.anotar_frescura(self.__class__.__name__, recibo_data)
+
+    def huellas_lote(self, recibos, db_operations):
+        """Huellas guardadas de los recibos y sus líneas, en bloque (None si HUELLAS_ACTIVAS está desactivado)."""
+        return db_operations.huellas_guardadas({
+            RECIBO: [recibo['id'] for recibo in recibos],
+            RECIBO_LINEA: [linea_id for recibo in recibos for linea_id in recibo['move_ids']],
+        })
+
+    def escribir_lote_recibos(self, recibo_ids, db_operations, revisar=False):
+        """Variante por lote: una lectura de recibos, una consulta de procesados y una lectura de líneas para todo el lote.
+        Con `revisar`, los recibos ya registrados no se omiten: se reescriben solo si sus huellas cambiaron.
+        Cada recibo se escribe en su propio elemento. Devuelve cuántos se escribieron."""
+        recibos = self.odoo_operations.leer_pickings(recibo_ids, CAMPOS_RECIBO)
+        procesados = set() if revisar else db_operations.recibos_procesados([recibo['id'] for recibo in recibos])
+        pendientes = [recibo for recibo in recibos if recibo['id'] not in procesados and self.validar_origen(recibo.get('origin') or '')]
+        lineas_data = self.odoo_operations.leer_lineas([linea_id for recibo in pendientes for linea_id in recibo['move_ids']], CAMPOS_LINEA_RECIBO)
+        huellas = self.huellas_lote(pendientes, db_operations)
+        escritos = 0
+        for recibo_data in pendientes:
+            try:
+                if self.escribir_recibo_datos(recibo_data, lineas_data, db_operations, huellas):
+                    escritos += 1
+            except Exception as e:
+                logging.error(f"Error procesando recibo {recibo_data['id']}: {e}")
+        return escritos
+
+    def escribir_recibo_datos(self, recibo_data, lineas_data, db_operations, huellas=None):
+        """Escribe un recibo ya leído con sus líneas dentro de un elemento de la unidad de trabajo.
+        Con las `huellas` del lote se omiten la cabecera y las líneas que no cambiaron. Devuelve True si escribió algo."""
+        recibo_id = recibo_data['id']
+        recibo_folio = recibo_data['name']
+        partner_name = recibo_data['partner_id'][1]
+        logging.info(f"Procesando recibo ID: {recibo_id}, Folio: {recibo_folio}, Proveedor: {partner_name}")
+        fecha_creacion = recibo_data['create_date']
+        lineas = recibo_data['move_ids']
+
+        # Inserta el recibo y sus líneas de forma atómica
+        registro = RegistroHuellas(huellas)
+        with db_operations.elemento(f"recibo {recibo_id}"):
+            if registro.cambio(RECIBO, recibo_id, [fecha_creacion, partner_name, recibo_folio]):
+                db_operations.insertar_o_actualizar_recibo(recibo_id, fecha_creacion, partner_name, recibo_data)
 
             # Insertar líneas del recibo
             for linea_id in lineas:
-                linea_data = self.odoo_operations.obtener_linea_data(linea_id)
+                linea_data = lineas_data[linea_id]
                 product_id = linea_data['product_id'][0]
                 cantidad = linea_data['product_uom_qty']
 
@@ -88,12 +162,16 @@ class RecibosCM03Processor(BaseProcessor):
                 productos_limpios = self.limpiar_datos_productos(str(product_id))
 
                 # Inserción del detalle del recibo
-                self.db_operations.insertar_detalle_recibo(linea_id, recibo_id, product_id, cantidad)
+                if registro.cambio(RECIBO_LINEA, linea_id, [recibo_id, product_id, cantidad]):
+                    db_operations.insertar_detalle_recibo(linea_id, recibo_id, product_id, cantidad)
+            db_operations.guardar_huellas(registro.nuevas)
 
-            self.db.commit()
-            logging.info(f"Recibo {recibo_id}, Folio: {recibo_folio}, Proveedor: {partner_name} procesado exitosamente.")
-        except Exception as e:
-            logging.error(f"Error procesando recibo {recibo_id}: {str(e)}")
+        logging.info(f"Recibo {recibo_id}, Folio: {recibo_folio}, Proveedor: {partner_name} procesado exitosamente.")
+        return huellas is None or bool(registro.nuevas)
+
+    def procesar_trabajo(self, trabajo, db_operations):
+        """Etapa de escritura de la cola: un recibo por trabajo."""
+        self.escribir_recibo(int(trabajo.clave), db_operations)
 
     def procesar_recibos_especificos(self):
         """Procesar recibos específicos antes de iniciar el ciclo principal"""
@@ -112,15 +190,19 @@ class RecibosCM03Processor(BaseProcessor):
     def run(self):
         """Función principal del script"""
         self.procesar_recibos_especificos()
+        if self.cola is not None:
+            self.iniciar_trabajadores(self.cola, self.tipo_trabajo, self.procesar_trabajo, Config.COLA_TRABAJADORES)
         while True:
             try:
+                if not self.odoo_disponible():
+                    time.sleep(10)
+                    continue
                 recibos = self.obtener_recibos()
                 if not recibos:
                     logging.warning("No hay recibos disponibles para procesar.")
                     time.sleep(10)
                     continue
-                for recibo_id in recibos:
-                    self.procesar_recibo(recibo_id)
+                self.despachar_recibos(recibos)
                 time.sleep(10)  # Espera 10 segundos antes de la siguiente iteración
             except Exception as e:
                 logging.error(f"Error en ciclo principal: {e}")
@@ -130,6 +212,8 @@ class RecibosCM03Processor(BaseProcessor):
 if __name__ == "__main__":
     logger = configurar_logger(level=logging.INFO, log_to_file=False)
     processor = RecibosCM03Processor()
+    if processor.simular_si_se_solicita(sys.argv):
+        sys.exit(0)
     try:
         processor.run()
     except KeyboardInterrupt:
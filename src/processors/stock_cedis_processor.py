@@ -7,6 +7,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 import logging
 from utils.logger import configurar_logger
+from config.settings import Config
 from processors.base_processor import BaseProcessor
 from api.odoo_operations import OdooOperations
 from db.operations import DatabaseOperations
@@ -14,11 +15,8 @@ from db.operations import DatabaseOperations
 # SKU a probar
 sku_a_probar = ['']
 
-# Diccionario de ubicaciones
-UBICACIONES = {
-    'QRA': 8,
-    'CDMX': 38
-}
+# Diccionario de ubicaciones (nombre -> location_id de Odoo), configurable con UBICACIONES_STOCK
+UBICACIONES = Config.UBICACIONES
 
 class StockCedisProcessor(BaseProcessor):
     def __init__(self):
@@ -52,41 +50,43 @@ class StockCedisProcessor(BaseProcessor):
             logging.error(f"Error al obtener stock por sububicación: {e}")
             sys.exit(1)
 
-    def registrar_stock_en_bd(self, producto_id, producto_nombre, sku_actual, stock_total, stock_qra, stock_cdmx):
-        if self.db_operations.sku_en_bd(sku_actual):
-            self.db_operations.actualizar_producto(producto_id, producto_nombre, stock_total, stock_qra, stock_cdmx, sku_actual)
-        else:
-            if producto_id is not None and isinstance(producto_id, int):
-                self.db_operations.insertar_producto(producto_id, producto_nombre, sku_actual, stock_total, stock_qra, stock_cdmx)
+    def registrar_stock_en_bd(self, producto_id, producto_nombre, sku_actual, stock_total, stock_ubicaciones):
+        with self.db_operations.elemento(f"SKU {sku_actual}"):
+            if self.db_operations.sku_en_bd(sku_actual):
+                self.db_operations.actualizar_producto(producto_id, producto_nombre, stock_total, sku_actual)
             else:
-                logging.warning(f"No se insertó el producto con SKU={sku_actual} porque ProductoID es inválido o None")
-        self.db.commit()
+                if producto_id is not None and isinstance(producto_id, int):
+                    self.db_operations.insertar_producto(producto_id, producto_nombre, sku_actual, stock_total)
+                else:
+                    logging.warning(f"No se insertó el producto con SKU={sku_actual} porque ProductoID es inválido o None")
+                    return
+            self.db_operations.actualizar_stock_ubicaciones(
+                [(producto_id, ubicacion, stock) for ubicacion, stock in stock_ubicaciones.items()])
         
     def run(self):
+        self.ciclo()
+
+    def ciclo(self):
         try:
             for sku in sku_a_probar:
                 producto = self.obtener_producto_por_sku(sku_a_probar)
                 product_id = producto.get('id')
 
-                # Obtener sububicaciones de QRA
-                location_ids_qra = self.obtener_sububicaciones(UBICACIONES['QRA'])
-                stock_qra_detallado = self.obtener_stock_por_sububicacion(product_id, location_ids_qra)
-                stock_qra = stock_qra_detallado.get(UBICACIONES['QRA'], 0)
-
-                # Obtener sububicaciones de CDMX
-                stock_cdmx_location_ids = self.obtener_sububicaciones(UBICACIONES['CDMX'])
-                stock_cdmx_detallado = self.obtener_stock_por_sububicacion(product_id, stock_cdmx_location_ids)
-                stock_cdmx = sum(stock_cdmx_detallado.values())
+                # Stock de cada ubicación: suma de sus sububicaciones
+                stock_ubicaciones = {}
+                for ubicacion, location_id in UBICACIONES.items():
+                    location_ids = self.obtener_sububicaciones(location_id)
+                    stock_detallado = self.obtener_stock_por_sububicacion(product_id, location_ids)
+                    stock_ubicaciones[ubicacion] = sum(stock_detallado.values())
 
                 # Stock total
-                stock_total = stock_qra + stock_cdmx
+                stock_total = sum(stock_ubicaciones.values())
                 self.registrar_stock_en_bd(
                     producto_id=product_id,
                     producto_nombre=producto['name'],
                     sku_actual=sku,
                     stock_total=stock_total,
-                    stock_qra=stock_qra,
-                    stock_cdmx=stock_cdmx
+                    stock_ubicaciones=stock_ubicaciones
                 )
             logging.info("Proceso completado con éxito.")
         except Exception as e:
@@ -95,5 +95,7 @@ class StockCedisProcessor(BaseProcessor):
 if __name__ == "__main__":
     logger = configurar_logger(level=logging.INFO, log_to_file=False)
     processor = StockCedisProcessor()
+    if processor.simular_si_se_solicita(sys.argv):
+        sys.exit(0)
     processor.run()
     processor.close_connections()
\ No newline at end of file
@@ -7,18 +7,49 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 import time
 import fcntl
+import queue
 import logging
-from decimal import Decimal, ROUND_HALF_UP
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config.settings import Config
 from utils.logger import configurar_logger
+from utils.helpers import IteradorConVistazo
+from utils.stock_diff import StockSnapshot, diferencias_stock, foto_aplicada, centavos_a_decimal
+from utils.foto_stock import guardar_foto, cargar_foto
 from processors.base_processor import BaseProcessor
 from api.odoo_operations import OdooOperations
 from db.operations import DatabaseOperations
+from db.audit_writer import AuditWriter
+from db.coordinacion import coordinador_del_hilo
 
 LOCK_FILE_PATH = 'sync_script.lock'
-UBICACIONES = {
-    'QRA': 8,  # ID de la ubicación WH/Stock QRA
-    'CDMX': 38  # ID de la ubicación WH/Stock CDMX
-}
+# Ubicaciones sincronizadas (nombre -> location_id de Odoo); se configuran con UBICACIONES_STOCK
+UBICACIONES = Config.UBICACIONES
+
+def rangos_fragmentos(id_maximo, fragmentos):
+    """Divide (0, id_maximo] en hasta `fragmentos` rangos contiguos (desde_id, hasta_id] de tamaño similar."""
+    if id_maximo <= 0:
+        return []
+    fragmentos = max(1, min(fragmentos, id_maximo))
+    tamano = -(-id_maximo // fragmentos)
+    return [(desde_id, min(desde_id + tamano, id_maximo)) for desde_id in range(0, id_maximo, tamano)]
+
+def _inicializar_trabajador(nivel):
+    configurar_logger(level=nivel, log_to_file=False)
+
+def resincronizar_fragmento(desde_id, hasta_id):
+    """Trabajo de un proceso del pool: concilia un rango de ProductoID con sus propias conexiones a Odoo y MySQL.
+    Devuelve (totales, inserciones_pendientes, skus_vistos) para que el coordinador los combine."""
+    processor = StockQroCM03()
+    try:
+        skus_vistos = {}
+        totales, inserciones = processor.conciliar_rango(desde_id, hasta_id, skus_vistos)
+        processor.audit.flush()
+        return totales, inserciones, skus_vistos
+    finally:
+        processor.close_connections()
 
 class StockQroCM03(BaseProcessor):
     def __init__(self):
@@ -26,115 +57,356 @@ class StockQroCM03(BaseProcessor):
         logging.debug("Inicializado StockQroCM03")
         self.odoo_operations = OdooOperations(self.odoo)
         self.db_operations = DatabaseOperations()
+        self.audit = AuditWriter()
+        self.foto_previa = None     # (foto, generación, marca de MySQL) del último ciclo aplicado
+        self.errores_escritura = 0
 
+    def obtener_nombres_productos(self, product_ids):
+        """Obtiene los nombres y SKUs de los productos en Odoo. Lanza RuntimeError si algún bloque no se pudo leer:
+        sin nombre ni SKU el producto se compararía como vacío y se sobrescribiría en MySQL."""
+        product_names, product_skus, fallidos = self.odoo_operations.obtener_produc_total(product_ids)
+        if fallidos:
+            raise RuntimeError(f"No se pudieron leer nombres y SKUs de {len(fallidos)} bloques de productos de Odoo: {fallidos}")
+        return product_names, product_skus
 
-    def obtener_productos_en_sububicaciones(self, location_id, offset=0, limit=100):
-        """Obtiene productos en sububicaciones de una ubicación dada desde Odoo."""
-        productos = self.odoo_operations.sububicaciones_produc_total(location_id, offset, limit)
-        logging.debug("Productos obtenidos en Odoo para ubicación %s: %s", location_id, productos)
-        return productos
+    def iterar_paginas_odoo(self, limit=None, desde_id=0, hasta_id=None):
+        """Produce (ultimo_id, foto, fechas) por cada página de productos de Odoo, en orden de ProductoID.
+        Pagina los productos por keyset y agrega stock.quant por página, sin acumular todo el catálogo.
+        `fechas` tiene el write_date más reciente de los quants de cada producto, para medir la frescura."""
+        limit = limit or Config.STOCK_PAGINA_PRODUCTOS
+        ultimo_id = desde_id
+        while True:
+            ids = self.odoo_operations.ids_productos_desde(ultimo_id, limit, hasta_id)
+            if ids is None:
+                raise RuntimeError(f"No se pudo paginar productos de Odoo después del ProductoID {ultimo_id}")
+            if not ids:
+                break
+            ultimo_id = ids[-1]
 
-    def obtener_nombres_productos(self, product_ids):
-        """Obtiene los nombres de los productos en Odoo."""
-        return self.odoo_operations.obtener_produc_total(product_ids)
+            cantidades = {}
+            fechas = {}
+            for location_name, location_id in UBICACIONES.items():
+                stock = self.odoo_operations.stock_agrupado_por_producto(location_id, ids, fechas)
+                if stock is None:
+                    raise RuntimeError(f"No se pudo obtener el stock de {location_name} para la página que termina en {ultimo_id}")
+                cantidades[location_name] = stock
+
+            # Solo se sincronizan los productos con quants en alguna ubicación
+            con_stock = sorted(set().union(*[stock.keys() for stock in cantidades.values()]))
+            if not con_stock:
+                continue
+            product_names, product_skus = self.obtener_nombres_productos(con_stock)
+            foto = StockSnapshot.desde_columnas(
+                UBICACIONES, con_stock,
+                {location_name: [cantidades[location_name].get(ProductoID, 0) for ProductoID in con_stock] for location_name in UBICACIONES},
+                [product_names.get(ProductoID, "") for ProductoID in con_stock],
+                [product_skus.get(ProductoID, "") for ProductoID in con_stock],
+            )
+            yield ultimo_id, foto, fechas
+
+    def leer_bloque_mysql(self, existentes, hasta_id):
+        """Consume del flujo de MySQL las filas con ProductoID <= hasta_id y las devuelve como foto."""
+        filas = existentes.tomar_mientras(lambda fila: fila.ProductoID <= hasta_id)
+        return StockSnapshot.desde_columnas(
+            UBICACIONES, [fila.ProductoID for fila in filas],
+            {location_name: [fila.Stock.get(location_name, 0) for fila in filas] for location_name in UBICACIONES},
+            [fila.ProductoNombre for fila in filas],
+            [fila.ProductoSKUActual for fila in filas],
+        )
+
+    def aplicar_cambios(self, cambios, skus_odoo, skus_mysql, fechas, totales):
+        """Etapa de escritura: aplica en MySQL el conjunto de cambios de un bloque."""
+        for ProductoID, nombre_mysql, ProductoNombreOdoo in zip(*cambios.nombres):
+            ProductoID = int(ProductoID)
+            self.db_operations.actualizar_produc_nombre(ProductoNombreOdoo, ProductoID)
+            self.audit.registrar(ProductoID, skus_odoo[ProductoID], "UPDATE", "Nombre", nombre_mysql, ProductoNombreOdoo, None)
+            logging.info("Nombre actualizado para ProductoID %d (SKU %s): '%s' -> '%s'", ProductoID, skus_odoo[ProductoID], nombre_mysql, ProductoNombreOdoo)
+            totales['actualizados'] += 1
+
+        for ProductoID, sku_mysql, ProductoSKUOdoo in zip(*cambios.skus):
+            ProductoID = int(ProductoID)
+            self.db_operations.actualizar_produc_sku(ProductoSKUOdoo, ProductoID)
+            self.audit.registrar(ProductoID, ProductoSKUOdoo, "UPDATE", "SKU", sku_mysql, ProductoSKUOdoo, None)
+            logging.info("SKU actualizado para ProductoID %d: '%s' -> '%s'", ProductoID, sku_mysql, ProductoSKUOdoo)
+            totales['actualizados'] += 1
+
+        # El stock de todas las ubicaciones del bloque se escribe en un solo upsert
+        filas_stock = []
+        for location_name, (ids, anteriores, nuevos) in cambios.stock.items():
+            for ProductoID, nuevo in zip(ids, nuevos):
+                filas_stock.append((int(ProductoID), location_name, centavos_a_decimal(nuevo)))
+        self.db_operations.actualizar_stock_ubicaciones(filas_stock)
+
+        for location_name, (ids, anteriores, nuevos) in cambios.stock.items():
+            for ProductoID, anterior, nuevo in zip(ids, anteriores, nuevos):
+                ProductoID = int(ProductoID)
+                stock_mysql, stock_new = centavos_a_decimal(anterior), centavos_a_decimal(nuevo)
+                self.audit.registrar(ProductoID, skus_odoo[ProductoID], "UPDATE", "Stock", stock_mysql, stock_new, location_name)
+                logging.info("Stock actualizado para ProductoID %d (SKU %s) en %s: %s -> %s", ProductoID, skus_mysql[ProductoID], location_name, stock_mysql, stock_new)
+                totales['actualizados'] += 1
+
+        # El atraso de cada producto se mide desde el último cambio de sus quants hasta que se confirme
+        for ProductoID in np.unique(np.concatenate([ids for ids, _, _ in cambios.stock.values()])).tolist():
+            self.db_operations.anotar_frescura(self.__class__.__name__, fechas.get(ProductoID))
+
+    def insertar_producto(self, ProductoID, ProductoNombreOdoo, ProductoSKUOdoo, totales):
+        """Etapa de escritura: inserta un producto nuevo."""
+        self.db_operations.insertar_produc_ubicaciones(ProductoID, ProductoNombreOdoo, ProductoSKUOdoo)
+        self.audit.registrar(ProductoID, ProductoSKUOdoo, "INSERT", "Producto", None, ProductoSKUOdoo, None)
+        logging.warning("--- ProductoID %d INSERTADO CON SKU %s", ProductoID, ProductoSKUOdoo)
+        totales['insertados'] += 1
+
+    def escritor(self, cola, totales):
+        """Consume trabajos de la cola acotada hasta recibir None."""
+        while True:
+            trabajo = cola.get()
+            try:
+                if trabajo is None:
+                    return
+                metodo, args = trabajo
+                metodo(*args, totales)
+            except Exception as e:
+                logging.error("Error al aplicar cambios de productos: %s", e)
+                self.errores_escritura += 1
+            finally:
+                cola.task_done()
+
+    def conciliar_rango(self, desde_id=0, hasta_id=None, skus_vistos=None, foto_previa=None, bloques_aplicados=None):
+        """Reconcilia Productos contra Odoo en el rango de ProductoID (desde_id, hasta_id], por bloques alineados en ambos lados.
+        Cada bloque se compara con operaciones vectorizadas y sus cambios pasan por una cola acotada.
+        Devuelve (totales, inserciones_pendientes); las inserciones quedan a cargo del llamador.
+        Si se pasa `skus_vistos`, se llena con el ProductoID más grande de Odoo por SKU.
+        Con `foto_previa` se compara contra la foto del ciclo anterior en lugar de leer Productos.
+        Si se pasa `bloques_aplicados`, se llena con el estado en que queda MySQL, bloque por bloque."""
+        if foto_previa is None:
+            existentes = IteradorConVistazo(self.db_operations.iterar_produc_existentes(desde_id=desde_id, hasta_id=hasta_id))
+            leer_bloque = lambda previo_id, ultimo_id: self.leer_bloque_mysql(existentes, ultimo_id)
+        else:
+            leer_bloque = foto_previa.entre
+        totales = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0}
+        cola = queue.Queue(maxsize=Config.STOCK_COLA_ESCRITURA)
+        hilo_escritor = threading.Thread(target=self.escritor, args=(cola, totales), daemon=True)
+        hilo_escritor.start()
+
+        # Candidatos a insertar por SKU: solo se inserta el ProductoID más grande de cada SKU
+        inserciones_pendientes = {}
+        # Las actualizaciones son independientes: se confirman por lotes y, si el ciclo se aborta, se conserva lo aplicado
+        with self.db_operations.unidad_de_trabajo(confirmar_si_falla=True):
+            try:
+                previo_id = desde_id
+                for ultimo_id, foto_odoo, fechas in self.iterar_paginas_odoo(desde_id=desde_id, hasta_id=hasta_id):
+                    foto_mysql = leer_bloque(previo_id, ultimo_id)
+                    previo_id = ultimo_id
+                    cambios = diferencias_stock(foto_odoo, foto_mysql)
+                    if bloques_aplicados is not None:
+                        bloques_aplicados.append(foto_aplicada(foto_odoo, foto_mysql))
+                    if skus_vistos is not None:
+                        # Los IDs vienen en orden ascendente: el último de cada SKU es el mayor
+                        skus_vistos.update(zip(foto_odoo.skus.tolist(), foto_odoo.ids.tolist()))
 
-    def obtener_productos_existentes(self):
-        """Obtiene los productos existentes en MySQL."""
-        return self.db_operations.obtener_produc_existentes()
+                    # Un ProductoID mayor con el mismo SKU descarta al candidato anterior
+                    nuevos = set(cambios.nuevos[0].tolist())
+                    if inserciones_pendientes or nuevos:
+                        for ProductoID, ProductoNombreOdoo, ProductoSKUOdoo in zip(foto_odoo.ids.tolist(), foto_odoo.nombres, foto_odoo.skus):
+                            inserciones_pendientes.pop(ProductoSKUOdoo, None)
+                            if ProductoID in nuevos and ProductoSKUOdoo:
+                                inserciones_pendientes[ProductoSKUOdoo] = (ProductoID, ProductoNombreOdoo, ProductoSKUOdoo)
+
+                    actualizados = cambios.total()
+                    if actualizados:
+                        cambiados = np.unique(np.concatenate([cambios.nombres[0], cambios.skus[0]] + [ids for ids, _, _ in cambios.stock.values()]))
+                        skus_odoo = dict(zip(cambiados.tolist(), foto_odoo.skus[np.searchsorted(foto_odoo.ids, cambiados)]))
+                        skus_mysql = dict(zip(cambiados.tolist(), foto_mysql.skus[np.searchsorted(foto_mysql.ids, cambiados)]))
+                        cola.put((self.aplicar_cambios, (cambios, skus_odoo, skus_mysql, fechas)))
+                    else:
+                        cambiados = ()
+                    totales['sin_cambios'] += len(foto_odoo) - len(nuevos) - len(cambiados)
+                if bloques_aplicados is not None:
+                    # Los productos posteriores a la última página de Odoo no cambian
+                    bloques_aplicados.append(leer_bloque(previo_id, hasta_id if hasta_id is not None else np.iinfo(np.int64).max))
+            finally:
+                cola.put(None)
+                hilo_escritor.join()
+        return totales, inserciones_pendientes
+
+    def finalizar(self, totales, inserciones):
+        """Inserta los productos nuevos, confirma los cambios y escribe la auditoría del ciclo."""
+        with self.db_operations.unidad_de_trabajo(confirmar_si_falla=True):
+            for args in inserciones:
+                self.insertar_producto(*args, totales)
+        # Los registros de auditoría se confirman después de los cambios del ciclo
+        self.audit.flush()
+        logging.info("Total productos actualizados: %d", totales['actualizados'])
+        logging.info("Total productos insertados: %d", totales['insertados'])
+        logging.info("Total productos sin cambios: %d", totales['sin_cambios'])
+
+    def foto_previa_vigente(self):
+        """Foto del último ciclo si MySQL no cambió desde entonces; None obliga a leer Productos completo.
+        En el primer ciclo se abre el archivo STOCK_FOTO_RUTA, así que un reinicio tampoco relee la tabla."""
+        if not Config.STOCK_FOTO_RUTA:
+            return None
+        if self.foto_previa is None:
+            self.foto_previa = cargar_foto(Config.STOCK_FOTO_RUTA, list(UBICACIONES))
+            if self.foto_previa is None:
+                return None
+            logging.info("Foto de stock cargada de %s: %d productos, generación %d", Config.STOCK_FOTO_RUTA, len(self.foto_previa[0]), self.foto_previa[1])
+        foto, generacion, marca = self.foto_previa
+        if Config.STOCK_FOTO_VERIFICAR_CICLOS and generacion % Config.STOCK_FOTO_VERIFICAR_CICLOS == 0:
+            logging.info("Verificación periódica (generación %d): se lee Productos completo.", generacion)
+            return None
+        actual = self.db_operations.marca_stock()
+        if actual != marca:
+            logging.warning("Productos cambió fuera de la sincronización (%s -> %s); se lee completo.", marca, actual)
+            return None
+        return foto
+
+    def guardar_foto_aplicada(self, bloques, inserciones, sin_errores):
+        """Guarda el estado en que quedó MySQL para comparar contra él en el siguiente ciclo.
+        Si alguna escritura falló, la foto no sería fiel: se descarta y el siguiente ciclo lee Productos completo."""
+        if not Config.STOCK_FOTO_RUTA or self.db_operations.plan is not None:
+            return  # Foto desactivada, o en simulación no se aplicó nada
+        if not sin_errores:
+            logging.warning("Hubo errores de escritura; se descarta la foto de stock.")
+            self.descartar_foto()
+            return
+        inserciones = list(inserciones)
+        if inserciones:
+            # Los productos nuevos se insertan sin stock por ubicación
+            ids, nombres, skus = zip(*inserciones)
+            bloques.append(StockSnapshot(UBICACIONES, ids, np.zeros((len(ids), len(UBICACIONES)), dtype=np.int64), nombres, skus))
+        marca = self.db_operations.marca_stock()
+        if marca is None:
+            self.descartar_foto()
+            return
+        foto = StockSnapshot.concatenar(UBICACIONES, bloques)
+        generacion = self.foto_previa[1] + 1 if self.foto_previa else 1
+        self.foto_previa = (foto, generacion, marca)
+        try:
+            guardar_foto(Config.STOCK_FOTO_RUTA, foto, generacion, marca)
+        except OSError as e:
+            logging.error("No se pudo guardar la foto de stock en %s: %s", Config.STOCK_FOTO_RUTA, e)
+
+    def descartar_foto(self):
+        self.foto_previa = None
+        if Config.STOCK_FOTO_RUTA and os.path.exists(Config.STOCK_FOTO_RUTA):
+            os.remove(Config.STOCK_FOTO_RUTA)
 
     def actualizar_productos(self):
-        existing_products = self.obtener_productos_existentes()
-        if not existing_products:
+        """Reconcilia todo el catálogo en este proceso, contra la foto del ciclo anterior si sigue vigente."""
+        if not self.db_operations.hay_productos():
             logging.warning("No se encontraron productos en MySQL")
             return
+        foto_previa = self.foto_previa_vigente()
+        bloques = [] if Config.STOCK_FOTO_RUTA else None
+        errores = self.db_operations.errores + self.errores_escritura
+        try:
+            totales, inserciones = self.conciliar_rango(foto_previa=foto_previa, bloques_aplicados=bloques)
+        except Exception:
+            # Lo aplicado antes del fallo ya está confirmado y la foto anterior no lo refleja
+            self.descartar_foto()
+            raise
+        self.finalizar(totales, inserciones.values())
+        if bloques is not None:
+            self.guardar_foto_aplicada(bloques, inserciones.values(), self.db_operations.errores + self.errores_escritura == errores)
 
-        offset = 0
-        limit = 100
-        product_quantities = {location: {} for location in UBICACIONES}
-        product_sku_mapping = {}
-
-        for location_name, location_id in UBICACIONES.items():
-            logging.info("Obteniendo productos para la ubicación: %s (ID: %d)", location_name, location_id)
-            while True:
-                products = self.obtener_productos_en_sububicaciones(location_id, offset, limit)
-                if not products:
-                    break
-
-                for product in products:
-                    ProductoID = product['product_id'][0]
-                    ProductoSKU = product['product_id'][1]
-                    product_quantities[location_name][ProductoID] = product_quantities[location_name].get(ProductoID, 0) + product['quantity']
-                    product_sku_mapping[ProductoID] = ProductoSKU
-                    logging.debug("%s ProductoID %d: Cantidad acumulada = %s", location_name, ProductoID, product_quantities[location_name][ProductoID])
-
-                offset += limit
-            offset = 0  
-
-        all_product_ids = set().union(*[quantities.keys() for quantities in product_quantities.values()])
-        product_names, product_skus = self.obtener_nombres_productos(list(all_product_ids))
-        total_actualizados = 0
-        total_insertados = 0
-
-        # diccionario vacío para almacenar el ProductoID más grande de cada SKU
-        sku_max_id = {}
-        for ProductoID in all_product_ids:
-            ProductoSKUOdoo = product_skus.get(ProductoID, "")
-            if ProductoSKUOdoo:
-                if ProductoSKUOdoo not in sku_max_id or ProductoID > sku_max_id[ProductoSKUOdoo]: #almacena si es el primer id o si es mayor se reemplaza
-                    sku_max_id[ProductoSKUOdoo] = ProductoID
-
-        for ProductoID in all_product_ids:
-            ProductoNombreOdoo = product_names.get(ProductoID, "")
-            ProductoSKUOdoo = product_skus.get(ProductoID, "")
-            
-            if ProductoID not in existing_products:
-                if ProductoID == sku_max_id.get(ProductoSKUOdoo):
-                    self.db_operations.insertar_produc_ubicaciones(ProductoID, ProductoNombreOdoo, ProductoSKUOdoo)
-                    self.db_operations.registro_logs(ProductoID, ProductoSKUOdoo, "INSERT", "Producto", None, ProductoSKUOdoo, None)
-                    logging.warning("--- ProductoID %d INSERTADO CON SKU %s", ProductoID, ProductoSKUOdoo)
-                    total_insertados += 1
-                continue
+    def resincronizar_por_fragmentos(self, procesos=None):
+        """Resincronización completa repartiendo el rango de ProductoID entre un pool de procesos.
+        Cada proceso concilia sus fragmentos con conexiones propias; este proceso (el coordinador) suma los
+        totales y decide las inserciones con la regla del ProductoID más grande por SKU en todo el catálogo."""
+        procesos = procesos or Config.STOCK_PROCESOS_RESYNC
+        # Los procesos del pool escriben por su cuenta: la foto local deja de ser fiel
+        self.descartar_foto()
+        if not self.db_operations.hay_productos():
+            logging.warning("No se encontraron productos en MySQL")
+            return
+        id_maximo = self.odoo_operations.id_producto_maximo()
+        if id_maximo is None:
+            raise RuntimeError("No se pudo obtener el ProductoID máximo de Odoo")
+        fragmentos = rangos_fragmentos(id_maximo, procesos * Config.STOCK_FRAGMENTOS_POR_PROCESO)
+        if fragmentos:
+            # El último fragmento queda abierto para incluir productos creados durante la resincronización
+            fragmentos[-1] = (fragmentos[-1][0], None)
+        logging.info("Resincronización en %d procesos y %d fragmentos hasta ProductoID %d", procesos, len(fragmentos), id_maximo)
+
+        totales = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0}
+        skus_maximos = {}
+        candidatos = []
+        fallidos = []
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=_inicializar_trabajador, initargs=(logging.getLogger().level,)) as pool:
+            futuros = {pool.submit(resincronizar_fragmento, desde_id, hasta_id): (desde_id, hasta_id) for desde_id, hasta_id in fragmentos}
+            for futuro in as_completed(futuros):
+                desde_id, hasta_id = futuros[futuro]
+                try:
+                    totales_fragmento, inserciones, skus_vistos = futuro.result()
+                except Exception as e:
+                    logging.error("Fragmento (%s, %s] falló: %s", desde_id, hasta_id, e)
+                    fallidos.append((desde_id, hasta_id))
+                    continue
+                for clave, valor in totales_fragmento.items():
+                    totales[clave] += valor
+                for sku, ProductoID in skus_vistos.items():
+                    if ProductoID > skus_maximos.get(sku, 0):
+                        skus_maximos[sku] = ProductoID
+                candidatos.extend(inserciones.values())
+
+        if fallidos:
+            # Sin los SKU de todos los fragmentos no se puede aplicar la regla del ProductoID más grande
+            self.audit.flush()
+            raise RuntimeError(f"{len(fallidos)} fragmentos fallaron; se omiten las inserciones: {fallidos}")
+        inserciones = [args for args in candidatos if skus_maximos.get(args[2]) == args[0]]
+        self.finalizar(totales, inserciones)
+
+    def ciclo(self):
+        self.actualizar_productos()
+
+    def operaciones_bd(self):
+        """La auditoría escribe con su propia conexión; en simulación también se registra en el plan."""
+        return [self.db_operations, self.audit.db_operations]
+
+    def close_connections(self):
+        """Escribe la auditoría pendiente antes de cerrar las conexiones."""
+        self.audit.close()
+        super().close_connections()
 
-            sku_mysql = existing_products[ProductoID]['ProductoSKUActual']
-            nombre_mysql = existing_products[ProductoID]['ProductoNombre']
-            stock_mysql_qra = existing_products[ProductoID]['StockQra']
-            stock_mysql_cdmx = existing_products[ProductoID]['StockCDMX']
-
-            if ProductoNombreOdoo and ProductoNombreOdoo != nombre_mysql:
-                self.db_operations.actualizar_produc_nombre(ProductoNombreOdoo, ProductoID)
-                self.db_operations.registro_logs(ProductoID, ProductoSKUOdoo, "UPDATE", "Nombre", nombre_mysql, ProductoNombreOdoo, None)
-                logging.info("Nombre actualizado para ProductoID %d (SKU %s): '%s' -> '%s'", ProductoID, ProductoSKUOdoo, nombre_mysql, ProductoNombreOdoo)
-                total_actualizados += 1
-            if ProductoSKUOdoo and ProductoSKUOdoo != sku_mysql:
-                self.db_operations.actualizar_produc_sku(ProductoSKUOdoo, ProductoID)
-                self.db_operations.registro_logs(ProductoID, ProductoSKUOdoo, "UPDATE", "SKU", sku_mysql, ProductoSKUOdoo, None)
-                logging.info("SKU actualizado para ProductoID %d: '%s' -> '%s'", ProductoID, sku_mysql, ProductoSKUOdoo)
-                total_actualizados += 1
-
-            for location_name, stock_dict in product_quantities.items():
-                stock_mysql = stock_mysql_qra if location_name == 'QRA' else stock_mysql_cdmx
-                stock_new = stock_dict.get(ProductoID, 0)
-                stock_mysql = Decimal(stock_mysql).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if stock_mysql is not None else Decimal(0)
-                stock_new = Decimal(stock_new).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if stock_new is not None else Decimal(0)
-                if stock_mysql != stock_new:
-                    self.db_operations.actualizar_produc_stock(location_name, stock_new, ProductoID)
-                    self.db_operations.registro_logs(ProductoID, ProductoSKUOdoo, "UPDATE", "Stock", stock_mysql, stock_new, location_name)
-                    logging.info("Stock actualizado para ProductoID %d (SKU %s) en %s: %s -> %s", ProductoID, sku_mysql, location_name, stock_mysql, stock_new)
-                    total_actualizados += 1
-
-        self.db.commit()
-        logging.info("Total productos actualizados: %d", total_actualizados)
-        logging.info("Total productos insertados: %d", total_insertados)
+    def verificar_esquema(self):
+        """El stock por ubicación vive en ProductoStockUbicacion; sin ella cada ciclo fallaría fila por fila."""
+        if self.db_operations.tabla_existe('ProductoStockUbicacion') is False:
+            raise RuntimeError("Falta la tabla ProductoStockUbicacion; créela con 'python src/db/migrations.py --aplicar'")
+
+    def sincronizar(self):
+        self.verificar_esquema()
+        # El bloqueo lo conserva este proceso mientras los procesos del pool trabajan
+        if Config.STOCK_PROCESOS_RESYNC > 1:
+            self.resincronizar_por_fragmentos()
+        else:
+            self.actualizar_productos()
 
     def run(self):
-        """Ejecuta la sincronización con mecanismo de bloqueo."""
+        """Ejecuta la sincronización con mecanismo de bloqueo: GET_LOCK de MySQL entre nodos (COORD_ACTIVA) o archivo local."""
+        if Config.COORD_ACTIVA:
+            coordinador = coordinador_del_hilo()
+            with coordinador.bloqueo('stock_qro') as obtenido:
+                if not obtenido:
+                    logging.warning("Otro nodo está sincronizando el stock. Saliendo.")
+                    return
+                logging.info("Bloqueo de MySQL adquirido. Iniciando sincronización.")
+                try:
+                    self.sincronizar()
+                except Exception as e:
+                    logging.error("Sincronización abortada: %s", e)
+            logging.info("Bloqueo liberado. Sincronización finalizada.")
+            return
+
         lock_file = open(LOCK_FILE_PATH, 'w')
         try:
             fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
             logging.info("Lock adquirido. Iniciando sincronización.")
-            self.actualizar_productos()
+            self.sincronizar()
         except IOError:
             logging.warning("Otra instancia del script está en ejecución. Saliendo.")
+        except Exception as e:
+            logging.error("Sincronización abortada: %s", e)
         finally:
             fcntl.flock(lock_file, fcntl.LOCK_UN)
             lock_file.close()
@@ -143,9 +415,12 @@ class StockQroCM03(BaseProcessor):
 if __name__ == "__main__":
     logger = configurar_logger(level=logging.DEBUG, log_to_file=False)
     processor = StockQroCM03()
+    if processor.simular_si_se_solicita(sys.argv):
+        sys.exit(0)
     try:
         while True:
-            processor.run()
+            if processor.odoo_disponible():
+                processor.run()
             time.sleep(60)
     except KeyboardInterrupt:
         logging.info("Ejecución interrumpida por el usuario.")
@@ -14,12 +14,14 @@ from utils.logger import configurar_logger
 from processors.base_processor import BaseProcessor
 from api.odoo_operations import OdooOperations
 from db.operations import DatabaseOperations
+from utils.planificador import PlanificadorCiclo
 
 class TarimasProcessor(BaseProcessor):
     def __init__(self):
         super().__init__()  
         self.odoo_operations = OdooOperations(self.odoo)
         self.db_operations = DatabaseOperations()
+        self.planificador = PlanificadorCiclo(self.__class__.__name__)
 
     def assign_tarimas(self):
         """Asigna tarimas a los Albaranes pendientes de procesamiento."""
@@ -28,6 +30,22 @@ class TarimasProcessor(BaseProcessor):
                 logging.warning("No hay albaranes supervisados sin procesar")
                 return
 
+        # Lotes acotados por ciclo: lo arrastrado primero y luego los albaranes más recientes
+        self.planificador.ejecutar(
+            albaranes, self.asignar_lote,
+            clave=lambda albaran: albaran['AlbaranID'],
+            recencia=lambda albaran: albaran['AlbaranID'])
+        logging.info("Todos los cambios han sido confirmados.")
+
+    def asignar_lote(self, albaranes):
+        """Un lote en una unidad de trabajo; con varios nodos, cada uno procesa solo los albaranes que logró arrendar."""
+        with self.arriendos('tarimas', [albaran['AlbaranID'] for albaran in albaranes]) as tomados:
+            tomados = set(tomados)
+            with self.db_operations.unidad_de_trabajo():
+                self.asignar_tarimas_albaranes([albaran for albaran in albaranes if albaran['AlbaranID'] in tomados])
+
+    def asignar_tarimas_albaranes(self, albaranes):
+        """Concatena las tarimas de cada albarán; cada albarán se escribe dentro de su propio savepoint."""
         for albaran in albaranes:
             albaran_id = albaran['AlbaranID']
             logging.info(f"\nProcesando AlbaranID: {albaran_id}")
@@ -59,28 +77,29 @@ class TarimasProcessor(BaseProcessor):
                 #Añadir la tarima y cantidad a la lista correspondiente
                 tarimas_por_producto[producto_id].append(f"{tarima_numero} ({cantidad})")
 
-            #Actualizar AlabaranDetalle con las concatenaciones
-            for producto_id, tarimas in tarimas_por_producto.items():
-                concatenado = ", ".join(tarimas)
+            #Actualizar AlabaranDetalle y marcar el albarán en un solo elemento: se aplica completo o se deshace
+            try:
+                with self.db_operations.elemento(f"albarán {albaran_id}"):
+                    for producto_id, tarimas in tarimas_por_producto.items():
+                        concatenado = ", ".join(tarimas)
+
+                        #Actualizar la columna TarimasConcatenadas
+                        self.db_operations.update_albarandetalle(concatenado, albaran_id, producto_id)
 
-                #Actualizar la columna TarimasConcatenadas
-                self.db_operations.update_albarandetalle(concatenado, albaran_id, producto_id)
-                        
-            #Marcar el Albaran como procesado sin cambiar el AlbaranStatus
-            self.db_operations.update_albaranstatus(albaran_id)
-            
-            #Confirmar todos los cambios
-            self.db.commit()
-            logging.info(f"\nTodos los cambios han sido confirmados.")
+                    #Marcar el Albaran como procesado sin cambiar el AlbaranStatus
+                    self.db_operations.update_albaranstatus(albaran_id)
+            except Exception as e:
+                logging.error(f"Error al asignar tarimas del AlbaranID {albaran_id}: {e}")
 
-            #Cerrar el cursor y la conexión
-            self.db_operations.close()
-            logging.info("Conexion a la base de datos cerrada.")
+    def ciclo(self):
+        self.assign_tarimas()
 
 def main():
     try:
         logger = configurar_logger(level=logging.INFO, log_to_file=False)
         processor = TarimasProcessor()
+        if processor.simular_si_se_solicita(sys.argv):
+            return
         while True:
             logging.info("\n=== Iniciando proceso de asignación de tarimas ===")
             processor.assign_tarimas()
@@ -0,0 +1,144 @@
+# src/utils/cola_trabajo.py
+# Cola de trabajo durable en SQLite entre la etapa de lectura de Odoo y la de escritura en MySQL.
+# Operaciones: encolar, arrendar, confirmar, fallar (reintento con backoff) y cola de muertos.
+# Un trabajo arrendado cuyo plazo vence (proceso caído) vuelve a estar disponible, así que tras un reinicio
+# el trabajo continúa donde quedó.
+
+import json
+import random
+import sqlite3
+import threading
+import time
+import logging
+from collections import namedtuple
+from config.settings import Config
+from utils.metrics import metricas
+
+Trabajo = namedtuple('Trabajo', ['id', 'tipo', 'clave', 'carga', 'intentos'])
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    carga TEXT,
+    estado TEXT NOT NULL DEFAULT 'pendiente',   -- pendiente | en_curso | muerto
+    intentos INTEGER NOT NULL DEFAULT 0,
+    disponible_en REAL NOT NULL,
+    arrendado_hasta REAL,
+    trabajador TEXT,
+    error TEXT,
+    creado REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_trabajos_activos ON trabajos (tipo, clave) WHERE estado != 'muerto';
+CREATE INDEX IF NOT EXISTS idx_trabajos_disponibles ON trabajos (tipo, estado, disponible_en);
+"""
+
+class ColaTrabajo:
+    def __init__(self, ruta=None, max_intentos=None, backoff_base=None, backoff_max=None):
+        self.ruta = ruta or Config.COLA_RUTA
+        self.max_intentos = max_intentos or Config.COLA_MAX_INTENTOS
+        self.backoff_base = Config.COLA_BACKOFF_BASE_SEG if backoff_base is None else backoff_base
+        self.backoff_max = Config.COLA_BACKOFF_MAX_SEG if backoff_max is None else backoff_max
+        self._local = threading.local()
+        self._sqlite().executescript(ESQUEMA)
+
+    def _sqlite(self):
+        """Una conexión por hilo; SQLite serializa las escrituras entre hilos y procesos."""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def _conexion(self):
+        return _Transaccion(self._sqlite())
+
+    def encolar(self, tipo, clave, carga=None):
+        """Agrega un trabajo. Si ya hay uno activo con la misma clave, no se duplica. Devuelve True si se agregó."""
+        ahora = time.time()
+        with self._conexion() as conexion:
+            cursor = conexion.execute(
+                "INSERT OR IGNORE INTO trabajos (tipo, clave, carga, disponible_en, creado) VALUES (?, ?, ?, ?, ?)",
+                (tipo, str(clave), json.dumps(carga) if carga is not None else None, ahora, ahora))
+            agregado = cursor.rowcount > 0
+        if agregado:
+            metricas.incrementar('cola.encolados', tipo=tipo)
+        return agregado
+
+    def arrendar(self, tipo, trabajador, limite=1, duracion=None):
+        """Toma hasta `limite` trabajos disponibles por `duracion` segundos. Los arriendos vencidos se recuperan;
+        si ya agotaron sus intentos pasan a la cola de muertos."""
+        duracion = duracion or Config.COLA_ARRIENDO_SEG
+        ahora = time.time()
+        with self._conexion() as conexion:
+            conexion.execute(
+                "UPDATE trabajos SET estado = 'muerto', error = 'Arriendo vencido en el último intento' "
+                "WHERE tipo = ? AND estado = 'en_curso' AND arrendado_hasta < ? AND intentos >= ?",
+                (tipo, ahora, self.max_intentos))
+            filas = conexion.execute(
+                "SELECT id, tipo, clave, carga, intentos FROM trabajos "
+                "WHERE tipo = ? AND ((estado = 'pendiente' AND disponible_en <= ?) OR (estado = 'en_curso' AND arrendado_hasta < ?)) "
+                "ORDER BY disponible_en, id LIMIT ?",
+                (tipo, ahora, ahora, limite)).fetchall()
+            conexion.executemany(
+                "UPDATE trabajos SET estado = 'en_curso', intentos = intentos + 1, arrendado_hasta = ?, trabajador = ? WHERE id = ?",
+                [(ahora + duracion, trabajador, fila[0]) for fila in filas])
+        return [Trabajo(id, tipo, clave, json.loads(carga) if carga else None, intentos + 1) for id, tipo, clave, carga, intentos in filas]
+
+    def confirmar(self, trabajo):
+        """El trabajo terminó bien: se elimina de la cola."""
+        with self._conexion() as conexion:
+            conexion.execute("DELETE FROM trabajos WHERE id = ?", (trabajo.id,))
+        metricas.incrementar('cola.confirmados', tipo=trabajo.tipo)
+
+    def fallar(self, trabajo, error):
+        """Programa un reintento con backoff exponencial y jitter, o lo manda a la cola de muertos si agotó sus intentos."""
+        if trabajo.intentos >= self.max_intentos:
+            with self._conexion() as conexion:
+                conexion.execute("UPDATE trabajos SET estado = 'muerto', error = ?, arrendado_hasta = NULL WHERE id = ?", (str(error), trabajo.id))
+            metricas.incrementar('cola.muertos', tipo=trabajo.tipo)
+            logging.error(f"Trabajo {trabajo.tipo}/{trabajo.clave} enviado a la cola de muertos tras {trabajo.intentos} intentos: {error}")
+            return False
+        espera = random.uniform(0.5, 1.0) * min(self.backoff_max, self.backoff_base * 2 ** (trabajo.intentos - 1))
+        with self._conexion() as conexion:
+            conexion.execute(
+                "UPDATE trabajos SET estado = 'pendiente', error = ?, disponible_en = ?, arrendado_hasta = NULL WHERE id = ?",
+                (str(error), time.time() + espera, trabajo.id))
+        metricas.incrementar('cola.reintentos', tipo=trabajo.tipo)
+        logging.warning(f"Trabajo {trabajo.tipo}/{trabajo.clave} falló (intento {trabajo.intentos}); se reintenta en {espera:.0f} s: {error}")
+        return True
+
+    def pendientes(self, tipo):
+        """Cantidad de trabajos pendientes o en curso del tipo."""
+        with self._conexion() as conexion:
+            return conexion.execute("SELECT COUNT(*) FROM trabajos WHERE tipo = ? AND estado != 'muerto'", (tipo,)).fetchone()[0]
+
+    def muertos(self, tipo):
+        """Trabajos en la cola de muertos: [(clave, intentos, error)]."""
+        with self._conexion() as conexion:
+            return conexion.execute("SELECT clave, intentos, error FROM trabajos WHERE tipo = ? AND estado = 'muerto' ORDER BY id", (tipo,)).fetchall()
+
+    def reintentar_muertos(self, tipo):
+        """Devuelve a la cola los trabajos muertos del tipo (salvo que ya haya uno activo con la misma clave)."""
+        with self._conexion() as conexion:
+            cursor = conexion.execute(
+                "UPDATE OR IGNORE trabajos SET estado = 'pendiente', intentos = 0, disponible_en = ?, error = NULL "
+                "WHERE tipo = ? AND estado = 'muerto'", (time.time(), tipo))
+            return cursor.rowcount
+
+class _Transaccion:
+    """Contexto BEGIN IMMEDIATE ... COMMIT: toma el bloqueo de escritura al empezar para que el arriendo sea atómico."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        self.conexion.execute("BEGIN IMMEDIATE")
+        return self.conexion
+
+    def __exit__(self, tipo, valor, traza):
+        self.conexion.execute("COMMIT" if tipo is None else "ROLLBACK")
+        return False
@@ -0,0 +1,81 @@
+# src/utils/contadores.py
+# Conteo de llamadas por alcance (un albarán, un ciclo) para detectar patrones N+1: llamadas a Odoo por modelo y
+# método, sentencias SQL y commits. Los alcances activos se anidan; cada llamada suma en todos ellos.
+#
+#   with presupuesto_llamadas(max_rpc=3, max_commits=2):
+#       processor.procesar_albaranes_por_id([albaran_id])
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+_activos = []
+_lock = threading.Lock()
+
+class PresupuestoExcedido(AssertionError):
+    """Un bloque hizo más llamadas de las permitidas; hereda de AssertionError para que pytest lo reporte como fallo."""
+
+class ContadorLlamadas:
+    def __init__(self, nombre=''):
+        self.nombre = nombre
+        self.rpc = Counter()    # (modelo, método) -> llamadas
+        self.sql = 0
+        self.commits = 0
+
+    @property
+    def total_rpc(self):
+        return sum(self.rpc.values())
+
+    def resumen(self):
+        detalle = ', '.join(f"{modelo}.{metodo}={n}" for (modelo, metodo), n in self.rpc.most_common())
+        return f"{self.total_rpc} RPC [{detalle}], {self.sql} SQL, {self.commits} commits"
+
+    def excesos(self, max_rpc=None, max_sql=None, max_commits=None):
+        """Lista de límites superados (vacía si se respetó el presupuesto)."""
+        excesos = []
+        for nombre, valor, limite in (('RPC', self.total_rpc, max_rpc), ('SQL', self.sql, max_sql), ('commits', self.commits, max_commits)):
+            if limite is not None and valor > limite:
+                excesos.append(f"{valor} {nombre} (máximo {limite})")
+        return excesos
+
+@contextmanager
+def contar_llamadas(nombre=''):
+    """Cuenta las llamadas hechas desde cualquier hilo mientras el bloque está activo."""
+    contador = ContadorLlamadas(nombre)
+    with _lock:
+        _activos.append(contador)
+    try:
+        yield contador
+    finally:
+        with _lock:
+            _activos.remove(contador)
+
+@contextmanager
+def presupuesto_llamadas(max_rpc=None, max_sql=None, max_commits=None, nombre='bloque'):
+    """Como contar_llamadas, pero lanza PresupuestoExcedido al salir si se superó algún límite."""
+    with contar_llamadas(nombre) as contador:
+        yield contador
+    excesos = contador.excesos(max_rpc, max_sql, max_commits)
+    if excesos:
+        raise PresupuestoExcedido(f"{nombre} excedió su presupuesto: {'; '.join(excesos)}. Llamadas: {contador.resumen()}")
+
+def registrar_rpc(modelo, metodo):
+    if not _activos:
+        return
+    with _lock:
+        for contador in _activos:
+            contador.rpc[(modelo, metodo)] += 1
+
+def registrar_sql(sentencias=1):
+    if not _activos:
+        return
+    with _lock:
+        for contador in _activos:
+            contador.sql += sentencias
+
+def registrar_commit():
+    if not _activos:
+        return
+    with _lock:
+        for contador in _activos:
+            contador.commits += 1
@@ -0,0 +1,87 @@
+# src/utils/foto_stock.py
+# Archivo binario con la última foto de stock aplicada en MySQL, para que el siguiente ciclo compare contra él en
+# lugar de volver a leer Productos. Se abre con numpy.memmap (un reinicio no relee la tabla) y se reemplaza de forma
+# atómica al terminar cada ciclo.
+#
+# Formato (little endian): encabezado fijo, nombres de ubicaciones separados por NUL y rellenados a 8 bytes,
+# ids int64[n], centavos int64[n x ubicaciones], nombres y SKUs en UTF-8 separados por NUL.
+# El encabezado guarda la generación (ciclos aplicados), la marca de MySQL al guardar y un CRC32 del contenido.
+
+import os
+import zlib
+import struct
+import logging
+import numpy as np
+from utils.stock_diff import StockSnapshot
+
+MAGICO = b'CM03FOTO'
+VERSION = 1
+# mágico, versión, ubicaciones, filas, generación, crc, marca (4 enteros), bytes de nombres, bytes de SKUs
+ENCABEZADO = struct.Struct('<8sIIQQI4x4qQQ')
+SEPARADOR = '\x00'
+
+def _texto(valores):
+    return SEPARADOR.join('' if valor is None else str(valor).replace(SEPARADOR, '') for valor in valores).encode('utf-8')
+
+def _lista(datos, n):
+    return np.array(bytes(datos).decode('utf-8').split(SEPARADOR) if n else [], dtype=object)
+
+def _relleno(tamano):
+    return b'\x00' * (-tamano % 8)
+
+def guardar_foto(ruta, foto, generacion, marca):
+    """Escribe la foto en un archivo temporal y lo renombra sobre `ruta`; un lector nunca ve un archivo a medias."""
+    ubicaciones = _texto(foto.ubicaciones)
+    partes = [
+        ubicaciones + _relleno(len(ubicaciones)),
+        np.ascontiguousarray(foto.ids, dtype='<i8').tobytes(),
+        np.ascontiguousarray(foto.centavos, dtype='<i8').tobytes(),
+        _texto(foto.nombres),
+        _texto(foto.skus),
+    ]
+    crc = 0
+    for parte in partes:
+        crc = zlib.crc32(parte, crc)
+    encabezado = ENCABEZADO.pack(MAGICO, VERSION, len(foto.ubicaciones), len(foto), generacion, crc, *marca, len(partes[3]), len(partes[4]))
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(encabezado)
+        for parte in partes:
+            archivo.write(parte)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+def cargar_foto(ruta, ubicaciones):
+    """Abre la foto con memmap. Devuelve (foto, generación, marca), o None si no existe, está dañada o sus
+    ubicaciones no coinciden con las configuradas; en esos casos hay que leer MySQL completo."""
+    if not os.path.exists(ruta):
+        return None
+    try:
+        datos = np.memmap(ruta, dtype=np.uint8, mode='r')
+        magico, version, m, n, generacion, crc, *resto = ENCABEZADO.unpack_from(bytes(datos[:ENCABEZADO.size]))
+        marca, largo_nombres, largo_skus = tuple(resto[:4]), resto[4], resto[5]
+        if magico != MAGICO or version != VERSION:
+            logging.warning(f"{ruta} no es una foto de stock compatible; se ignora.")
+            return None
+        if zlib.crc32(datos[ENCABEZADO.size:]) != crc:
+            logging.warning(f"La foto de stock {ruta} está dañada (CRC distinto); se ignora.")
+            return None
+        posicion = ENCABEZADO.size
+        largo_ubicaciones = len(_texto(ubicaciones))
+        guardadas = bytes(datos[posicion:posicion + largo_ubicaciones]).decode('utf-8').split(SEPARADOR)
+        if m != len(ubicaciones) or guardadas != list(ubicaciones):
+            logging.warning(f"La foto de stock {ruta} es de otras ubicaciones ({guardadas}); se ignora.")
+            return None
+        posicion += largo_ubicaciones + len(_relleno(largo_ubicaciones))
+        ids = datos[posicion:posicion + 8 * n].view('<i8')
+        posicion += 8 * n
+        centavos = datos[posicion:posicion + 8 * n * m].view('<i8').reshape(n, m)
+        posicion += 8 * n * m
+        nombres = _lista(datos[posicion:posicion + largo_nombres], n)
+        posicion += largo_nombres
+        skus = _lista(datos[posicion:posicion + largo_skus], n)
+    except (OSError, ValueError, struct.error) as e:
+        logging.warning(f"No se pudo abrir la foto de stock {ruta}: {e}")
+        return None
+    return StockSnapshot.ordenada(ubicaciones, ids, centavos, nombres, skus), generacion, marca
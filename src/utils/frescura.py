@@ -0,0 +1,77 @@
+# src/utils/frescura.py
+# Frescura de extremo a extremo: segundos entre el cambio de un registro en Odoo (write_date, o create_date si no
+# viene) y la confirmación en MySQL de la escritura que lo refleja. Los procesadores anotan cada elemento escrito en
+# su DatabaseOperations; al confirmarse la transacción se observa el atraso por procesador ('frescura.atraso_seg',
+# con p50/p95/p99 en el resumen de métricas) y, si pasa de FRESCURA_UMBRAL_SEG, se llama a los avisos registrados.
+# Cada procesador publica además cuántos elementos le quedan por escribir ('frescura.pendientes').
+
+import time
+import logging
+from datetime import datetime, timezone
+from config.settings import Config
+from utils.metrics import metricas
+
+FORMATO_ODOO = '%Y-%m-%d %H:%M:%S'
+
+def marca_odoo(valor):
+    """Segundos epoch de una fecha de Odoo (texto UTC 'YYYY-MM-DD HH:MM:SS'), o None si no hay fecha.
+    Acepta también un registro leído de Odoo, del que toma write_date o create_date."""
+    if isinstance(valor, dict):
+        valor = valor.get('write_date') or valor.get('create_date')
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(str(valor)[:19], FORMATO_ODOO).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        logging.debug(f"Fecha de Odoo no reconocida: {valor}")
+        return None
+
+def aviso_en_log(procesador, atraso, umbral):
+    logging.warning(f"Frescura de {procesador}: {atraso:.0f} s entre Odoo y MySQL (umbral {umbral:.0f} s).")
+
+class Frescura:
+    def __init__(self, umbral_seg=None):
+        self.umbral_seg = Config.FRESCURA_UMBRAL_SEG if umbral_seg is None else umbral_seg
+        self._avisos = [aviso_en_log]
+        self._procesadores = set()
+
+    def al_exceder_umbral(self, funcion):
+        """Registra `funcion(procesador, atraso, umbral)`, que se llama una vez por confirmación que excede el umbral."""
+        self._avisos.append(funcion)
+        return funcion
+
+    def observar(self, procesador, marcas, confirmado=None):
+        """Registra el atraso de cada marca de Odoo respecto a `confirmado` (ahora, por defecto)."""
+        if not marcas:
+            return
+        self._procesadores.add(procesador)
+        confirmado = time.time() if confirmado is None else confirmado
+        atrasos = [max(0.0, confirmado - marca) for marca in marcas]
+        for atraso in atrasos:
+            metricas.observar('frescura.atraso_seg', atraso, procesador=procesador)
+        excedidos = [atraso for atraso in atrasos if self.umbral_seg and atraso > self.umbral_seg]
+        if not excedidos:
+            return
+        metricas.incrementar('frescura.excedidos', len(excedidos), procesador=procesador)
+        for aviso in self._avisos:
+            try:
+                aviso(procesador, max(excedidos), self.umbral_seg)
+            except Exception as e:
+                logging.error(f"Error en el aviso de frescura {aviso}: {e}")
+
+    def pendientes(self, procesador, cantidad):
+        """Publica cuántos elementos de Odoo le faltan por escribir al procesador."""
+        self._procesadores.add(procesador)
+        metricas.fijar('frescura.pendientes', cantidad, procesador=procesador)
+
+    def resumen(self, procesador):
+        """Percentiles del atraso y elementos pendientes del procesador."""
+        resumen = {f'p{p}': metricas.percentil('frescura.atraso_seg', p, procesador=procesador) for p in (50, 95, 99)}
+        resumen['pendientes'] = metricas.valor('frescura.pendientes', procesador=procesador)
+        return resumen
+
+    def resumen_todos(self):
+        return {procesador: self.resumen(procesador) for procesador in sorted(self._procesadores)}
+
+# Seguimiento compartido por todo el proceso
+frescura = Frescura()
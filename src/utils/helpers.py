@@ -0,0 +1,29 @@
+# src/utils/helpers.py
+# Funciones auxiliares compartidas entre procesadores.
+
+
+def dividir_en_bloques(elementos, tamano):
+    """Divide una lista en bloques consecutivos de como máximo `tamano` elementos."""
+    tamano = max(1, int(tamano))
+    return [elementos[i:i + tamano] for i in range(0, len(elementos), tamano)]
+
+
+class IteradorConVistazo:
+    """Iterador que permite consultar el siguiente elemento sin consumirlo."""
+    _FIN = object()
+
+    def __init__(self, iterable):
+        self._iterador = iter(iterable)
+        self._siguiente = next(self._iterador, self._FIN)
+
+    def vistazo(self):
+        """Devuelve el siguiente elemento sin consumirlo, o None si ya no hay más."""
+        return None if self._siguiente is self._FIN else self._siguiente
+
+    def tomar_mientras(self, condicion):
+        """Consume y devuelve los elementos consecutivos que cumplen la condición."""
+        tomados = []
+        while self._siguiente is not self._FIN and condicion(self._siguiente):
+            tomados.append(self._siguiente)
+            self._siguiente = next(self._iterador, self._FIN)
+        return tomados
@@ -0,0 +1,35 @@
+# src/utils/huellas.py
+# Huellas de contenido: un hash estable (BLAKE2b de 16 bytes) de los campos de Odoo que se escriben en MySQL por
+# albarán, recibo y línea. Se guardan en la tabla HuellasContenido; antes de escribir un lote se consultan en bloque
+# y se omiten los registros cuyo contenido no cambió desde la última escritura.
+
+import json
+import hashlib
+
+ALBARAN = 'albaran'
+ALBARAN_LINEA = 'albaran_linea'
+RECIBO = 'recibo'
+RECIBO_LINEA = 'recibo_linea'
+
+def huella(valores):
+    """Hash estable de una secuencia de valores: no depende del orden de las llaves de un dict ni del proceso."""
+    texto = json.dumps(valores, sort_keys=True, default=str, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).digest()
+
+class RegistroHuellas:
+    """Compara el contenido de un elemento con las huellas guardadas y acumula las que hay que guardar.
+    Con `guardadas` None (HUELLAS_ACTIVAS desactivado) todo cuenta como cambiado y no se guarda nada."""
+
+    def __init__(self, guardadas):
+        self.guardadas = guardadas
+        self.nuevas = []
+
+    def cambio(self, entidad, clave, valores):
+        """True si hay que escribir el registro; en ese caso su nueva huella queda en `nuevas`."""
+        if self.guardadas is None:
+            return True
+        nueva = huella(valores)
+        if self.guardadas.get((entidad, clave)) == nueva:
+            return False
+        self.nuevas.append((entidad, clave, nueva))
+        return True
@@ -0,0 +1,94 @@
+# src/utils/metrics.py
+# Registro de métricas en memoria del proceso: contadores, valores actuales y observaciones de tiempo con etiquetas.
+# Se reporta periódicamente en el log; no depende de ningún sistema externo.
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+class Metricas:
+    def __init__(self, max_observaciones=2000):
+        self._lock = threading.Lock()
+        self._contadores = defaultdict(float)
+        self._valores = {}
+        self._observaciones = defaultdict(lambda: deque(maxlen=max_observaciones))
+        self._ultimo_reporte = time.monotonic()
+
+    @staticmethod
+    def _clave(nombre, etiquetas):
+        return nombre, tuple(sorted(etiquetas.items()))
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        """Suma `valor` al contador indicado."""
+        with self._lock:
+            self._contadores[self._clave(nombre, etiquetas)] += valor
+
+    def fijar(self, nombre, valor, **etiquetas):
+        """Reemplaza el valor actual de la serie (por ejemplo, el tamaño de un atraso)."""
+        with self._lock:
+            self._valores[self._clave(nombre, etiquetas)] = valor
+
+    def valor(self, nombre, **etiquetas):
+        with self._lock:
+            return self._valores.get(self._clave(nombre, etiquetas))
+
+    def observar(self, nombre, valor, **etiquetas):
+        """Registra una observación (por ejemplo, una duración en segundos)."""
+        with self._lock:
+            self._observaciones[self._clave(nombre, etiquetas)].append(valor)
+
+    def contador(self, nombre, **etiquetas):
+        with self._lock:
+            return self._contadores.get(self._clave(nombre, etiquetas), 0)
+
+    def total(self, nombre):
+        """Suma de un contador en todas sus combinaciones de etiquetas."""
+        with self._lock:
+            return sum(valor for (serie, _), valor in self._contadores.items() if serie == nombre)
+
+    def percentil(self, nombre, percentil, **etiquetas):
+        """Percentil (0-100) de las observaciones recientes, o None si no hay."""
+        with self._lock:
+            valores = sorted(self._observaciones.get(self._clave(nombre, etiquetas), ()))
+        if not valores:
+            return None
+        indice = min(len(valores) - 1, max(0, int(round(percentil / 100 * (len(valores) - 1)))))
+        return valores[indice]
+
+    def resumen(self):
+        """Devuelve contadores y percentiles p50/p95/p99 de todas las series."""
+        with self._lock:
+            contadores = dict(self._contadores)
+            contadores.update(self._valores)
+            series = {clave: sorted(valores) for clave, valores in self._observaciones.items() if valores}
+        resumen = {}
+        for (nombre, etiquetas), valor in contadores.items():
+            resumen[self._formatear(nombre, etiquetas)] = valor
+        for (nombre, etiquetas), valores in series.items():
+            n = len(valores)
+            resumen[self._formatear(nombre, etiquetas)] = {
+                'n': n,
+                'p50': valores[int(0.50 * (n - 1))],
+                'p95': valores[int(0.95 * (n - 1))],
+                'p99': valores[int(0.99 * (n - 1))],
+            }
+        return resumen
+
+    @staticmethod
+    def _formatear(nombre, etiquetas):
+        if not etiquetas:
+            return nombre
+        return f"{nombre}{{{','.join(f'{k}={v}' for k, v in etiquetas)}}}"
+
+    def reportar_si_corresponde(self, intervalo=300):
+        """Escribe el resumen en el log si pasaron `intervalo` segundos desde el último reporte."""
+        ahora = time.monotonic()
+        if ahora - self._ultimo_reporte < intervalo:
+            return
+        self._ultimo_reporte = ahora
+        for serie, valor in sorted(self.resumen().items()):
+            logging.info("Métrica %s: %s", serie, valor)
+
+# Registro compartido por todo el proceso
+metricas = Metricas()
@@ -0,0 +1,47 @@
+# src/utils/planificador.py
+# Planificación de cada ciclo de sondeo: ordena los elementos pendientes por urgencia, procesa como máximo
+# CICLO_MAX_ELEMENTOS o hasta agotar CICLO_MAX_SEG, y arrastra el resto al siguiente ciclo. Lo arrastrado gana
+# prioridad frente a lo nuevo de la misma urgencia, así que un atraso se vacía sin retrasar lo urgente.
+
+import time
+import logging
+from config.settings import Config
+from utils.helpers import dividir_en_bloques
+from utils.metrics import metricas
+
+class PlanificadorCiclo:
+    def __init__(self, nombre, max_elementos=None, max_segundos=None, tamano_lote=None):
+        self.nombre = nombre
+        self.max_elementos = max_elementos or Config.CICLO_MAX_ELEMENTOS
+        self.max_segundos = Config.CICLO_MAX_SEG if max_segundos is None else max_segundos
+        self.tamano_lote = tamano_lote or Config.CICLO_LOTE
+        self.esperando = {}     # clave -> ciclos que lleva arrastrada
+
+    def ordenar(self, elementos, clave, urgencia=None, recencia=None):
+        """Urgencia (p. ej. priority de Odoo), luego ciclos arrastrados, luego recencia; de mayor a menor."""
+        return sorted(elementos, reverse=True, key=lambda elemento: (
+            urgencia(elemento) if urgencia else 0,
+            self.esperando.get(clave(elemento), 0),
+            recencia(elemento) if recencia else 0,
+        ))
+
+    def ejecutar(self, elementos, procesar_lote, clave, urgencia=None, recencia=None):
+        """Procesa en lotes de `tamano_lote` los elementos más urgentes dentro del presupuesto del ciclo.
+        Devuelve (procesados, arrastrados)."""
+        inicio = time.monotonic()
+        ordenados = self.ordenar(elementos, clave, urgencia, recencia)
+        procesados = 0
+        for lote in dividir_en_bloques(ordenados[:self.max_elementos], self.tamano_lote):
+            if procesados and self.max_segundos and time.monotonic() - inicio >= self.max_segundos:
+                break
+            procesar_lote(lote)
+            procesados += len(lote)
+
+        restantes = ordenados[procesados:]
+        self.esperando = {clave(elemento): self.esperando.get(clave(elemento), 0) + 1 for elemento in restantes}
+        metricas.incrementar('ciclo.procesados', procesados, planificador=self.nombre)
+        if restantes:
+            metricas.incrementar('ciclo.arrastrados', len(restantes), planificador=self.nombre)
+            logging.info(f"{self.nombre}: {procesados} procesados en {time.monotonic() - inicio:.1f} s; "
+                         f"{len(restantes)} pasan al siguiente ciclo (el más antiguo lleva {max(self.esperando.values())} ciclos).")
+        return procesados, len(restantes)
@@ -0,0 +1,137 @@
+# src/utils/stock_diff.py
+# Motor de diferencias de stock sobre fotos (snapshots) respaldadas por arreglos de NumPy.
+# Las cantidades se guardan como enteros en centavos (punto fijo, redondeo ROUND_HALF_UP) con una columna por ubicación.
+
+from decimal import Decimal
+import numpy as np
+
+
+def a_centavos(cantidades):
+    """Convierte cantidades (float, Decimal o None) a centavos int64 redondeando la mitad hacia afuera del cero."""
+    if not isinstance(cantidades, np.ndarray):
+        cantidades = [0.0 if c is None else float(c) for c in cantidades]
+    valores = np.asarray(cantidades, dtype=np.float64) * 100
+    return np.where(valores >= 0, np.floor(valores + 0.5), -np.floor(-valores + 0.5)).astype(np.int64)
+
+
+def centavos_a_decimal(centavos):
+    """Convierte centavos a Decimal con dos decimales, como se escriben en MySQL."""
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+class StockSnapshot:
+    """Foto de stock ordenada por ProductoID: ids, centavos por ubicación, nombres y SKUs."""
+    __slots__ = ('ubicaciones', 'ids', 'centavos', 'nombres', 'skus')
+
+    def __init__(self, ubicaciones, ids, centavos, nombres, skus):
+        self.ubicaciones = list(ubicaciones)
+        orden = np.argsort(ids, kind='stable')
+        self.ids = np.asarray(ids, dtype=np.int64)[orden]
+        self.centavos = np.asarray(centavos, dtype=np.int64).reshape(len(self.ids), len(self.ubicaciones))[orden]
+        self.nombres = np.asarray(nombres, dtype=object)[orden]
+        self.skus = np.asarray(skus, dtype=object)[orden]
+
+    @classmethod
+    def desde_columnas(cls, ubicaciones, ids, cantidades_por_ubicacion, nombres, skus):
+        """Construye la foto a partir de una lista de cantidades por cada ubicación."""
+        centavos = np.column_stack([a_centavos(cantidades_por_ubicacion[ubicacion]) for ubicacion in ubicaciones]) \
+            if len(ids) else np.empty((0, len(ubicaciones)), dtype=np.int64)
+        return cls(ubicaciones, ids, centavos, nombres, skus)
+
+    @classmethod
+    def ordenada(cls, ubicaciones, ids, centavos, nombres, skus):
+        """Construye la foto sin reordenar ni copiar; los ids ya deben venir en orden ascendente (p. ej. desde un memmap)."""
+        foto = cls.__new__(cls)
+        foto.ubicaciones = list(ubicaciones)
+        foto.ids, foto.centavos, foto.nombres, foto.skus = ids, centavos, nombres, skus
+        return foto
+
+    @classmethod
+    def concatenar(cls, ubicaciones, fotos):
+        """Une varias fotos (por ejemplo, los bloques de un ciclo) en una sola ordenada."""
+        fotos = list(fotos)
+        if not fotos:
+            return cls(ubicaciones, [], np.empty((0, len(ubicaciones)), dtype=np.int64), [], [])
+        return cls(ubicaciones, np.concatenate([foto.ids for foto in fotos]), np.concatenate([foto.centavos for foto in fotos]),
+                   np.concatenate([foto.nombres for foto in fotos]), np.concatenate([foto.skus for foto in fotos]))
+
+    def rebanada(self, inicio, fin):
+        """Filas [inicio, fin) como vista, sin copiar los arreglos."""
+        return StockSnapshot.ordenada(self.ubicaciones, self.ids[inicio:fin], self.centavos[inicio:fin], self.nombres[inicio:fin], self.skus[inicio:fin])
+
+    def entre(self, desde_id, hasta_id=None):
+        """Filas con desde_id < ProductoID <= hasta_id (sin límite superior si hasta_id es None)."""
+        inicio = np.searchsorted(self.ids, desde_id, side='right')
+        fin = len(self.ids) if hasta_id is None else np.searchsorted(self.ids, hasta_id, side='right')
+        return self.rebanada(inicio, fin)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CambiosStock:
+    """Conjunto compacto de cambios entre la foto de Odoo y la de MySQL."""
+    __slots__ = ('nuevos', 'nombres', 'skus', 'stock')
+
+    def __init__(self, nuevos, nombres, skus, stock):
+        self.nuevos = nuevos    # (ids, nombres, skus) de productos que no existen en MySQL
+        self.nombres = nombres  # (ids, valor_anterior, valor_nuevo)
+        self.skus = skus        # (ids, valor_anterior, valor_nuevo)
+        self.stock = stock      # {ubicacion: (ids, centavos_anteriores, centavos_nuevos)}
+
+    def total(self):
+        """Número de filas que cambian, sin contar inserciones."""
+        return len(self.nombres[0]) + len(self.skus[0]) + sum(len(ids) for ids, _, _ in self.stock.values())
+
+
+def diferencias_stock(odoo, mysql):
+    """Compara dos fotos ordenadas con operaciones vectorizadas.
+    Los productos presentes solo en MySQL se ignoran, igual que en la sincronización original."""
+    if len(mysql):
+        posiciones = np.searchsorted(mysql.ids, odoo.ids)
+        acotadas = np.minimum(posiciones, len(mysql) - 1)
+        encontrados = mysql.ids[acotadas] == odoo.ids
+    else:
+        acotadas = np.zeros(len(odoo), dtype=np.int64)
+        encontrados = np.zeros(len(odoo), dtype=bool)
+
+    nuevos = ~encontrados
+    oi = np.nonzero(encontrados)[0]
+    mi = acotadas[encontrados]
+
+    nombres_odoo, nombres_mysql = odoo.nombres[oi], mysql.nombres[mi]
+    cambio_nombre = (nombres_odoo != '') & (nombres_odoo != nombres_mysql)
+    skus_odoo, skus_mysql = odoo.skus[oi], mysql.skus[mi]
+    cambio_sku = (skus_odoo != '') & (skus_odoo != skus_mysql)
+
+    centavos_odoo = odoo.centavos[oi]
+    centavos_mysql = mysql.centavos[mi]
+    distintos = centavos_odoo != centavos_mysql
+    stock = {}
+    for columna, ubicacion in enumerate(odoo.ubicaciones):
+        filas = np.nonzero(distintos[:, columna])[0]
+        stock[ubicacion] = (odoo.ids[oi[filas]], centavos_mysql[filas, columna], centavos_odoo[filas, columna])
+
+    return CambiosStock(
+        nuevos=(odoo.ids[nuevos], odoo.nombres[nuevos], odoo.skus[nuevos]),
+        nombres=(odoo.ids[oi[cambio_nombre]], nombres_mysql[cambio_nombre], nombres_odoo[cambio_nombre]),
+        skus=(odoo.ids[oi[cambio_sku]], skus_mysql[cambio_sku], skus_odoo[cambio_sku]),
+        stock=stock,
+    )
+
+
+def foto_aplicada(odoo, mysql):
+    """Estado en que queda MySQL después de aplicar las diferencias: las filas de `mysql` con el stock de Odoo
+    y su nombre y SKU cuando no vienen vacíos. Los productos nuevos no se incluyen; los agrega quien los inserta."""
+    centavos, nombres, skus = mysql.centavos.copy(), mysql.nombres.copy(), mysql.skus.copy()
+    if len(mysql) and len(odoo):
+        posiciones = np.searchsorted(odoo.ids, mysql.ids)
+        acotadas = np.minimum(posiciones, len(odoo) - 1)
+        encontrados = odoo.ids[acotadas] == mysql.ids
+        mi = np.nonzero(encontrados)[0]
+        oi = acotadas[encontrados]
+        centavos[mi] = odoo.centavos[oi]
+        for destino, origen in ((nombres, odoo.nombres[oi]), (skus, odoo.skus[oi])):
+            con_valor = origen != ''
+            destino[mi[con_valor]] = origen[con_valor]
+    return StockSnapshot.ordenada(mysql.ubicaciones, mysql.ids, centavos, nombres, skus)
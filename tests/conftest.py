@@ -0,0 +1,162 @@
+# tests/conftest.py
+# Fixtures compartidas por las pruebas.
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import pytest
+from mysql.connector import Error
+from api.odoo_client import OdooClient
+from db import operations
+from db.operations import DatabaseOperations
+from processors import base_processor
+
+class CursorFalso:
+    """Cursor de mysql.connector sin servidor: registra lo ejecutado en su conexión y responde los SELECT."""
+    def __init__(self, conexion, opciones):
+        self.conexion = conexion
+        self.opciones = opciones
+        self.ejecutadas = []
+        self.filas = []
+        self.with_rows = False
+        self.rowcount = 1
+        self.cerrado = False
+
+    def execute(self, query, params=None):
+        self.conexion.verificar(query)
+        self.conexion.sentencias.append((query, params))
+        self.ejecutadas.append((query, params))
+        self.with_rows = query.lstrip().upper().startswith('SELECT')
+        respuesta = self.conexion.responder(query, params)
+        self.filas = list(respuesta or []) if self.with_rows else []
+        self.rowcount = len(self.filas) if self.with_rows else 1
+
+    def executemany(self, query, filas):
+        self.conexion.verificar(query)
+        filas = list(filas)
+        for fila in filas:
+            self.conexion.responder(query, fila)
+        self.conexion.lotes.append((query, filas))
+        self.rowcount = len(filas)
+
+    def callproc(self, nombre, params):
+        self.conexion.verificar(nombre)
+        self.conexion.sentencias.append((nombre, params))
+
+    def stored_results(self):
+        return []
+
+    def fetchall(self):
+        filas, self.filas = self.filas, []
+        return filas
+
+    def fetchmany(self, tamano):
+        filas, self.filas = self.filas[:tamano], self.filas[tamano:]
+        return filas
+
+    def close(self):
+        self.cerrado = True
+
+class ConexionFalsa:
+    """Conexión de mysql.connector sin servidor.
+    - `filas`: lo que devuelve cualquier SELECT, o `responder(query, params)` para simular una tabla (se llama también
+      con cada fila de un executemany).
+    - `fallar`: True, o una función `fallar(query)`, hace que la sentencia lance mysql.connector.Error.
+    Registra las sentencias como (query, params), los executemany, los cursores creados, commits y rollbacks."""
+    def __init__(self, filas=(), responder=None, fallar=False):
+        self.filas = list(filas)
+        self._responder = responder
+        self.fallar = fallar
+        self.sentencias = []
+        self.lotes = []
+        self.cursores = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.connection = self     # Hace también de DatabaseConnection (p. ej. para Coordinador)
+
+    @property
+    def consultas(self):
+        return [query for query, _ in self.sentencias]
+
+    def verificar(self, query):
+        if self.fallar is True or (callable(self.fallar) and self.fallar(query)):
+            raise Error(f"Falla simulada en: {query}")
+
+    def responder(self, query, params):
+        if self._responder is not None:
+            return self._responder(query, params)
+        return self.filas
+
+    def cursor(self, **opciones):
+        cursor = CursorFalso(self, opciones)
+        self.cursores.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def is_connected(self):
+        return False
+
+class ConexionBD:
+    """Sustituye a DatabaseConnection envolviendo una conexión falsa ya abierta."""
+    def __init__(self, connection):
+        self.connection = connection
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+class OdooFalso(OdooClient):
+    """Cliente real (política, single-flight, gobernador, conteo) que responde con `responder(model, method, args, kwargs)`
+    en vez de la red."""
+    def __init__(self, responder=None):
+        self.responder = responder
+        super().__init__()
+
+    def connect(self):
+        self.uid = 1
+
+    def _llamar_odoo(self, model, method, args, kwargs, timeout):
+        if self.responder is None:
+            raise AssertionError(f"Llamada inesperada {model}.{method}")
+        return self.responder(model, method, args, kwargs)
+
+@pytest.fixture
+def conexion_falsa():
+    """Clase de la conexión falsa de MySQL, para crearla con las filas o el comportamiento de cada prueba."""
+    return ConexionFalsa
+
+@pytest.fixture
+def crear_operaciones():
+    """Devuelve una función que crea DatabaseOperations sobre una conexión falsa, sin un servidor MySQL."""
+    def crear(conexion=None):
+        return DatabaseOperations(ConexionBD(conexion if conexion is not None else ConexionFalsa()))
+    return crear
+
+@pytest.fixture
+def crear_procesador(monkeypatch):
+    """Devuelve una función que construye un procesador con su __init__ real: OdooClient responde con `responder` y
+    toda conexión a MySQL que se abra (la del procesador, la de cada DatabaseOperations y la de la auditoría) es
+    `conexion`. Al terminar la prueba se cierra la auditoría de los procesadores que la tengan."""
+    creados = []
+    def crear(clase, *args, responder=None, conexion=None, **kwargs):
+        conexion = conexion if conexion is not None else ConexionFalsa()
+        monkeypatch.setattr(base_processor, 'OdooClient', lambda: OdooFalso(responder))
+        monkeypatch.setattr(base_processor, 'DatabaseConnection', lambda: ConexionBD(conexion))
+        monkeypatch.setattr(operations, 'DatabaseConnection', lambda: ConexionBD(conexion))
+        processor = clase(*args, **kwargs)
+        creados.append(processor)
+        return processor
+    yield crear
+    for processor in creados:
+        if getattr(processor, 'audit', None) is not None:
+            processor.audit.close()
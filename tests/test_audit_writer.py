@@ -0,0 +1,75 @@
+# tests/test_audit_writer.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import time
+import atexit
+import pytest
+from db.audit_writer import AuditWriter
+
+def registro(producto_id):
+    return (producto_id, f'SKU{producto_id}', 'Actualizar', 'Stock', '1', '2', 'QRA')
+
+def esperar(condicion, segundos=3):
+    limite = time.monotonic() + segundos
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return condicion()
+
+@pytest.fixture
+def escritor(crear_operaciones, conexion_falsa, monkeypatch):
+    """AuditWriter sobre una conexión falsa; devuelve también las funciones registradas en atexit."""
+    registradas = []
+    creados = []
+    monkeypatch.setattr(atexit, 'register', registradas.append)
+    def crear(**kwargs):
+        conexion = conexion_falsa()
+        writer = AuditWriter(db_operations=crear_operaciones(conexion), **kwargs)
+        creados.append(writer)
+        return writer, conexion, registradas
+    yield crear
+    for writer in creados:
+        writer.close()
+
+def test_registro_logs_multiples_usa_un_executemany(crear_operaciones, conexion_falsa):
+    """Prueba que varios registros se insertan con un solo executemany y una sola confirmación."""
+    conexion = conexion_falsa()
+    crear_operaciones(conexion).registro_logs_multiples([registro(1), registro(2), registro(3)])
+    assert len(conexion.lotes) == 1
+    query, filas = conexion.lotes[0]
+    assert query.startswith("INSERT INTO LogsProductos") and filas == [registro(1), registro(2), registro(3)]
+    assert conexion.commits == 1
+
+def test_escribe_al_llenarse_el_lote(escritor):
+    """Prueba que el hilo escribe en cuanto el buffer alcanza el tamaño del lote, sin esperar el intervalo."""
+    writer, conexion, _ = escritor(tamano_lote=2, intervalo=60)
+    writer.registrar(*registro(1))
+    assert writer.pendientes() == 1
+    writer.registrar(*registro(2))
+    assert esperar(lambda: conexion.lotes)
+    assert conexion.lotes[0][1] == [registro(1), registro(2)] and writer.pendientes() == 0
+
+def test_escribe_al_vencer_el_intervalo(escritor):
+    """Prueba que un lote incompleto se escribe al vencer el intervalo."""
+    writer, conexion, _ = escritor(tamano_lote=100, intervalo=0.05)
+    writer.registrar(*registro(1))
+    assert esperar(lambda: conexion.lotes)
+    assert conexion.lotes[0][1] == [registro(1)]
+
+def test_error_conserva_pendientes_y_cierre_registrado_en_atexit(escritor):
+    """Prueba que un lote fallido queda en el buffer y que el cierre registrado en atexit lo escribe."""
+    writer, conexion, registradas = escritor(tamano_lote=100, intervalo=60)
+    assert writer.close in registradas
+    conexion.fallar = True
+    writer.registrar(*registro(1))
+    assert writer.flush() == 0 and writer.pendientes() == 1
+    conexion.fallar = False
+    writer.registrar(*registro(2))
+    for funcion in registradas:
+        funcion()
+    assert conexion.lotes == [(conexion.lotes[0][0], [registro(1), registro(2)])]
+    assert writer.pendientes() == 0
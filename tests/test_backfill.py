@@ -0,0 +1,84 @@
+# tests/test_backfill.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import contextlib
+import xmlrpc.client
+import pytest
+from datetime import datetime
+from config.settings import Config
+from processors.backfill_processor import BackfillProcessor, ventanas, dominio_historico
+from api.dominios import coincide_dominio
+
+def test_ventanas_cubren_el_rango_sin_huecos():
+    """Prueba que las ventanas son consecutivas y la última se recorta al final del rango."""
+    lista = ventanas(datetime(2024, 5, 1), datetime(2024, 5, 3, 12), 24)
+    assert lista == [
+        (datetime(2024, 5, 1), datetime(2024, 5, 2)),
+        (datetime(2024, 5, 2), datetime(2024, 5, 3)),
+        (datetime(2024, 5, 3), datetime(2024, 5, 3, 12)),
+    ]
+
+def test_dominio_historico_acepta_albaranes_terminados():
+    """Prueba que el dominio histórico acepta albaranes ya terminados de la regla y respeta el rango de fechas."""
+    reglas = [{'nombre': 'ordenes_entrega', 'dominio': [('state', '=', 'assigned'), ('name', 'like', 'WH/OUT/%')]}]
+    dominio = dominio_historico(reglas, datetime(2024, 5, 1), datetime(2024, 5, 2))
+    assert ('create_date', '>=', '2024-05-01 00:00:00') in dominio
+    condiciones = [condicion for condicion in dominio[2:] if condicion != '&']
+    assert coincide_dominio({'state': 'done', 'name': 'WH/OUT/00012'}, condiciones)
+    assert not coincide_dominio({'state': 'cancel', 'name': 'WH/OUT/00012'}, condiciones)
+
+class OperacionesFalsas:
+    """DatabaseOperations mínima: registra los albaranes marcados como procesados."""
+    def __init__(self):
+        self.marcados = []
+
+    def albaranes_procesados(self, albaran_ids):
+        return set()
+
+    def huellas_guardadas(self, claves):
+        return None
+
+    def unidad_de_trabajo(self):
+        return contextlib.nullcontext()
+
+    def elemento(self, descripcion):
+        return contextlib.nullcontext()
+
+    def insertar_o_actualizar_albaran(self, *args):
+        pass
+
+    def insertar_detalle_albaran(self, *args):
+        pass
+
+    def marcar_albaran_como_procesado(self, albaran_id):
+        self.marcados.append(albaran_id)
+
+    def guardar_huellas(self, nuevas):
+        pass
+
+def responder(model, method, args, kwargs):
+    """Odoo falso con dos albaranes terminados; la lectura del bloque con la línea 21 falla."""
+    if (model, method) == ('stock.picking', 'search_read'):
+        return [{'id': albaran_id, 'name': f'WH/OUT/{albaran_id}', 'partner_id': [3, 'Cliente'], 'create_date': '2024-05-01 10:00:00',
+                 'state': 'done', 'move_ids': [albaran_id * 10, albaran_id * 10 + 1]} for albaran_id in (1, 2)]
+    if (model, method) == ('stock.move', 'read'):
+        if 21 in args[0]:
+            raise xmlrpc.client.Fault(2, "MissingError")
+        return [{'id': linea_id, 'product_id': [linea_id, 'P'], 'product_uom_qty': 1.0, 'location_dest_id': [9, 'Salida']}
+                for linea_id in args[0]]
+    raise AssertionError(f"Llamada inesperada {model}.{method}")
+
+def test_albaran_con_lineas_sin_leer_no_se_marca_y_la_ventana_falla(crear_procesador, monkeypatch):
+    """Prueba que la reingesta no marca procesado un albarán con líneas sin leer y reporta la ventana para repetirla."""
+    monkeypatch.setattr(Config, 'ODOO_CHUNK_SIZE', 2)
+    backfill = crear_procesador(BackfillProcessor, ['albaranes'], responder=responder)
+    assert backfill.recibos is None and backfill.revisar is False
+    operaciones = OperacionesFalsas()
+    with pytest.raises(RuntimeError, match=r'\[2\]'):
+        backfill.backfill_albaranes(datetime(2024, 5, 1), datetime(2024, 5, 2), operaciones)
+    assert operaciones.marcados == [1]
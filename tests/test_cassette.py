@@ -0,0 +1,30 @@
+# tests/test_cassette.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import xmlrpc.client
+import pytest
+from api.cassette import GrabadorCassette, ReproductorCassette, LlamadaNoGrabada
+
+def test_cassette_reproduce_respuestas_y_errores(tmp_path):
+    """Prueba que lo grabado se reproduce en orden, incluidos los errores, y que lo no grabado se rechaza."""
+    grabador = GrabadorCassette(str(tmp_path), uid=7)
+    grabador.grabar('product.product', 'search', [[('id', '>', 0)]], {'limit': 2}, 0.2, respuesta=[1, 2])
+    grabador.grabar('product.product', 'search', [[('id', '>', 0)]], {'limit': 2}, 0.1, respuesta=[1, 2, 3])
+    grabador.grabar('stock.picking', 'read', [[5]], {}, 0.05, error=xmlrpc.client.Fault(2, 'Acceso denegado'))
+    grabador.close()
+
+    reproductor = ReproductorCassette(str(tmp_path), velocidad=0)
+    assert reproductor.uid == 7
+    # Las tuplas del dominio producen la misma clave que las listas grabadas
+    assert reproductor.responder('product.product', 'search', [[('id', '>', 0)]], {'limit': 2}) == [1, 2]
+    assert reproductor.responder('product.product', 'search', [[['id', '>', 0]]], {'limit': 2}) == [1, 2, 3]
+    assert reproductor.responder('product.product', 'search', [[('id', '>', 0)]], {'limit': 2}) == [1, 2, 3]
+    with pytest.raises(xmlrpc.client.Fault):
+        reproductor.responder('stock.picking', 'read', [[5]], {})
+    with pytest.raises(LlamadaNoGrabada):
+        reproductor.responder('stock.picking', 'read', [[6]], {})
@@ -0,0 +1,78 @@
+# tests/test_catalogo.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import threading
+from db.models import ProductCatalog
+
+def test_catalogo_resuelve_sku_e_id():
+    """Prueba las búsquedas por SKU y por ProductoID tras la carga."""
+    catalogo = ProductCatalog()
+    catalogo.cargar([(10, 'SKU-A', 'Tornillo'), (20, 'SKU-B', 'Tuerca')])
+    assert catalogo.id_por_sku('SKU-B') == 20
+    assert catalogo.id_por_sku('SKU-X') is None
+    assert catalogo.producto(10).ProductoNombre == 'Tornillo'
+    assert len(catalogo) == 2
+
+def test_catalogo_olvida_y_anota_cambios_de_sku():
+    """Prueba que un cambio de SKU invalida la entrada anterior y el refresco puntual la corrige."""
+    catalogo = ProductCatalog()
+    catalogo.cargar([(10, 'SKU-A', 'Tornillo')])
+    catalogo.olvidar(10, 'SKU-A2')
+    assert catalogo.id_por_sku('SKU-A') is None
+    assert catalogo.producto(10) is None
+    catalogo.anotar(10, 'SKU-A2', 'Tornillo')
+    assert catalogo.id_por_sku('SKU-A2') == 10
+    assert len(catalogo) == 1
+
+def test_catalogo_carga_una_vez_mientras_esta_vigente():
+    """Prueba que asegurar() solo llama al cargador si el catálogo no está cargado o venció."""
+    catalogo = ProductCatalog()
+    cargas = []
+    cargador = lambda: cargas.append(1) or [(1, 'S1', 'Uno')]
+    catalogo.asegurar(cargador, max_edad=60)
+    catalogo.asegurar(cargador, max_edad=60)
+    assert len(cargas) == 1
+    catalogo.asegurar(cargador, max_edad=0)
+    assert len(cargas) == 2
+
+def test_refrescos_puntuales_no_crecen_sin_limite():
+    """Prueba que anotar el mismo producto muchas veces compacta las columnas y conserva las búsquedas."""
+    catalogo = ProductCatalog()
+    catalogo.cargar([(10, 'SKU-A', 'Tornillo'), (20, 'SKU-B', 'Tuerca')])
+    for vuelta in range(5000):
+        catalogo.anotar(10, f'SKU-A{vuelta % 3}', 'Tornillo')
+    assert len(catalogo.ids) <= 1024 + 2 * len(catalogo) + 1
+    assert catalogo.id_por_sku('SKU-A1') == 10 and catalogo.id_por_sku('SKU-B') == 20
+    assert catalogo.producto(20).ProductoNombre == 'Tuerca'
+    assert len(catalogo) == 2
+
+def test_busquedas_concurrentes_con_recargas():
+    """Prueba que las búsquedas durante recargas nunca mezclan posiciones de una carga con ids de otra."""
+    catalogo = ProductCatalog()
+    cargas = [[(ProductoID, f'S{ProductoID}', 'N') for ProductoID in range(inicio, inicio + 200)] for inicio in (0, 1000)]
+    catalogo.cargar(cargas[0])
+    errores = []
+    detener = threading.Event()
+    def buscar():
+        while not detener.is_set():
+            try:
+                for ProductoID in (5, 150, 1005, 1150):
+                    encontrado = catalogo.id_por_sku(f'S{ProductoID}')
+                    assert encontrado in (None, ProductoID)
+            except Exception as e:
+                errores.append(e)
+                return
+    hilos = [threading.Thread(target=buscar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for vuelta in range(200):
+        catalogo.cargar(cargas[vuelta % 2])
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
@@ -0,0 +1,66 @@
+# tests/test_cola_trabajo.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import time
+from config.settings import Config
+from processors.recibos_processor import RecibosCM03Processor
+from utils.cola_trabajo import ColaTrabajo
+from utils.frescura import frescura
+
+def test_encolar_arrendar_y_confirmar(tmp_path):
+    """Prueba que un trabajo activo no se duplica y que al confirmarlo sale de la cola."""
+    cola = ColaTrabajo(str(tmp_path / 'cola.sqlite3'))
+    assert cola.encolar('albaran', 10, {'albaran': {'id': 10}})
+    assert not cola.encolar('albaran', 10)
+    trabajos = cola.arrendar('albaran', 'prueba', limite=5)
+    assert [(t.clave, t.carga, t.intentos) for t in trabajos] == [('10', {'albaran': {'id': 10}}, 1)]
+    assert cola.arrendar('albaran', 'prueba') == []
+    cola.confirmar(trabajos[0])
+    assert cola.pendientes('albaran') == 0
+
+def test_reintentos_y_cola_de_muertos(tmp_path):
+    """Prueba que un trabajo fallido se reintenta y, al agotar sus intentos, pasa a la cola de muertos."""
+    cola = ColaTrabajo(str(tmp_path / 'cola.sqlite3'), max_intentos=2, backoff_base=0, backoff_max=0)
+    cola.encolar('recibo', 7)
+    trabajo, = cola.arrendar('recibo', 'prueba')
+    assert cola.fallar(trabajo, 'Odoo caído')
+    trabajo, = cola.arrendar('recibo', 'prueba')
+    assert trabajo.intentos == 2
+    assert not cola.fallar(trabajo, 'Odoo caído')
+    assert cola.arrendar('recibo', 'prueba') == []
+    assert cola.muertos('recibo') == [('7', 2, 'Odoo caído')]
+    assert cola.reintentar_muertos('recibo') == 1
+    assert cola.pendientes('recibo') == 1
+
+def test_arriendo_vencido_se_recupera(tmp_path):
+    """Prueba que un trabajo cuyo arriendo venció (proceso caído) vuelve a estar disponible."""
+    cola = ColaTrabajo(str(tmp_path / 'cola.sqlite3'))
+    cola.encolar('albaran', 1)
+    assert cola.arrendar('albaran', 'caido', duracion=0.01)
+    time.sleep(0.02)
+    trabajo, = cola.arrendar('albaran', 'nuevo')
+    assert trabajo.intentos == 2
+
+def test_recibos_ya_registrados_no_se_encolan(crear_procesador, conexion_falsa, monkeypatch, tmp_path):
+    """Prueba que en modo cola solo se encolan los recibos del día que aún no están en Recibos, ciclo tras ciclo,
+    y que la frescura publica ese atraso real."""
+    monkeypatch.setattr(Config, 'COLA_TRABAJADORES', 1)
+    monkeypatch.setattr(Config, 'COLA_RUTA', str(tmp_path / 'cola.sqlite3'))
+    registrados = {1, 2}
+    conexion = conexion_falsa(responder=lambda query, params: [{'ReciboID': recibo_id} for recibo_id in params if recibo_id in registrados])
+    processor = crear_procesador(RecibosCM03Processor, conexion=conexion)
+
+    processor.despachar_recibos([1, 2, 3])
+    trabajos = processor.cola.arrendar(processor.tipo_trabajo, 'prueba', limite=10)
+    assert [trabajo.clave for trabajo in trabajos] == ['3']
+    processor.cola.confirmar(trabajos[0])
+    registrados.add(3)
+
+    processor.despachar_recibos([1, 2, 3])
+    assert processor.cola.pendientes(processor.tipo_trabajo) == 0
+    assert frescura.resumen('RecibosCM03Processor')['pendientes'] == 0
@@ -0,0 +1,33 @@
+# tests/test_consulta_preparada.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from db.operations import SQL_ALBARAN_PROCESADO, SQL_SKU_EN_BD
+
+def test_cursor_preparado_se_reutiliza_por_consulta(crear_operaciones, conexion_falsa):
+    """Prueba que cada consulta frecuente prepara su cursor una sola vez y lo reutiliza con otros parámetros."""
+    conexion = conexion_falsa([(1,)])
+    operaciones = crear_operaciones(conexion)
+    for albaran_id in (1, 2, 3):
+        assert operaciones.consulta_preparada(SQL_ALBARAN_PROCESADO, (albaran_id,)) == [(1,)]
+    operaciones.consulta_preparada(SQL_SKU_EN_BD, ('SKU1',))
+    assert len(conexion.cursores) == 2
+    assert all(cursor.opciones == {'prepared': True} for cursor in conexion.cursores)
+    assert conexion.cursores[0].ejecutadas == [(SQL_ALBARAN_PROCESADO, (1,)), (SQL_ALBARAN_PROCESADO, (2,)), (SQL_ALBARAN_PROCESADO, (3,))]
+
+def test_cursor_preparado_se_descarta_tras_un_error(crear_operaciones, conexion_falsa):
+    """Prueba que un error cierra y olvida el cursor en caché y que la siguiente llamada prepara uno nuevo."""
+    conexion = conexion_falsa([(1,)])
+    operaciones = crear_operaciones(conexion)
+    operaciones.consulta_preparada(SQL_ALBARAN_PROCESADO, (1,))
+    conexion.fallar = True
+    assert operaciones.consulta_preparada(SQL_ALBARAN_PROCESADO, (2,)) is None
+    assert conexion.cursores[0].cerrado and SQL_ALBARAN_PROCESADO not in operaciones._preparadas
+    assert operaciones.errores == 1
+    conexion.fallar = False
+    assert operaciones.consulta_preparada(SQL_ALBARAN_PROCESADO, (2,)) == [(1,)]
+    assert len(conexion.cursores) == 2 and operaciones._preparadas[SQL_ALBARAN_PROCESADO] is conexion.cursores[1]
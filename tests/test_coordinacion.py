@@ -0,0 +1,82 @@
+# tests/test_coordinacion.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import time
+import pytest
+from config.settings import Config
+from db.coordinacion import Coordinador
+from db.plan_cambios import PlanCambios
+from processors import base_processor
+from processors.tarimas_processor import TarimasProcessor
+
+def tabla_arriendos(tabla):
+    """Interpreta las sentencias de Coordinador sobre una tabla Arrendamientos en memoria {(recurso, clave): [nodo, vence]}."""
+    def responder(query, params):
+        if query.startswith("SELECT Clave"):
+            recurso, *claves, limite = params
+            ahora = time.time()
+            libres = sorted(clave for clave in claves if tabla[(recurso, clave)][1] < ahora)
+            return [(clave,) for clave in libres[:limite]]
+        if query.startswith("INSERT IGNORE INTO Arrendamientos"):
+            tabla.setdefault(tuple(params), [None, 0])
+        elif query.startswith("UPDATE Arrendamientos"):
+            nodo, duracion, recurso, *claves = params
+            for clave in claves:
+                tabla[(recurso, clave)] = [nodo, time.time() + duracion]
+        elif query.startswith("DELETE FROM Arrendamientos WHERE Recurso = %s AND Nodo"):
+            recurso, nodo, *claves = params
+            for clave in claves:
+                if tabla.get((recurso, clave), [None])[0] == nodo:
+                    del tabla[(recurso, clave)]
+        return []
+    return responder
+
+@pytest.fixture
+def nodos(conexion_falsa):
+    """Dos coordinadores (dos nodos) que comparten la misma tabla de arriendos."""
+    responder = tabla_arriendos({})
+    return [Coordinador(nodo, conexion_falsa(responder=responder)) for nodo in ('nodo-a', 'nodo-b')]
+
+def test_nodos_reciben_claves_disjuntas(nodos):
+    """Prueba que dos nodos que piden las mismas claves se reparten conjuntos disjuntos y el tercero no recibe nada."""
+    a, b = nodos
+    tomadas_a = a.arrendar('albaran', range(1, 7), limite=3)
+    tomadas_b = b.arrendar('albaran', range(1, 7), limite=10)
+    assert tomadas_a == ['1', '2', '3']
+    assert tomadas_b == ['4', '5', '6']
+    assert a.arrendar('albaran', range(1, 7)) == []
+
+def test_arriendos_se_liberan_si_el_bloque_falla(nodos, crear_procesador, monkeypatch):
+    """Prueba que una excepción dentro de arriendos() suelta de inmediato las claves para otro nodo."""
+    a, b = nodos
+    monkeypatch.setattr(Config, 'COORD_ACTIVA', True)
+    monkeypatch.setattr(base_processor, 'coordinador_del_hilo', lambda: a)
+    processor = crear_procesador(TarimasProcessor)
+    with pytest.raises(RuntimeError):
+        with processor.arriendos('albaran', [1, 2]) as tomadas:
+            assert tomadas == [1, 2]
+            raise RuntimeError("falló el lote")
+    assert b.arrendar('albaran', [1, 2]) == ['1', '2']
+
+    with processor.arriendos('albaran', [3]) as tomadas:
+        assert tomadas == [3]
+    assert b.arrendar('albaran', [3]) == []     # Al terminar bien el arriendo se deja vencer
+
+def test_sin_coordinacion_o_al_simular_no_se_arrienda(crear_procesador, monkeypatch):
+    """Prueba que con COORD_ACTIVA=0 o en simulación se producen todas las claves sin tocar la tabla de arriendos."""
+    def sin_coordinador():
+        raise AssertionError("no debe arrendar")
+    monkeypatch.setattr(base_processor, 'coordinador_del_hilo', sin_coordinador)
+    processor = crear_procesador(TarimasProcessor)
+    monkeypatch.setattr(Config, 'COORD_ACTIVA', False)
+    with processor.arriendos('albaran', [1, 2]) as tomadas:
+        assert tomadas == [1, 2]
+    monkeypatch.setattr(Config, 'COORD_ACTIVA', True)
+    processor.db_operations.activar_simulacion(PlanCambios())
+    with processor.arriendos('albaran', [1, 2]) as tomadas:
+        assert tomadas == [1, 2]
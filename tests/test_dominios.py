@@ -0,0 +1,30 @@
+# tests/test_dominios.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import pytest
+from api.dominios import combinar_dominios_or, coincide_dominio
+
+def test_combinar_dominios_or_en_notacion_prefija():
+    """Prueba que cada dominio se une con '&' y los dominios entre sí con '|', omitiendo los vacíos."""
+    a = [('state', '=', 'assigned'), ('name', 'like', 'WH/OUT/%')]
+    b = [('priority', '=', 1)]
+    assert combinar_dominios_or([a, [], b]) == ['|', '&', *a, *b]
+    assert combinar_dominios_or([b]) == b
+    assert combinar_dominios_or([]) == []
+
+def test_coincide_dominio_evalua_operadores_localmente():
+    """Prueba =, in, many2one y los comodines de like sobre un registro leído de Odoo."""
+    albaran = {'name': 'WH/INT/00042', 'state': 'assigned', 'priority': '1', 'partner_id': [7, 'Cliente']}
+    assert coincide_dominio(albaran, [('priority', '=', 1), ('state', '=', 'assigned'), ('name', 'like', 'WH/INT%')])
+    assert coincide_dominio(albaran, [('partner_id', '=', 7), ('state', 'in', ['assigned', 'done'])])
+    assert coincide_dominio(albaran, [('name', 'ilike', 'int/000__')])
+    assert not coincide_dominio(albaran, [('name', '=like', 'INT%')])
+    assert not coincide_dominio(albaran, [('name', 'like', 'WH/OUT/%')])
+    assert coincide_dominio(albaran, [])
+    with pytest.raises(ValueError):
+        coincide_dominio(albaran, [('id', 'child_of', 1)])
@@ -0,0 +1,40 @@
+# tests/test_foto_stock.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from utils.stock_diff import StockSnapshot
+from utils.foto_stock import guardar_foto, cargar_foto
+
+UBICACIONES = ['QRA', 'CDMX']
+
+def foto_ejemplo():
+    return StockSnapshot.desde_columnas(
+        UBICACIONES, [7, 3, 5], {'QRA': [1.5, 0, 2], 'CDMX': [0, 4.25, None]},
+        ['Tornillo', 'Ñandú', None], ['S7', '', 'S5'])
+
+def test_foto_se_guarda_y_se_abre_con_memmap(tmp_path):
+    """Prueba que la foto guardada se recupera igual, con su generación y su marca de MySQL."""
+    ruta = str(tmp_path / 'foto.bin')
+    guardar_foto(ruta, foto_ejemplo(), 4, (6, 1717171717, 3, 7))
+    foto, generacion, marca = cargar_foto(ruta, UBICACIONES)
+    assert (generacion, marca) == (4, (6, 1717171717, 3, 7))
+    assert foto.ids.tolist() == [3, 5, 7]
+    assert foto.centavos.tolist() == [[0, 425], [200, 0], [150, 0]]
+    assert foto.nombres.tolist() == ['Ñandú', '', 'Tornillo']
+    assert foto.skus.tolist() == ['', 'S5', 'S7']
+    assert foto.entre(3, 5).ids.tolist() == [5]
+
+def test_foto_danada_o_de_otras_ubicaciones_se_ignora(tmp_path):
+    """Prueba que un CRC distinto o ubicaciones diferentes obligan a leer MySQL completo."""
+    ruta = str(tmp_path / 'foto.bin')
+    guardar_foto(ruta, foto_ejemplo(), 1, (0, 0, 0, 0))
+    assert cargar_foto(ruta, ['QRA']) is None
+    with open(ruta, 'r+b') as archivo:
+        archivo.seek(-1, os.SEEK_END)
+        archivo.write(b'X')
+    assert cargar_foto(ruta, UBICACIONES) is None
+    assert cargar_foto(str(tmp_path / 'no_existe.bin'), UBICACIONES) is None
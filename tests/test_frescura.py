@@ -0,0 +1,31 @@
+# tests/test_frescura.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from utils.frescura import Frescura, marca_odoo
+
+def test_marca_odoo_usa_write_date_en_utc():
+    """Prueba que la fecha de Odoo se interpreta en UTC y que write_date tiene prioridad sobre create_date."""
+    assert marca_odoo('1970-01-01 00:01:00') == 60
+    assert marca_odoo({'create_date': '1970-01-01 00:00:10', 'write_date': '1970-01-01 00:00:20'}) == 20
+    assert marca_odoo({'create_date': '1970-01-01 00:00:10', 'write_date': False}) == 10
+    assert marca_odoo(None) is None
+
+def test_aviso_una_vez_por_confirmacion_con_el_peor_atraso():
+    """Prueba que el aviso recibe el mayor atraso que excede el umbral y se publican percentiles y pendientes."""
+    seguimiento = Frescura(umbral_seg=100)
+    avisos = []
+    seguimiento.al_exceder_umbral(lambda procesador, atraso, umbral: avisos.append((procesador, atraso, umbral)))
+    seguimiento.observar('PruebaFrescura', [1000, 950, 990], confirmado=1010)
+    seguimiento.observar('PruebaFrescura', [1000], confirmado=1001)
+    seguimiento.pendientes('PruebaFrescura', 7)
+    assert avisos == []
+    seguimiento.observar('PruebaFrescura', [800, 500], confirmado=1000)
+    assert avisos == [('PruebaFrescura', 500, 100)]
+    resumen = seguimiento.resumen_todos()['PruebaFrescura']
+    assert resumen['pendientes'] == 7
+    assert resumen['p99'] == 500
@@ -0,0 +1,57 @@
+# tests/test_gobernador.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from api.gobernador import GobernadorOdoo, interpretar_tasas
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+def test_cubeta_y_tope_compartidos_por_archivo(tmp_path):
+    """Prueba que dos gobernadores sobre el mismo archivo comparten las fichas de la cubeta y el tope de concurrencia."""
+    reloj = Reloj()
+    ruta = str(tmp_path / 'gobernador.json')
+    tasas = interpretar_tasas('stock.quant:read_group=2,*=100')
+    uno = GobernadorOdoo(ruta, tasas, concurrencia_max=3, concurrencia_min=1, latencia_objetivo=1, reloj=reloj)
+    otro = GobernadorOdoo(ruta, tasas, concurrencia_max=3, concurrencia_min=1, latencia_objetivo=1, reloj=reloj)
+
+    assert uno.cubeta_para('stock.quant', 'read_group') == 'stock.quant:read_group'
+    assert uno.cubeta_para('product.product', 'read') == '*'
+    assert uno.intentar('stock.quant', 'read_group') == (True, 0)
+    assert otro.intentar('stock.quant', 'read_group') == (True, 0)
+    obtenido, espera = uno.intentar('stock.quant', 'read_group')
+    assert not obtenido and espera > 0          # La ráfaga de 2 se agotó entre ambos
+    assert otro.intentar('product.product', 'read') == (True, 0)
+    assert uno.intentar('product.product', 'read')[0] is False   # Tope de 3 turnos en curso
+
+    uno.liberar('read', 0.1)
+    reloj.ahora += 0.5
+    assert otro.intentar('stock.quant', 'read_group') == (True, 0)
+
+def test_tope_se_recorta_con_latencia_y_recupera(tmp_path):
+    """Prueba que la latencia sobre el objetivo recorta el tope (una vez por segundo) y que se recupera de a poco."""
+    reloj = Reloj()
+    gobernador = GobernadorOdoo(str(tmp_path / 'gobernador.json'), {}, concurrencia_max=8, concurrencia_min=1, latencia_objetivo=1, reloj=reloj)
+    for _ in range(3):
+        gobernador.intentar('stock.quant', 'read_group')
+        gobernador.liberar('read_group', 5.0)
+    with gobernador._estado() as estado:
+        assert estado['limite'] == 8 * 0.7 and estado['en_curso'] == {}
+
+    reloj.ahora += 1
+    gobernador.liberar('write', 0.1, sobrecarga=True)
+    with gobernador._estado() as estado:
+        assert round(estado['limite'], 2) == round(8 * 0.7 * 0.7, 2)
+        estado['latencia'] = 0.2
+    for _ in range(20):
+        gobernador.liberar('read', 0.2)
+    with gobernador._estado() as estado:
+        assert estado['limite'] > 8 * 0.7 * 0.7
@@ -0,0 +1,47 @@
+# tests/test_huellas.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from utils.huellas import huella, ALBARAN, ALBARAN_LINEA
+from processors.picking_ingestion_processor import PickingIngestionProcessor
+
+class OperacionesFalsas:
+    """Registra las llamadas de escritura del albarán sin MySQL."""
+    def __init__(self):
+        self.llamadas = []
+
+    def __getattr__(self, nombre):
+        return lambda *args: self.llamadas.append((nombre, args))
+
+ALBARAN_DATA = {'id': 7, 'name': 'WH/OUT/00007', 'partner_id': [3, 'Cliente'], 'create_date': '2024-05-01 10:00:00', 'move_ids': [70, 71]}
+LINEAS = {
+    70: {'product_id': [500, 'A'], 'product_uom_qty': 2.0, 'location_dest_id': [9, 'Clientes']},
+    71: {'product_id': [501, 'B'], 'product_uom_qty': 1.0, 'location_dest_id': [9, 'Clientes']},
+}
+
+def test_huella_estable_e_independiente_del_orden_de_llaves():
+    """Prueba que la huella no depende del orden de las llaves y sí del contenido."""
+    assert huella([1, {'a': 1, 'b': 2}]) == huella([1, {'b': 2, 'a': 1}])
+    assert huella([1, 2.0]) != huella([1, 2.5])
+    assert len(huella(['x'])) == 16
+
+def test_albaran_sin_cambios_no_se_escribe(crear_procesador):
+    """Prueba que con las huellas guardadas solo se reescribe la línea que cambió, y nada si no cambió nada."""
+    procesador = crear_procesador(PickingIngestionProcessor)
+    operaciones = OperacionesFalsas()
+    assert procesador.escribir_albaran(ALBARAN_DATA, LINEAS, db_operations=operaciones, huellas={})
+    guardadas = {(entidad, clave): valor for nombre, args in operaciones.llamadas if nombre == 'guardar_huellas' for entidad, clave, valor in args[0]}
+    assert set(guardadas) == {(ALBARAN, 7), (ALBARAN_LINEA, 70), (ALBARAN_LINEA, 71)}
+
+    operaciones.llamadas.clear()
+    assert not procesador.escribir_albaran(ALBARAN_DATA, LINEAS, db_operations=operaciones, huellas=guardadas, procesado=True)
+    assert [nombre for nombre, _ in operaciones.llamadas] == ['guardar_huellas']
+
+    lineas = {**LINEAS, 71: dict(LINEAS[71], product_uom_qty=3.0)}
+    operaciones.llamadas.clear()
+    assert procesador.escribir_albaran(ALBARAN_DATA, lineas, db_operations=operaciones, huellas=guardadas, procesado=True)
+    assert [nombre for nombre, _ in operaciones.llamadas] == ['insertar_detalle_albaran', 'marcar_albaran_como_procesado', 'guardar_huellas']
@@ -0,0 +1,28 @@
+# tests/test_migrations.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from db.migrations import indice_cubre, escaneos_completos
+from db.models import TABLAS
+
+def test_indice_cubre_por_prefijo():
+    """Prueba que un índice compuesto cubre a sus columnas iniciales pero no a las demás."""
+    existentes = [['PRIMARY_ID'], ['AlbaranID', 'ProductoID']]
+    assert indice_cubre(('AlbaranID',), existentes)
+    assert indice_cubre(('AlbaranID', 'ProductoID'), existentes)
+    assert not indice_cubre(('ProductoID',), existentes)
+
+def test_escaneos_completos_en_plan():
+    """Prueba que solo las filas del EXPLAIN con type ALL se reportan."""
+    plan = [{'table': 'vt', 'type': 'ref'}, {'table': 'ta', 'type': 'ALL', 'rows': 5000}]
+    assert escaneos_completos(plan) == [plan[1]]
+
+def test_indices_declarados_usan_columnas_declaradas():
+    """Prueba que cada índice declarado se compone de columnas declaradas en su tabla."""
+    for tabla in TABLAS:
+        for columnas in tabla.indices.values():
+            assert set(columnas) <= set(tabla.columnas)
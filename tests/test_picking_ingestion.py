@@ -0,0 +1,64 @@
+# tests/test_picking_ingestion.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import xmlrpc.client
+import pytest
+from config.settings import Config
+from api.gobernador import GobernadorOdoo
+from utils.cola_trabajo import ColaTrabajo
+from processors.picking_ingestion_processor import PickingIngestionProcessor, REGLAS_PICKING
+
+def responder_lineas(perdidas):
+    """Odoo falso que lee líneas de movimiento; el bloque que contiene alguna de `perdidas` falla con un Fault."""
+    def responder(model, method, args, kwargs):
+        assert (model, method) == ('stock.move', 'read')
+        if set(args[0]) & set(perdidas):
+            raise xmlrpc.client.Fault(2, "MissingError")
+        return [{'id': linea_id, 'product_id': [linea_id, 'P'], 'product_uom_qty': 1.0, 'location_dest_id': [9, 'Salida']}
+                for linea_id in args[0]]
+    return responder
+
+def marcados(conexion):
+    """Albaranes marcados como procesados en las sentencias vigentes: un ROLLBACK TO SAVEPOINT descarta las del elemento."""
+    vigentes = []
+    for query, params in conexion.sentencias:
+        if query == "SAVEPOINT elemento":
+            inicio = len(vigentes)
+        elif query == "ROLLBACK TO SAVEPOINT elemento":
+            del vigentes[inicio:]
+        else:
+            vigentes.append((query, params))
+    return [params[0] for query, params in vigentes if query.startswith("UPDATE Albaran SET Procesado")]
+
+def albaran(albaran_id, move_ids):
+    return {'id': albaran_id, 'name': f'WH/OUT/{albaran_id}', 'partner_id': [3, 'Cliente'], 'create_date': '2024-01-01 10:00:00',
+            'write_date': '2024-01-01 10:00:00', 'move_ids': move_ids, 'priority': '0', 'state': 'assigned'}
+
+def test_init_conecta_cola_gobernador_y_operaciones(crear_procesador, monkeypatch, tmp_path):
+    """Prueba que __init__ crea la cola y el gobernador solo si están configurados y deja una sola DatabaseOperations."""
+    processor = crear_procesador(PickingIngestionProcessor)
+    assert processor.cola is None and processor.odoo.gobernador is None
+    assert processor.operaciones_bd() == [processor.db_operations]
+    assert processor.odoo_operations.odoo is processor.odoo and processor.odoo.disponible()
+
+    monkeypatch.setattr(Config, 'COLA_TRABAJADORES', 2)
+    monkeypatch.setattr(Config, 'COLA_RUTA', str(tmp_path / 'cola.sqlite3'))
+    monkeypatch.setattr(Config, 'ODOO_GOBERNADOR_RUTA', str(tmp_path / 'gobernador.json'))
+    processor = crear_procesador(PickingIngestionProcessor, reglas=REGLAS_PICKING[:1])
+    assert isinstance(processor.cola, ColaTrabajo) and processor.cola.ruta == str(tmp_path / 'cola.sqlite3')
+    assert isinstance(processor.odoo.gobernador, GobernadorOdoo)
+    assert processor.tipo_trabajo == 'albaran:PickingIngestionProcessor' and processor.reglas == REGLAS_PICKING[:1]
+
+def test_albaran_con_lineas_sin_leer_no_se_marca_procesado(crear_procesador, conexion_falsa, monkeypatch):
+    """Prueba que si falla la lectura del bloque de líneas de un albarán, no se escribe ni se marca y el resto sí."""
+    monkeypatch.setattr(Config, 'ODOO_CHUNK_SIZE', 2)
+    conexion = conexion_falsa()
+    processor = crear_procesador(PickingIngestionProcessor, responder=responder_lineas(perdidas=[21]), conexion=conexion)
+    pendientes = [(albaran(1, [10, 11]), REGLAS_PICKING[0]), (albaran(2, [20, 21]), REGLAS_PICKING[0])]
+    assert processor.escribir_pendientes(pendientes) == 2
+    assert marcados(conexion) == [1]
@@ -0,0 +1,35 @@
+# tests/test_plan_cambios.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from db.operations import DatabaseOperations
+from processors.base_processor import BaseProcessor
+
+class ProcesadorPrueba(BaseProcessor):
+    """Procesador mínimo: lee los albaranes y escribe cada uno."""
+    def __init__(self):
+        super().__init__()
+        self.db_operations = DatabaseOperations()
+
+    def ciclo(self):
+        self.leidos = self.db_operations.execute("SELECT AlbaranID FROM Albaran WHERE Procesado = 0")
+        for fila in self.leidos:
+            self.db_operations.insertar_o_actualizar_albaran(fila['AlbaranID'], '2024-01-01 10:00:00', 'Cliente', 'WH/OUT/7')
+            self.db_operations.marcar_albaran_como_procesado(fila['AlbaranID'])
+
+def test_simulacion_registra_escrituras_sin_ejecutarlas(crear_procesador, conexion_falsa):
+    """Prueba que en --dry-run las lecturas llegan a MySQL y las escrituras solo quedan en el plan."""
+    conexion = conexion_falsa([{'AlbaranID': 7}])
+    processor = crear_procesador(ProcesadorPrueba, conexion=conexion)
+
+    reporte = processor.simular()
+    assert processor.leidos == [{'AlbaranID': 7}]
+    assert conexion.consultas == ["SELECT AlbaranID FROM Albaran WHERE Procesado = 0"]
+    assert conexion.commits == 0
+    assert reporte['filas_por_tabla'] == {'Albaran': {'CALL': 1, 'UPDATE': 1}}
+    assert reporte['lecturas_sql'] == 1
+    assert processor.db_operations.plan is None
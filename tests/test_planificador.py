@@ -0,0 +1,43 @@
+# tests/test_planificador.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from db import operations
+from processors.tarimas_processor import TarimasProcessor
+from utils.planificador import PlanificadorCiclo
+
+def test_urgentes_primero_y_resto_al_siguiente_ciclo():
+    """Prueba que el ciclo respeta el máximo de elementos, atiende primero lo urgente y arrastra el resto."""
+    planificador = PlanificadorCiclo('prueba', max_elementos=3, max_segundos=0, tamano_lote=2)
+    elementos = [{'id': i, 'priority': 0} for i in range(1, 8)] + [{'id': 8, 'priority': 1}]
+    lotes = []
+    procesar = lambda lote: lotes.append([e['id'] for e in lote])
+    argumentos = dict(clave=lambda e: e['id'], urgencia=lambda e: e['priority'], recencia=lambda e: e['id'])
+
+    assert planificador.ejecutar(elementos, procesar, **argumentos) == (3, 5)
+    assert lotes == [[8, 7], [6]]
+
+    # Un urgente nuevo pasa adelante; lo arrastrado va antes que lo nuevo de igual urgencia
+    lotes.clear()
+    restantes = [e for e in elementos if e['id'] <= 5] + [{'id': 9, 'priority': 1}, {'id': 10, 'priority': 0}]
+    planificador.ejecutar(restantes, procesar, **argumentos)
+    assert lotes == [[9, 5], [4]]
+
+def test_tarimas_ven_todo_el_atraso_en_orden_estable(crear_procesador, conexion_falsa, monkeypatch):
+    """Prueba que select_albaranes pagina por AlbaranID hasta el final: con más de una página de atraso el planificador
+    recibe también los albaranes más antiguos, y no un subconjunto arbitrario elegido por MySQL."""
+    monkeypatch.setattr(operations, 'PAGINA_ALBARANES', 4)
+    pendientes = list(range(1, 11))
+
+    def responder(query, params):
+        desde, limite = params
+        return [{'AlbaranID': albaran_id} for albaran_id in pendientes if albaran_id > desde][:limite]
+    conexion = conexion_falsa(responder=responder)
+    processor = crear_procesador(TarimasProcessor, conexion=conexion)
+    assert [albaran['AlbaranID'] for albaran in processor.db_operations.select_albaranes()] == pendientes
+    assert [params for _, params in conexion.sentencias] == [(0, 4), (4, 4), (8, 4)]
+    assert all('ORDER BY AlbaranID' in query for query in conexion.consultas)
@@ -0,0 +1,41 @@
+# tests/test_presupuesto_llamadas.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import pytest
+from processors.picking_ingestion_processor import PickingIngestionProcessor
+from utils.contadores import presupuesto_llamadas, registrar_rpc, PresupuestoExcedido
+
+LINEAS = 50
+
+def responder(model, method, args, kwargs):
+    """Odoo falso: cada albarán leído tiene LINEAS líneas de movimiento."""
+    if (model, method) == ('stock.picking', 'read'):
+        return [{'id': albaran_id, 'name': f'WH/INT/{albaran_id}', 'partner_id': [3, 'Cliente'], 'create_date': '2024-01-01 10:00:00',
+                 'write_date': '2024-01-01 10:00:00', 'move_ids': list(range(1, LINEAS + 1)), 'priority': '1', 'state': 'assigned'}
+                for albaran_id in args[0]]
+    if (model, method) == ('stock.move', 'read'):
+        return [{'id': linea_id, 'product_id': [linea_id, 'P'], 'product_uom_qty': 1.0, 'location_id': [8, 'QRA'], 'location_dest_id': [9, 'Salida']}
+                for linea_id in args[0]]
+    raise AssertionError(f"Llamada inesperada {model}.{method}")
+
+@pytest.fixture
+def processor(crear_procesador):
+    return crear_procesador(PickingIngestionProcessor, responder=responder)
+
+def test_un_albaran_con_50_lineas_respeta_el_presupuesto(processor):
+    """Prueba que procesar un albarán de 50 líneas cuesta 2 RPC y un commit, sin importar el número de líneas."""
+    with presupuesto_llamadas(max_rpc=2, max_commits=1, max_sql=LINEAS + 10, nombre='albarán de 50 líneas') as contador:
+        assert processor.procesar_albaranes_por_id([101]) == 1
+    assert contador.rpc[('stock.move', 'read')] == 1
+
+def test_presupuesto_excedido_falla():
+    """Prueba que superar el presupuesto lanza PresupuestoExcedido con el detalle de llamadas."""
+    with pytest.raises(PresupuestoExcedido, match='stock.move.read=3'):
+        with presupuesto_llamadas(max_rpc=2):
+            for _ in range(3):
+                registrar_rpc('stock.move', 'read')
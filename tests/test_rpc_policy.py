@@ -0,0 +1,89 @@
+# tests/test_rpc_policy.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import xmlrpc.client
+import pytest
+from api.rpc_policy import PoliticaLlamadas, CircuitoAbierto, GobernadorSaturado
+from utils.metrics import metricas
+
+@pytest.fixture
+def politica():
+    """Política sin esperas entre reintentos para que las pruebas sean rápidas."""
+    politica = PoliticaLlamadas()
+    politica.backoff_base = 0
+    politica.max_reintentos = 3
+    return politica
+
+def llamada_que_falla(veces, error=ConnectionError("caída")):
+    """Devuelve una llamada que falla `veces` veces y luego responde 'ok'."""
+    intentos = []
+    def llamada(timeout):
+        intentos.append(timeout)
+        if len(intentos) <= veces:
+            raise error
+        return 'ok'
+    return llamada, intentos
+
+def test_lecturas_se_reintentan(politica):
+    """Prueba que una lectura con errores transitorios se reintenta hasta tener éxito."""
+    llamada, intentos = llamada_que_falla(2)
+    assert politica.ejecutar('stock.picking', 'search_read', llamada) == 'ok'
+    assert len(intentos) == 3
+
+def test_escrituras_no_se_reintentan(politica):
+    """Prueba que un método de escritura falla en el primer intento."""
+    llamada, intentos = llamada_que_falla(1)
+    with pytest.raises(ConnectionError):
+        politica.ejecutar('stock.picking', 'write', llamada)
+    assert len(intentos) == 1
+    assert intentos[0] == politica.timeout_escritura
+
+def test_fault_de_odoo_no_se_reintenta(politica):
+    """Prueba que un error de aplicación de Odoo no se reintenta ni abre el circuito."""
+    llamada, intentos = llamada_que_falla(1, xmlrpc.client.Fault(1, "AccessError"))
+    with pytest.raises(xmlrpc.client.Fault):
+        politica.ejecutar('stock.move', 'read', llamada)
+    assert len(intentos) == 1
+    assert politica.circuito.estado() == 'cerrado'
+
+def test_circuito_se_abre_tras_fallos_seguidos(politica):
+    """Prueba que tras varios fallos el circuito rechaza llamadas sin intentarlas."""
+    politica.circuito.umbral = 2
+    llamada, intentos = llamada_que_falla(100)
+    with pytest.raises(ConnectionError):
+        politica.ejecutar('stock.picking', 'search', llamada)
+    assert politica.circuito.estado() == 'abierto'
+    with pytest.raises(CircuitoAbierto):
+        politica.ejecutar('stock.picking', 'search', llamada)
+    assert len(intentos) == 2
+
+def test_gobernador_saturado_no_cierra_el_circuito(politica):
+    """Prueba que sin turno del gobernador Odoo no se llamó: el circuito medio abierto no se cierra ni suma fallos,
+    y la llamada se cuenta como saturada y no como error de aplicación."""
+    politica.circuito.umbral = 1
+    politica.circuito.espera = 0
+    politica.circuito.fallo()
+    assert politica.circuito.estado() == 'medio_abierto'
+    etiquetas = dict(model='stock.quant', method='read_group')
+    saturadas = metricas.contador('rpc.llamadas', resultado='saturado', **etiquetas)
+    errores = metricas.contador('rpc.llamadas', resultado='error_aplicacion', **etiquetas)
+
+    def saturada(timeout):
+        raise GobernadorSaturado("sin turno")
+    with pytest.raises(GobernadorSaturado):
+        politica.ejecutar('stock.quant', 'read_group', saturada)
+    assert politica.circuito.estado() == 'medio_abierto'
+    assert politica.circuito.fallos == 1
+
+    assert metricas.contador('rpc.llamadas', resultado='saturado', **etiquetas) == saturadas + 1
+    assert metricas.contador('rpc.llamadas', resultado='error_aplicacion', **etiquetas) == errores
+
+    # El turno de prueba quedó libre: la siguiente llamada sí se intenta
+    llamada, intentos = llamada_que_falla(0)
+    assert politica.ejecutar('stock.quant', 'read_group', llamada) == 'ok'
+    assert politica.circuito.estado() == 'cerrado'
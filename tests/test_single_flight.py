@@ -0,0 +1,85 @@
+# tests/test_single_flight.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import time
+import threading
+import pytest
+from api.single_flight import SingleFlight, clave_llamada
+
+CLAVE = clave_llamada('product.product', 'read', [[1, 2]], {'fields': ['name']})
+
+def esperar(condicion, segundos=3):
+    limite = time.monotonic() + segundos
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.005)
+    return condicion()
+
+def lanzar_concurrentes(single_flight, funcion, cantidad):
+    """Arranca un líder y `cantidad - 1` seguidores; devuelve (hilos, resultados) con (valor o excepción) por hilo."""
+    resultados = [None] * cantidad
+    def llamar(indice):
+        try:
+            resultados[indice] = single_flight.ejecutar(CLAVE, funcion)
+        except Exception as e:
+            resultados[indice] = e
+    hilos = [threading.Thread(target=llamar, args=(0,))]
+    hilos[0].start()
+    assert esperar(lambda: CLAVE in single_flight._en_vuelo)
+    hilos += [threading.Thread(target=llamar, args=(indice,)) for indice in range(1, cantidad)]
+    for hilo in hilos[1:]:
+        hilo.start()
+    assert esperar(lambda: single_flight._en_vuelo[CLAVE].seguidores == cantidad - 1)
+    return hilos, resultados
+
+def test_llamadas_concurrentes_comparten_una_peticion():
+    """Prueba que cuatro lecturas idénticas simultáneas hacen una sola llamada y cada una recibe su propia copia."""
+    single_flight = SingleFlight()
+    liberar = threading.Event()
+    llamadas = []
+    def leer():
+        llamadas.append(1)
+        liberar.wait(3)
+        return [{'id': 1, 'name': 'A'}]
+    hilos, resultados = lanzar_concurrentes(single_flight, leer, 4)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(3)
+    assert len(llamadas) == 1
+    assert all(resultado == [{'id': 1, 'name': 'A'}] for resultado in resultados)
+    assert len({id(resultado) for resultado in resultados}) == 4
+
+def test_error_del_lider_llega_a_los_seguidores():
+    """Prueba que si la llamada falla, todos los que esperaban reciben la misma excepción y no se guarda nada."""
+    single_flight = SingleFlight(ventana_reutilizacion=60)
+    liberar = threading.Event()
+    def fallar():
+        liberar.wait(3)
+        raise ValueError("Odoo falló")
+    hilos, resultados = lanzar_concurrentes(single_flight, fallar, 3)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(3)
+    assert all(isinstance(resultado, ValueError) for resultado in resultados)
+    assert CLAVE not in single_flight._recientes and CLAVE not in single_flight._en_vuelo
+
+def test_ventana_de_reutilizacion_vence():
+    """Prueba que dentro de la ventana se reutiliza el resultado, al vencer se vuelve a llamar, y sin ventana
+    ni seguidores el líder recibe el objeto original sin copia."""
+    single_flight = SingleFlight(ventana_reutilizacion=0.05)
+    llamadas = []
+    def leer():
+        llamadas.append(1)
+        return [{'id': 1}]
+    assert single_flight.ejecutar(CLAVE, leer) == single_flight.ejecutar(CLAVE, leer)
+    assert len(llamadas) == 1
+    time.sleep(0.06)
+    single_flight.ejecutar(CLAVE, leer)
+    assert len(llamadas) == 2
+
+    original = [{'id': 1}]
+    assert SingleFlight().ejecutar(CLAVE, lambda: original) is original
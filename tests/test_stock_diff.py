@@ -0,0 +1,54 @@
+# tests/test_stock_diff.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from decimal import Decimal
+from utils.stock_diff import StockSnapshot, diferencias_stock, foto_aplicada, a_centavos
+
+UBICACIONES = ['QRA', 'CDMX']
+
+def foto(filas):
+    """Crea una foto a partir de tuplas (id, qra, cdmx, nombre, sku)."""
+    return StockSnapshot.desde_columnas(
+        UBICACIONES, [f[0] for f in filas],
+        {'QRA': [f[1] for f in filas], 'CDMX': [f[2] for f in filas]},
+        [f[3] for f in filas], [f[4] for f in filas])
+
+def test_a_centavos_redondea_como_decimal():
+    """Prueba que el redondeo a centavos coincide con ROUND_HALF_UP y trata None como cero."""
+    assert a_centavos([1.005, 2.5, -0.125, None, Decimal('3.10')]).tolist() == [100, 250, -13, 0, 310]
+
+def test_diferencias_detecta_nuevos_stock_nombre_y_sku():
+    """Prueba que el diff separa productos nuevos, cambios de stock por ubicación, nombre y SKU."""
+    odoo = foto([(3, 1.0, 0, 'C', 'S3'), (1, 2.0, 5.0, 'A', 'S1'), (2, 0, 0, '', 'S2x'), (9, 1, 1, 'Z', 'S9')])
+    mysql = foto([(1, Decimal('2.00'), Decimal('4.99'), 'A', 'S1'), (2, None, None, 'B', 'S2'), (3, 1, 0, 'c', 'S3'), (7, 0, 0, 'X', 'S7')])
+    cambios = diferencias_stock(odoo, mysql)
+
+    assert cambios.nuevos[0].tolist() == [9]
+    assert cambios.nombres[0].tolist() == [3]  # Un nombre vacío en Odoo no sobrescribe MySQL
+    assert cambios.skus[0].tolist() == [2]
+    ids, anteriores, nuevos = cambios.stock['CDMX']
+    assert (ids.tolist(), anteriores.tolist(), nuevos.tolist()) == ([1], [499], [500])
+    assert len(cambios.stock['QRA'][0]) == 0
+    assert cambios.total() == 3
+
+def test_diferencias_contra_mysql_vacio():
+    """Prueba que todos los productos son nuevos cuando MySQL no tiene filas en el bloque."""
+    cambios = diferencias_stock(foto([(1, 1, 1, 'A', 'S1')]), foto([]))
+    assert cambios.nuevos[0].tolist() == [1]
+    assert cambios.total() == 0
+
+def test_foto_aplicada_refleja_lo_escrito_en_mysql():
+    """Prueba que la foto aplicada toma el stock de Odoo y no pisa nombres ni SKUs con valores vacíos."""
+    odoo = foto([(1, 2.0, 5.0, '', 'S1x'), (3, 1.0, 0, 'C', ''), (9, 1, 1, 'Z', 'S9')])
+    mysql = foto([(1, 2, 4.99, 'A', 'S1'), (3, 1, 0, 'c', 'S3'), (7, 0, 3, 'X', 'S7')])
+    aplicada = foto_aplicada(odoo, mysql)
+    assert aplicada.ids.tolist() == [1, 3, 7]
+    assert aplicada.centavos.tolist() == [[200, 500], [100, 0], [0, 300]]
+    assert aplicada.nombres.tolist() == ['A', 'C', 'X']
+    assert aplicada.skus.tolist() == ['S1x', 'S3', 'S7']
+    assert diferencias_stock(odoo, aplicada).total() == 0
@@ -0,0 +1,130 @@
+# tests/test_stock_qro.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import xmlrpc.client
+import pytest
+from db.operations import DatabaseOperations, FilaProducto, SQL_UPSERT_STOCK
+from config.settings import Config
+from processors.stock_qro_processor import StockQroCM03, rangos_fragmentos, UBICACIONES
+from utils.foto_stock import guardar_foto
+from utils.stock_diff import StockSnapshot
+
+def test_rangos_fragmentos_cubren_todo_el_rango_sin_solaparse():
+    """Los fragmentos de la resincronización cubren (0, id_maximo] de forma contigua."""
+    assert rangos_fragmentos(10, 4) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert rangos_fragmentos(3, 8) == [(0, 1), (1, 2), (2, 3)]
+    assert rangos_fragmentos(0, 4) == []
+
+def test_hay_productos_consulta_una_fila_sin_cursor_sin_bufer(crear_operaciones, conexion_falsa, monkeypatch):
+    """Prueba que la comprobación previa a la resincronización es un SELECT 1 ... LIMIT 1 con búfer: cerrar a medias
+    un cursor sin búfer con filas sin leer falla con 'Unread result found'."""
+    def sin_stream(*args, **kwargs):
+        raise AssertionError("hay_productos no debe leer en flujo")
+    monkeypatch.setattr(DatabaseOperations, 'stream', sin_stream)
+    con_filas = conexion_falsa([(1,)])
+    assert crear_operaciones(con_filas).hay_productos()
+    assert con_filas.consultas == ["SELECT 1 FROM Productos LIMIT 1"]
+    assert not crear_operaciones(conexion_falsa([])).hay_productos()
+
+def test_stock_por_ubicacion_se_agrupa_en_fila_producto(crear_operaciones, monkeypatch):
+    """Prueba que las filas del LEFT JOIN se agrupan por producto en FilaProducto.Stock, y un producto sin stock queda vacío."""
+    filas = [(1, 'S1', 'A', 'QRA', 5), (1, 'S1', 'A', 'CDMX', 2), (2, 'S2', 'B', None, None), (3, 'S3', 'C', 'MTY', 7)]
+    monkeypatch.setattr(DatabaseOperations, 'stream', lambda self, query, params, tamano_lote: iter(filas))
+    assert list(crear_operaciones().iterar_produc_existentes()) == [
+        FilaProducto(1, 'S1', 'A', {'QRA': 5, 'CDMX': 2}),
+        FilaProducto(2, 'S2', 'B', {}),
+        FilaProducto(3, 'S3', 'C', {'MTY': 7}),
+    ]
+
+def test_stock_se_copia_a_las_columnas_heredadas(crear_operaciones, conexion_falsa):
+    """Prueba que el upsert por ubicación se copia a StockQra/StockCDMX y que una ubicación sin columna heredada no."""
+    conexion = conexion_falsa()
+    crear_operaciones(conexion).actualizar_stock_ubicaciones([(1, 'QRA', 5), (1, 'CDMX', 2), (2, 'QRA', 0), (3, 'MTY', 7)])
+    assert conexion.lotes == [
+        (SQL_UPSERT_STOCK, [(1, 'QRA', 5), (1, 'CDMX', 2), (2, 'QRA', 0), (3, 'MTY', 7)]),
+        ("UPDATE Productos SET StockQra = %s WHERE ProductoID = %s", [(5, 1), (0, 2)]),
+        ("UPDATE Productos SET StockCDMX = %s WHERE ProductoID = %s", [(2, 1)]),
+    ]
+    assert conexion.commits == 1
+
+def test_init_conecta_auditoria_y_operaciones(crear_procesador):
+    """Prueba que __init__ deja la auditoría con su propia DatabaseOperations y que la simulación cubre ambas."""
+    processor = crear_procesador(StockQroCM03)
+    assert processor.operaciones_bd() == [processor.db_operations, processor.audit.db_operations]
+    assert processor.audit.db_operations is not processor.db_operations
+    assert processor.foto_previa is None and processor.odoo.uid == 1
+
+def test_foto_de_stock_desactivada_por_defecto(crear_procesador, monkeypatch, tmp_path):
+    """Prueba que sin STOCK_FOTO_RUTA no se lee ni se escribe ninguna foto, tampoco en el directorio de arranque."""
+    monkeypatch.setattr(Config, 'STOCK_FOTO_RUTA', '')
+    monkeypatch.chdir(tmp_path)
+    processor = crear_procesador(StockQroCM03)
+    assert processor.foto_previa_vigente() is None
+    processor.guardar_foto_aplicada([StockSnapshot.desde_columnas(['QRA'], [1], {'QRA': [2]}, ['A'], ['S1'])], [], True)
+    assert processor.foto_previa is None
+    assert list(tmp_path.iterdir()) == []
+    assert processor.db_operations.db_connection.connection.consultas == []
+
+def test_sin_tabla_de_stock_la_sincronizacion_falla_con_un_mensaje_claro(crear_procesador, conexion_falsa):
+    """Prueba que sin ProductoStockUbicacion la sincronización se detiene antes de leer y pide aplicar las migraciones."""
+    conexion = conexion_falsa([])
+    processor = crear_procesador(StockQroCM03, conexion=conexion)
+    with pytest.raises(RuntimeError, match='migrations.py --aplicar'):
+        processor.sincronizar()
+    assert len(conexion.consultas) == 1
+
+def responder_odoo_productos(ids, fallan):
+    """Odoo falso con `ids` en stock; la lectura de nombres del bloque que contiene alguno de `fallan` falla siempre."""
+    def responder(model, method, args, kwargs):
+        if (model, method) == ('product.product', 'search'):
+            ultimo_id = args[0][0][2]
+            return [ProductoID for ProductoID in ids if ProductoID > ultimo_id][:kwargs['limit']]
+        if (model, method) == ('stock.quant', 'read_group'):
+            return [{'product_id': [ProductoID, 'P'], 'quantity': 5.0} for ProductoID in args[0][1][2]]
+        if (model, method) == ('product.product', 'search_read'):
+            bloque = args[0][0][2]
+            if set(bloque) & set(fallan):
+                raise xmlrpc.client.Fault(1, "MemoryError")
+            return [{'id': ProductoID, 'name': f'Producto {ProductoID}', 'default_code': f'S{ProductoID}'} for ProductoID in bloque]
+        raise AssertionError(f"Llamada inesperada {model}.{method}")
+    return responder
+
+def test_bloques_de_nombres_fallidos_se_devuelven(crear_procesador, monkeypatch):
+    """Prueba que obtener_produc_total informa los bloques que no pudo leer tras los reintentos."""
+    monkeypatch.setattr(Config, 'ODOO_CHUNK_REINTENTOS', 1)
+    processor = crear_procesador(StockQroCM03, responder=responder_odoo_productos([], fallan=[3]))
+    nombres, skus, fallidos = processor.odoo_operations.obtener_produc_total([4, 1, 3, 2, 5], chunk_size=2)
+    assert fallidos == [(3, 4)]
+    assert nombres == {1: 'Producto 1', 2: 'Producto 2', 5: 'Producto 5'} and skus == {1: 'S1', 2: 'S2', 5: 'S5'}
+
+def test_bloque_de_nombres_fallido_aborta_el_ciclo_y_descarta_la_foto(crear_procesador, conexion_falsa, monkeypatch, tmp_path):
+    """Prueba que si un bloque de nombres no se lee, el ciclo falla sin escribir nombres vacíos y la foto se descarta:
+    de lo contrario el siguiente ciclo compararía contra datos parciales."""
+    ruta = str(tmp_path / 'stock_foto.bin')
+    marca = {'filas_stock': 8, 'actualizado': 1717171717, 'filas_productos': 4, 'id_maximo': 4}
+    monkeypatch.setattr(Config, 'STOCK_FOTO_RUTA', ruta)
+    monkeypatch.setattr(Config, 'ODOO_CHUNK_SIZE', 2)
+    monkeypatch.setattr(Config, 'ODOO_CHUNK_REINTENTOS', 0)
+    ubicaciones = list(UBICACIONES)
+    guardar_foto(ruta, StockSnapshot.desde_columnas(ubicaciones, [1, 2, 3, 4], {nombre: [1, 1, 1, 1] for nombre in ubicaciones},
+                                                    [f'Producto {i}' for i in range(1, 5)], [f'S{i}' for i in range(1, 5)]),
+                 1, tuple(marca.values()))
+
+    def responder_mysql(query, params):
+        if query.startswith("SELECT 1 FROM Productos"):
+            return [(1,)]
+        if 'filas_stock' in query:
+            return [marca]
+        return []
+    conexion = conexion_falsa(responder=responder_mysql)
+    processor = crear_procesador(StockQroCM03, responder=responder_odoo_productos([1, 2, 3, 4], fallan=[3]), conexion=conexion)
+    with pytest.raises(RuntimeError, match=r'\(3, 4\)'):
+        processor.actualizar_productos()
+    assert not os.path.exists(ruta) and processor.foto_previa is None
+    assert conexion.lotes == []
+    assert not [query for query in conexion.consultas if not query.startswith('SELECT')]
@@ -0,0 +1,54 @@
+# tests/test_unidad_trabajo.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import pytest
+from db.unidad_trabajo import ErrorElemento
+
+@pytest.fixture
+def operaciones(crear_operaciones, conexion_falsa):
+    """Operaciones sobre una conexión falsa en la que toda sentencia con 'FALLA' lanza un error de MySQL."""
+    return crear_operaciones(conexion_falsa(fallar=lambda query: 'FALLA' in query))
+
+def test_unidad_agrupa_confirmaciones(operaciones):
+    """Prueba que muchas escrituras dentro de la unidad se confirman cada N y al salir."""
+    conexion = operaciones.db_connection.connection
+    with operaciones.unidad_de_trabajo(cada_n=4, cada_seg=3600):
+        for producto_id in range(10):
+            operaciones.actualizar_produc_nombre('Nombre', producto_id)
+    assert conexion.commits == 3
+
+def test_elemento_fallido_se_deshace_con_savepoint(operaciones):
+    """Prueba que una sentencia fallida deshace solo su elemento y el resto se confirma."""
+    conexion = operaciones.db_connection.connection
+    with operaciones.unidad_de_trabajo(cada_n=100, cada_seg=3600):
+        with operaciones.elemento('albarán 1'):
+            operaciones.marcar_albaran_como_procesado(1)
+        with pytest.raises(ErrorElemento):
+            with operaciones.elemento('albarán 2'):
+                operaciones.marcar_albaran_como_procesado(2)
+                operaciones.execute("UPDATE FALLA SET x = 1")
+    assert "ROLLBACK TO SAVEPOINT elemento" in conexion.consultas
+    assert conexion.consultas.count("RELEASE SAVEPOINT elemento") == 1
+    assert conexion.commits == 1
+    assert conexion.rollbacks == 0
+
+def test_frescura_se_mide_solo_para_elementos_confirmados(operaciones):
+    """Prueba que el atraso de un elemento deshecho no se observa y el de uno confirmado sí."""
+    from utils.metrics import metricas
+    antes = metricas.contador('frescura.excedidos', procesador='PruebaUnidad')
+    with operaciones.unidad_de_trabajo(cada_n=100, cada_seg=3600):
+        with operaciones.elemento('albarán 1'):
+            operaciones.marcar_albaran_como_procesado(1)
+            operaciones.anotar_frescura('PruebaUnidad', {'write_date': '2020-01-01 00:00:00'})
+        with pytest.raises(ErrorElemento):
+            with operaciones.elemento('albarán 2'):
+                operaciones.anotar_frescura('PruebaUnidad', {'create_date': '2020-01-01 00:00:00'})
+                operaciones.execute("UPDATE FALLA SET x = 1")
+        assert len(operaciones.frescura_pendiente) == 1
+    assert operaciones.frescura_pendiente == []
+    assert metricas.contador('frescura.excedidos', procesador='PruebaUnidad') == antes + 1
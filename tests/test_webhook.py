@@ -0,0 +1,60 @@
+# tests/test_webhook.py
+
+import sys
+import os
+
+# Agregar `src` al path para permitir importar los módulos correctamente
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import json
+import http.client
+import urllib.request
+import urllib.error
+import pytest
+from api.webhook import ReceptorWebhook
+
+@pytest.fixture
+def receptor():
+    recibidos = []
+    receptor = ReceptorWebhook(recibidos.extend, puerto=0, host='127.0.0.1', secreto='s3creto', dedup_seg=60)
+    receptor.recibidos = recibidos
+    assert receptor.iniciar()
+    yield receptor
+    receptor.detener()
+
+def enviar(receptor, datos, secreto='s3creto'):
+    host, puerto = receptor.servidor.server_address
+    peticion = urllib.request.Request(
+        f"http://{host}:{puerto}/albaranes", data=json.dumps(datos).encode(),
+        headers={'Content-Type': 'application/json', 'X-Webhook-Secret': secreto}, method='POST')
+    with urllib.request.urlopen(peticion, timeout=5) as respuesta:
+        return respuesta.status, json.loads(respuesta.read())
+
+def test_notificaciones_repetidas_se_descartan(receptor):
+    """Prueba que los IDs se entregan una sola vez dentro de la ventana de deduplicación."""
+    assert enviar(receptor, {'ids': [10, 11]}) == (202, {'aceptados': 2})
+    assert enviar(receptor, {'ids': [11, 12]}) == (202, {'aceptados': 1})
+    assert receptor.recibidos == [10, 11, 12]
+
+def test_secreto_invalido_se_rechaza(receptor):
+    """Prueba que una notificación sin el secreto compartido no se entrega."""
+    with pytest.raises(urllib.error.HTTPError) as error:
+        enviar(receptor, {'id': 10}, secreto='otro')
+    assert error.value.code == 401
+    assert receptor.recibidos == []
+
+def test_ids_invalidos_se_responden_con_400(receptor):
+    """Prueba que IDs nulos, listas u objetos y un Content-Length no numérico reciben 400 en lugar de cortar la conexión."""
+    for datos in ({'ids': [None]}, {'ids': [[1]]}, {'id': {'a': 1}}, {'id': 5, 'write_date': [1]}):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            enviar(receptor, datos)
+        assert error.value.code == 400
+    host, puerto = receptor.servidor.server_address
+    conexion = http.client.HTTPConnection(host, puerto, timeout=5)
+    conexion.putrequest('POST', '/albaranes')
+    conexion.putheader('X-Webhook-Secret', 's3creto')
+    conexion.putheader('Content-Length', 'abc')
+    conexion.endheaders()
+    assert conexion.getresponse().status == 400
+    conexion.close()
+    assert receptor.recibidos == []